@@ -1,14 +1,18 @@
-from django.contrib import admin
-from django.utils import timezone
-from .models import Concert, Ticket
+from django import forms
+from django.contrib import admin, messages
+from django.db import transaction
+from core.admin_changelist import LargeTableAdminMixin
+from .cache import bump_tour_version
+from .models import Concert, Ticket, WaitlistEntry
 
 
 class TicketInline(admin.TabularInline):
     model = Ticket
     extra = 0
     fields = ('ticket_number', 'user', 'price_paid', 'purchase_date', 'is_used_for_discount')
-    readonly_fields = ('ticket_number', 'purchase_date')
-    raw_id_fields = ('user',)
+    # Виджет raw_id читает пользователя отдельным запросом на каждую строку,
+    # а у распроданного концерта билетов тысячи
+    readonly_fields = ('ticket_number', 'user', 'purchase_date')
     verbose_name = 'Билет'
     verbose_name_plural = 'Билеты'
 
@@ -16,9 +20,25 @@ class TicketInline(admin.TabularInline):
         # Билеты добавляются только через покупку
         return False
 
+    def get_queryset(self, request):
+        return super().get_queryset(request).select_related('user')
+
+
+class ConcertAdminForm(forms.ModelForm):
+    sold_tickets_correction = forms.IntegerField(
+        required=False,
+        label='Корректировка проданных билетов',
+        help_text='Прибавляется к текущему значению в БД, может быть отрицательной'
+    )
+
+    class Meta:
+        model = Concert
+        fields = '__all__'
+
 
 @admin.register(Concert)
 class ConcertAdmin(admin.ModelAdmin):
+    form = ConcertAdminForm
     list_display = ('venue', 'city', 'date', 'price', 'status', 'sold_tickets', 'available_tickets', 'is_sold_out')
     list_display_links = ('venue',)
     list_filter = ('status', 'city', 'country', 'date')
@@ -27,7 +47,7 @@ class ConcertAdmin(admin.ModelAdmin):
     date_hierarchy = 'date'
     inlines = [TicketInline]
     actions = ['mark_as_soldout', 'mark_as_upcoming', 'mark_as_completed']
-    readonly_fields = ('created_at', 'available_tickets', 'is_sold_out')
+    readonly_fields = ('created_at', 'available_tickets', 'is_sold_out', 'sold_tickets', 'held_tickets')
 
     fieldsets = (
         ('Место проведения', {
@@ -37,7 +57,8 @@ class ConcertAdmin(admin.ModelAdmin):
             'fields': ('date',)
         }),
         ('Билеты', {
-            'fields': ('price', 'ticket_url', 'total_tickets', 'sold_tickets', 'available_tickets', 'is_sold_out')
+            'fields': ('price', 'ticket_url', 'total_tickets', 'sold_tickets', 'sold_tickets_correction',
+                       'held_tickets', 'available_tickets', 'is_sold_out')
         }),
         ('Статус', {
             'fields': ('status', 'created_at')
@@ -55,33 +76,49 @@ class ConcertAdmin(admin.ModelAdmin):
     @admin.action(description='Отметить как распроданные')
     def mark_as_soldout(self, request, queryset):
         queryset.update(status='soldout')
+        bump_tour_version()
         self.message_user(request, f"{queryset.count()} концертов отмечено как распроданные")
 
     @admin.action(description='Отметить как предстоящие')
     def mark_as_upcoming(self, request, queryset):
         queryset.update(status='upcoming')
+        bump_tour_version()
         self.message_user(request, f"{queryset.count()} концертов отмечено как предстоящие")
 
     @admin.action(description='Отметить как прошедшие')
     def mark_as_completed(self, request, queryset):
         queryset.update(status='completed')
+        bump_tour_version()
         self.message_user(request, f"{queryset.count()} концертов отмечено как прошедшие")
 
     def save_model(self, request, obj, form, change):
-        # Автоматически обновляем статус при распродаже
-        if obj.sold_tickets >= obj.total_tickets:
-            obj.status = 'soldout'
         super().save_model(request, obj, form, change)
 
+        # Полное сохранение не пишет проданные билеты, они меняются
+        # корректировкой от значения в БД (в том числе у нового концерта)
+        correction = form.cleaned_data.get('sold_tickets_correction')
+        if not correction:
+            return
+        if not Concert.objects.filter(pk=obj.pk).correct_sold_tickets(correction):
+            self.message_user(
+                request,
+                f"Корректировка не применена: проданных билетов меньше {-correction}",
+                level=messages.ERROR
+            )
+        obj.refresh_from_db(fields=list(Concert.SALES_FIELDS))
+        transaction.on_commit(bump_tour_version)
+
 
 @admin.register(Ticket)
-class TicketAdmin(admin.ModelAdmin):
+class TicketAdmin(LargeTableAdminMixin, admin.ModelAdmin):
     list_display = ('ticket_number', 'concert', 'user', 'purchase_date', 'price_paid', 'has_discount_code')
     list_display_links = ('ticket_number',)
     list_filter = ('is_used_for_discount', 'purchase_date', 'concert')
     search_fields = ('ticket_number', 'user__email', 'concert__venue')
     date_hierarchy = 'purchase_date'
     raw_id_fields = ('concert', 'user')
+    # Обратная связь discount_code нужна колонке has_discount_code
+    list_select_related = ('concert', 'user', 'discount_code')
     readonly_fields = ('ticket_number', 'purchase_date', 'has_discount_code')
 
     fieldsets = (
@@ -98,4 +135,14 @@ class TicketAdmin(admin.ModelAdmin):
 
     @admin.display(description='Есть промо-код', boolean=True)
     def has_discount_code(self, obj):
-        return hasattr(obj, 'discount_code')
\ No newline at end of file
+        return hasattr(obj, 'discount_code')
+
+
+@admin.register(WaitlistEntry)
+class WaitlistEntryAdmin(admin.ModelAdmin):
+    list_display = ('concert', 'position', 'user', 'status', 'offer_expires_at', 'created_at')
+    list_filter = ('status',)
+    search_fields = ('user__email', 'concert__venue', 'concert__city')
+    raw_id_fields = ('concert', 'user')
+    list_select_related = ('concert', 'user')
+    readonly_fields = ('position', 'created_at')
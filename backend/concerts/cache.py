@@ -0,0 +1,82 @@
+"""
+Кэш календаря тура.
+
+Календарь строится одним запросом и хранится под ключом с номером версии
+(core.cache). Изменения концертов и билетов увеличивают версию; кроме того, запись живет
+не дольше, чем до начала ближайшего концерта, чтобы прошедшие концерты не
+оставались в календаре.
+"""
+from itertools import groupby
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import BooleanField, Case, F, Value, When
+from django.utils import timezone
+
+from core.cache import bump_version, get_version
+from .models import Concert
+
+TOUR_VERSION_KEY = 'concerts:tour:version'
+
+
+def get_tour_version():
+    """Текущая версия календаря тура"""
+    return get_version(TOUR_VERSION_KEY)
+
+
+def bump_tour_version():
+    """Инвалидация календаря тура"""
+    bump_version(TOUR_VERSION_KEY)
+
+
+def tour_calendar():
+    """
+    Предстоящие концерты, сгруппированные по странам и городам:
+    [{'country': ..., 'cities': [{'city': ..., 'concerts': [...]}]}]
+    """
+    key = f'concerts:tour:{get_tour_version()}:calendar'
+    calendar = cache.get(key)
+    if calendar is None:
+        # Концерты читаются с реплики, а отстающая реплика попала бы в кэш
+        # под новой версией. Внутри транзакции роутер читает основную БД
+        with transaction.atomic():
+            calendar, starts_at = _build_tour_calendar()
+        timeout = settings.TOUR_CALENDAR_CACHE_TIMEOUT
+        if starts_at is not None:
+            timeout = max(min(timeout, int((starts_at - timezone.now()).total_seconds())), 1)
+        cache.set(key, calendar, timeout)
+    return calendar
+
+
+def _build_tour_calendar():
+    available = F('total_tickets') - F('sold_tickets') - F('held_tickets')
+    rows = list(
+        Concert.objects.upcoming()
+        .annotate(
+            available_tickets=available,
+            is_sold_out=Case(
+                When(total_tickets__lte=F('sold_tickets') + F('held_tickets'), then=Value(True)),
+                When(status='soldout', then=Value(True)),
+                default=Value(False),
+                output_field=BooleanField(),
+            ),
+        )
+        .order_by('country', 'city', 'date')
+        .values(
+            'id', 'country', 'city', 'venue', 'date', 'price', 'ticket_url',
+            'status', 'available_tickets', 'is_sold_out',
+        )
+    )
+
+    calendar = []
+    for country, country_rows in groupby(rows, key=lambda row: row['country']):
+        calendar.append({
+            'country': country,
+            'cities': [
+                {'city': city, 'concerts': list(city_rows)}
+                for city, city_rows in groupby(country_rows, key=lambda row: row['city'])
+            ],
+        })
+    starts_at = min((row['date'] for row in rows), default=None)
+    return calendar, starts_at
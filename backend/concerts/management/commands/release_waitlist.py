@@ -0,0 +1,28 @@
+from django.core.management.base import BaseCommand
+from django.db.models import F
+
+from concerts.models import Concert
+from concerts.services import release_waitlist_offers
+
+
+class Command(BaseCommand):
+    help = 'Предлагает освободившиеся билеты следующим записям листа ожидания'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=100,
+            help='Максимум предложений на концерт за один запуск'
+        )
+
+    def handle(self, *args, **options):
+        concerts = Concert.objects.upcoming().filter(
+            waitlist_tail__gt=F('waitlist_head')
+        ) | Concert.objects.upcoming().filter(held_tickets__gt=0)
+
+        offered = 0
+        for concert in concerts.order_by('date'):
+            offered += release_waitlist_offers(concert, batch_size=options['batch_size'])
+
+        self.stdout.write(self.style.SUCCESS(f'✅ Выдано предложений: {offered}'))
@@ -0,0 +1,16 @@
+from django.core.management.base import BaseCommand
+
+from concerts.cache import bump_tour_version
+from concerts.models import Concert
+
+
+class Command(BaseCommand):
+    help = 'Переводит прошедшие концерты в статус "Прошел", а заполненные - в "Все билеты проданы"'
+
+    def handle(self, *args, **options):
+        completed, soldout = Concert.objects.update_statuses()
+        if completed or soldout:
+            bump_tour_version()
+        self.stdout.write(self.style.SUCCESS(
+            f'✅ Завершено концертов: {completed}, распродано: {soldout}'
+        ))
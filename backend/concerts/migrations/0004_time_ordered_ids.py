@@ -0,0 +1,19 @@
+# Generated by Django 4.2.7 on 2026-10-17 20:12
+
+import core.ids
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('concerts', '0003_alter_concert_city_alter_concert_date_and_more'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='ticket',
+            name='id',
+            field=models.UUIDField(default=core.ids.uuid7, editable=False, primary_key=True, serialize=False, verbose_name='ID'),
+        ),
+    ]
@@ -0,0 +1,51 @@
+# Generated by Django 4.2.7 on 2026-10-17 20:26
+
+import core.ids
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('concerts', '0004_time_ordered_ids'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='concert',
+            name='held_tickets',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='Отложено для листа ожидания'),
+        ),
+        migrations.AddField(
+            model_name='concert',
+            name='waitlist_head',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='Лист ожидания: обработано до позиции'),
+        ),
+        migrations.AddField(
+            model_name='concert',
+            name='waitlist_tail',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='Лист ожидания: последняя позиция'),
+        ),
+        migrations.CreateModel(
+            name='WaitlistEntry',
+            fields=[
+                ('id', models.UUIDField(default=core.ids.uuid7, editable=False, primary_key=True, serialize=False, verbose_name='ID')),
+                ('position', models.PositiveIntegerField(editable=False, verbose_name='Позиция')),
+                ('status', models.CharField(choices=[('waiting', 'Ожидает'), ('offered', 'Предложен билет'), ('purchased', 'Билет куплен'), ('expired', 'Предложение истекло')], default='waiting', max_length=20, verbose_name='Статус')),
+                ('offer_expires_at', models.DateTimeField(blank=True, null=True, verbose_name='Предложение действует до')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='Дата записи')),
+                ('concert', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='waitlist', to='concerts.concert', verbose_name='Концерт')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='waitlist_entries', to=settings.AUTH_USER_MODEL, verbose_name='Пользователь')),
+            ],
+            options={
+                'verbose_name': 'Запись в листе ожидания',
+                'verbose_name_plural': 'Лист ожидания',
+                'ordering': ['concert', 'position'],
+                'indexes': [models.Index(fields=['concert', 'status', 'position'], name='concerts_wa_concert_5f5078_idx')],
+                'unique_together': {('concert', 'position'), ('concert', 'user')},
+            },
+        ),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 4.2.7 on 2026-10-17 20:27
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('concerts', '0005_waitlist'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='concert',
+            index=models.Index(fields=['country', 'city', 'date'], name='concerts_co_country_062c39_idx'),
+        ),
+    ]
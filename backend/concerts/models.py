@@ -1,10 +1,61 @@
 import uuid
-import random
-import string
 from django.db import models
 from django.conf import settings
 from django.utils import timezone
 
+from core.codes import next_code
+from core.ids import uuid7
+
+
+class ConcertQuerySet(models.QuerySet):
+    # Статусы концертов, которые еще не прошли и не отменены
+    ACTIVE_STATUSES = ['upcoming', 'soldout']
+
+    def upcoming(self, now=None):
+        """Предстоящие концерты по дате, независимо от того, обновлен ли статус"""
+        return self.filter(status__in=self.ACTIVE_STATUSES, date__gte=now or timezone.now())
+
+    def past(self, now=None):
+        """Прошедшие концерты, статус которых еще не 'completed'"""
+        return self.filter(status__in=self.ACTIVE_STATUSES, date__lt=now or timezone.now())
+
+    def update_statuses(self, now=None):
+        """
+        Перевод статусов концертов двумя UPDATE по индексу (status, date):
+        прошедшие становятся 'completed', заполненные - 'soldout'.
+        Возвращает количество завершенных и распроданных концертов.
+        """
+        now = now or timezone.now()
+        completed = self.past(now).update(status='completed')
+        soldout = self.filter(
+            status='upcoming',
+            date__gte=now,
+            sold_tickets__gte=models.F('total_tickets')
+        ).update(status='soldout')
+        return completed, soldout
+
+    def correct_sold_tickets(self, delta):
+        """
+        Ручная корректировка проданных билетов на delta (может быть
+        отрицательной) одним UPDATE от текущего значения в БД. Статус
+        'upcoming'/'soldout' пересчитывается в том же запросе; корректировка,
+        после которой счетчик стал бы отрицательным, не применяется.
+        Возвращает количество обновленных концертов.
+        """
+        # В SET используются значения строки до обновления
+        return self.filter(sold_tickets__gte=-delta).update(
+            sold_tickets=models.F('sold_tickets') + delta,
+            status=models.Case(
+                models.When(
+                    status__in=self.ACTIVE_STATUSES,
+                    sold_tickets__gte=models.F('total_tickets') - models.F('held_tickets') - delta,
+                    then=models.Value('soldout')
+                ),
+                models.When(status='soldout', then=models.Value('upcoming')),
+                default=models.F('status'),
+            ),
+        )
+
 
 class Concert(models.Model):
     """Концерт"""
@@ -64,17 +115,37 @@ class Concert(models.Model):
         default=0,
         verbose_name='Продано билетов'
     )
+    held_tickets = models.PositiveIntegerField(
+        default=0,
+        editable=False,
+        verbose_name='Отложено для листа ожидания'
+    )
+    # Лист ожидания: tail - последняя выданная позиция,
+    # head - последняя позиция, которой предложен билет
+    waitlist_head = models.PositiveIntegerField(
+        default=0,
+        editable=False,
+        verbose_name='Лист ожидания: обработано до позиции'
+    )
+    waitlist_tail = models.PositiveIntegerField(
+        default=0,
+        editable=False,
+        verbose_name='Лист ожидания: последняя позиция'
+    )
     created_at = models.DateTimeField(
         auto_now_add=True,
         verbose_name='Дата создания'
     )
 
+    objects = ConcertQuerySet.as_manager()
+
     class Meta:
         verbose_name = 'Концерт'
         verbose_name_plural = 'Концерты'
         ordering = ['date']
         indexes = [
             models.Index(fields=['status', 'date']),
+            models.Index(fields=['country', 'city', 'date']),
         ]
 
     def __str__(self):
@@ -82,14 +153,30 @@ class Concert(models.Model):
 
     @property
     def available_tickets(self):
-        """Доступно билетов"""
-        return self.total_tickets - self.sold_tickets
+        """Доступно билетов (без отложенных для листа ожидания)"""
+        return self.total_tickets - self.sold_tickets - self.held_tickets
 
     @property
     def is_sold_out(self):
         """Распродано ли"""
         return self.available_tickets <= 0
 
+    SALES_FIELDS = ('sold_tickets', 'status')
+    WAITLIST_FIELDS = ('held_tickets', 'waitlist_head', 'waitlist_tail')
+    # Статус, прочитанный из БД (None у нового концерта)
+    _db_status = None
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._db_status = instance.__dict__.get('status')
+        return instance
+
+    def refresh_from_db(self, using=None, fields=None):
+        super().refresh_from_db(using=using, fields=fields)
+        if fields is None or 'status' in fields:
+            self._db_status = self.status
+
     def save(self, *args, **kwargs):
         """автоматическое обновление статуса"""
 
@@ -99,13 +186,28 @@ class Concert(models.Model):
         elif self.date < timezone.now() and self.status not in ['completed', 'cancelled']:
             self.status = 'completed'
 
+        # Продажи и лист ожидания меняются только условными UPDATE сервисов,
+        # поэтому полное сохранение устаревшего экземпляра их не затирает.
+        # Статус записывается, только если он изменился после чтения из БД:
+        # вручную или проверками выше.
+        update_fields = kwargs.get('update_fields')
+        if not self._state.adding and update_fields is None:
+            update_fields = kwargs['update_fields'] = [
+                field.name for field in self._meta.concrete_fields
+                if not field.primary_key and field.name not in self.SALES_FIELDS + self.WAITLIST_FIELDS
+            ]
+            if self.status != self._db_status:
+                update_fields.append('status')
         super().save(*args, **kwargs)
+        if update_fields is None or 'status' in update_fields:
+            self._db_status = self.status
+
 
 class Ticket(models.Model):
     """Билет на концерт"""
     id = models.UUIDField(
         primary_key=True,
-        default=uuid.uuid4,
+        default=uuid7,
         editable=False,
         verbose_name='ID'
     )
@@ -154,9 +256,83 @@ class Ticket(models.Model):
             self.ticket_number = self._generate_ticket_number()
         super().save(*args, **kwargs)
 
+    @staticmethod
+    def get_number_prefix(concert):
+        """Префикс номеров билетов на концерт: WLQ-{город}-{ддмм}-"""
+        city_code = concert.city[:3].upper()
+        date_code = concert.date.strftime('%d%m')
+        return f"WLQ-{city_code}-{date_code}-"
+
     def _generate_ticket_number(self):
         """Генерация номера билета"""
-        city_code = self.concert.city[:3].upper()
-        date_code = self.concert.date.strftime('%d%m')
-        random_chars = ''.join(random.choices(string.ascii_uppercase + string.digits, k=4))
-        return f"WLQ-{city_code}-{date_code}-{random_chars}"
\ No newline at end of file
+        return next_code(self.get_number_prefix(self.concert), width=4)
+
+
+class WaitlistEntry(models.Model):
+    """Место в листе ожидания на распроданный концерт"""
+    STATUS_CHOICES = [
+        ('waiting', 'Ожидает'),
+        ('offered', 'Предложен билет'),
+        ('purchased', 'Билет куплен'),
+        ('expired', 'Предложение истекло'),
+    ]
+
+    id = models.UUIDField(
+        primary_key=True,
+        default=uuid7,
+        editable=False,
+        verbose_name='ID'
+    )
+    concert = models.ForeignKey(
+        Concert,
+        on_delete=models.CASCADE,
+        related_name='waitlist',
+        verbose_name='Концерт'
+    )
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        related_name='waitlist_entries',
+        verbose_name='Пользователь'
+    )
+    position = models.PositiveIntegerField(
+        editable=False,
+        verbose_name='Позиция'
+    )
+    status = models.CharField(
+        max_length=20,
+        choices=STATUS_CHOICES,
+        default='waiting',
+        verbose_name='Статус'
+    )
+    offer_expires_at = models.DateTimeField(
+        null=True,
+        blank=True,
+        verbose_name='Предложение действует до'
+    )
+    created_at = models.DateTimeField(
+        auto_now_add=True,
+        verbose_name='Дата записи'
+    )
+
+    class Meta:
+        verbose_name = 'Запись в листе ожидания'
+        verbose_name_plural = 'Лист ожидания'
+        ordering = ['concert', 'position']
+        unique_together = [['concert', 'user'], ['concert', 'position']]
+        indexes = [
+            models.Index(fields=['concert', 'status', 'position']),
+        ]
+
+    def __str__(self):
+        return f"{self.concert} - #{self.position}"
+
+    @property
+    def people_ahead(self):
+        """
+        Сколько записей впереди (без учета тех, кто уже получил предложение).
+        Считается по счетчикам концерта, без обхода очереди.
+        """
+        if self.status != 'waiting':
+            return 0
+        return max(self.position - self.concert.waitlist_head - 1, 0)
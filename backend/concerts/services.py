@@ -0,0 +1,176 @@
+from datetime import timedelta
+
+from django.db import IntegrityError, transaction
+from django.db.models import Case, F, Value, When
+from django.utils import timezone
+
+from core.codes import allocate_codes
+from .cache import bump_tour_version
+from .models import Concert, Ticket, WaitlistEntry
+
+# Сколько действует предложение билета из листа ожидания
+WAITLIST_OFFER_TTL = timedelta(minutes=15)
+
+
+class TicketPurchaseError(Exception):
+    """Билеты не могут быть куплены"""
+
+
+class SoldOutError(TicketPurchaseError):
+    """Недостаточно свободных мест"""
+
+
+class WaitlistError(TicketPurchaseError):
+    """Операция с листом ожидания невозможна"""
+
+
+def purchase_tickets(concert, user, quantity=1):
+    """
+    Покупка quantity билетов на концерт.
+
+    Места резервируются одним условным UPDATE: счетчик растет только если
+    после покупки sold_tickets не превысит total_tickets, статус 'soldout'
+    выставляется в том же запросе. Параллельные покупки не читают счетчик,
+    поэтому продать больше мест, чем есть, невозможно. Места, отложенные
+    для листа ожидания (held_tickets), в свободную продажу не попадают.
+    """
+    if quantity < 1:
+        raise TicketPurchaseError('Количество билетов должно быть положительным')
+
+    with transaction.atomic():
+        reserved = Concert.objects.filter(
+            pk=concert.pk,
+            status='upcoming',
+            date__gt=timezone.now(),
+            sold_tickets__lte=F('total_tickets') - F('held_tickets') - quantity,
+        ).update(
+            sold_tickets=F('sold_tickets') + quantity,
+            # В SET используются значения строки до обновления
+            status=Case(
+                When(
+                    sold_tickets__gte=F('total_tickets') - F('held_tickets') - quantity,
+                    then=Value('soldout')
+                ),
+                default=F('status'),
+            ),
+        )
+        if not reserved:
+            raise SoldOutError(f'Недостаточно билетов на концерт: {concert}')
+
+        concert.refresh_from_db(fields=['sold_tickets', 'status'])
+        transaction.on_commit(bump_tour_version)
+        return _create_tickets(concert, user, quantity)
+
+
+def join_waitlist(concert, user):
+    """
+    Запись в лист ожидания распроданного концерта.
+
+    Позиция берется из счетчика waitlist_tail одним UPDATE, повторная
+    запись возвращает существующую позицию. Если параллельный запрос того
+    же пользователя успел создать запись, откатывается и увеличение
+    счетчика, поэтому в очереди не остается пустых позиций.
+    """
+    existing = get_waitlist_entry(concert, user)
+    if existing:
+        return existing
+
+    try:
+        with transaction.atomic():
+            opened = Concert.objects.upcoming().filter(pk=concert.pk).exclude(
+                status='upcoming',
+                sold_tickets__lt=F('total_tickets') - F('held_tickets')
+            ).update(waitlist_tail=F('waitlist_tail') + 1)
+            if not opened:
+                raise WaitlistError('Лист ожидания доступен только для распроданных концертов')
+
+            position = Concert.objects.filter(pk=concert.pk).values_list('waitlist_tail', flat=True).get()
+            return WaitlistEntry.objects.create(concert=concert, user=user, position=position)
+    except IntegrityError:
+        return WaitlistEntry.objects.get(concert=concert, user=user)
+
+
+def get_waitlist_entry(concert, user):
+    """Запись пользователя в листе ожидания (один запрос по уникальному индексу) или None"""
+    return WaitlistEntry.objects.select_related('concert').filter(concert=concert, user=user).first()
+
+
+def release_waitlist_offers(concert, batch_size=100, ttl=WAITLIST_OFFER_TTL):
+    """
+    Предложение освободившихся мест следующим batch_size записям листа ожидания.
+
+    Просроченные предложения возвращают места, затем свободные места
+    откладываются (held_tickets) под новые предложения. Работа ограничена
+    размером пачки и не зависит от длины очереди. Возвращает количество
+    выданных предложений.
+    """
+    now = timezone.now()
+    with transaction.atomic():
+        # Блокировка концерта упорядочивает параллельные запуски
+        concert = Concert.objects.select_for_update().get(pk=concert.pk)
+
+        expired = WaitlistEntry.objects.filter(
+            concert=concert,
+            status='offered',
+            offer_expires_at__lte=now
+        ).update(status='expired')
+        concert.held_tickets -= expired
+
+        free = min(batch_size, max(concert.available_tickets, 0))
+        entries = list(
+            WaitlistEntry.objects.filter(
+                concert=concert,
+                status='waiting',
+                position__gt=concert.waitlist_head
+            ).order_by('position').values_list('pk', 'position')[:free]
+        ) if free else []
+
+        if entries:
+            WaitlistEntry.objects.filter(pk__in=[pk for pk, _ in entries]).update(
+                status='offered',
+                offer_expires_at=now + ttl
+            )
+            concert.held_tickets += len(entries)
+            concert.waitlist_head = entries[-1][1]
+
+        if expired or entries:
+            Concert.objects.filter(pk=concert.pk).update(
+                held_tickets=F('held_tickets') - expired + len(entries),
+                waitlist_head=concert.waitlist_head
+            )
+            transaction.on_commit(bump_tour_version)
+
+    return len(entries)
+
+
+def claim_waitlist_offer(entry):
+    """Покупка билета по действующему предложению из листа ожидания"""
+    with transaction.atomic():
+        claimed = WaitlistEntry.objects.filter(
+            pk=entry.pk,
+            status='offered',
+            offer_expires_at__gt=timezone.now()
+        ).update(status='purchased')
+        if not claimed:
+            raise WaitlistError('Предложение недействительно или истекло')
+
+        # Отложенное место переходит в проданные
+        moved = Concert.objects.filter(pk=entry.concert_id, held_tickets__gte=1).update(
+            held_tickets=F('held_tickets') - 1,
+            sold_tickets=F('sold_tickets') + 1,
+        )
+        if not moved:
+            # Без отложенного места билет продал бы место сверх total_tickets
+            raise WaitlistError('Для предложения нет отложенного места')
+        entry.status = 'purchased'
+        transaction.on_commit(bump_tour_version)
+        concert = Concert.objects.get(pk=entry.concert_id)
+        return _create_tickets(concert, entry.user, 1)[0]
+
+
+def _create_tickets(concert, user, quantity):
+    numbers = allocate_codes(Ticket.get_number_prefix(concert), quantity, width=4)
+    return Ticket.objects.bulk_create([
+        Ticket(concert=concert, user=user, ticket_number=number, price_paid=concert.price)
+        for number in numbers
+    ])
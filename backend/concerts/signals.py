@@ -0,0 +1,14 @@
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .cache import bump_tour_version
+from .models import Concert, Ticket
+
+
+@receiver(post_save, sender=Concert)
+@receiver(post_save, sender=Ticket)
+@receiver(post_delete, sender=Concert)
+@receiver(post_delete, sender=Ticket)
+def invalidate_tour_calendar(sender, **kwargs):
+    transaction.on_commit(bump_tour_version)
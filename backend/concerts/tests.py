@@ -1,6 +1,21 @@
-from django.test import TestCase
+import threading
+
+from io import StringIO
+from unittest import mock
+
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase, TransactionTestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
 from django.contrib.auth import get_user_model
-from concerts.models import Concert, Ticket
+from concerts.cache import get_tour_version, tour_calendar
+from concerts.models import Concert, Ticket, WaitlistEntry
+from concerts.services import (
+    SoldOutError, TicketPurchaseError, WaitlistError, claim_waitlist_offer, get_waitlist_entry,
+    join_waitlist, purchase_tickets, release_waitlist_offers,
+)
 from django.utils import timezone
 from datetime import timedelta
 
@@ -167,4 +182,442 @@ class TicketModelTest(TestCase):
         )
 
         self.assertEqual(self.ticket.discount_code, discount)
-        self.assertEqual(discount.ticket, self.ticket)
\ No newline at end of file
+        self.assertEqual(discount.ticket, self.ticket)
+
+
+class ConcertStatusTest(TestCase):
+    """Тесты пакетного обновления статусов концертов"""
+
+    def setUp(self):
+        now = timezone.now()
+        self.past = Concert.objects.create(
+            venue='Клуб 1', city='Москва', date=now + timedelta(days=1), price=1500
+        )
+        Concert.objects.filter(pk=self.past.pk).update(date=now - timedelta(days=1))
+        self.full = Concert.objects.create(
+            venue='Клуб 2', city='СПб', date=now + timedelta(days=5), price=1500, total_tickets=50
+        )
+        Concert.objects.filter(pk=self.full.pk).update(sold_tickets=50)
+        self.future = Concert.objects.create(
+            venue='Клуб 3', city='Казань', date=now + timedelta(days=10), price=1500
+        )
+        self.cancelled = Concert.objects.create(
+            venue='Клуб 4', city='Казань', date=now + timedelta(days=12), price=1500, status='cancelled'
+        )
+
+    def test_upcoming_ignores_stale_status(self):
+        """Прошедший концерт со статусом 'upcoming' не попадает в предстоящие"""
+        self.assertEqual(list(Concert.objects.upcoming()), [self.full, self.future])
+
+    def test_update_statuses(self):
+        with self.assertNumQueries(2):
+            completed, soldout = Concert.objects.update_statuses()
+
+        self.assertEqual((completed, soldout), (1, 1))
+        statuses = dict(Concert.objects.values_list('venue', 'status'))
+        self.assertEqual(statuses, {
+            'Клуб 1': 'completed',
+            'Клуб 2': 'soldout',
+            'Клуб 3': 'upcoming',
+            'Клуб 4': 'cancelled',
+        })
+
+    def test_command(self):
+        out = StringIO()
+        call_command('update_concert_statuses', stdout=out)
+        self.assertIn('Завершено концертов: 1, распродано: 1', out.getvalue())
+        self.assertEqual(Concert.objects.update_statuses(), (0, 0))
+
+
+class TourCalendarTest(TestCase):
+    """Тесты календаря тура"""
+
+    def setUp(self):
+        cache.clear()
+        now = timezone.now()
+        self.user = User.objects.create_user(email='fan@example.com')
+        self.moscow = Concert.objects.create(
+            venue='ГлавClub', city='Москва', date=now + timedelta(days=10), price=2000, total_tickets=5
+        )
+        self.spb = Concert.objects.create(
+            venue='Клуб', city='Санкт-Петербург', date=now + timedelta(days=5), price=1800,
+            total_tickets=5, sold_tickets=5
+        )
+        self.minsk = Concert.objects.create(
+            venue='Re:Public', city='Минск', country='Беларусь', date=now + timedelta(days=20), price=1500
+        )
+        self.past = Concert.objects.create(
+            venue='Старый клуб', city='Москва', date=now + timedelta(days=1), price=1000
+        )
+        Concert.objects.filter(pk=self.past.pk).update(date=now - timedelta(days=1))
+
+    def test_grouped_by_country_and_city(self):
+        calendar = tour_calendar()
+
+        self.assertEqual([group['country'] for group in calendar], ['Беларусь', 'Россия'])
+        russia = calendar[1]['cities']
+        self.assertEqual([city['city'] for city in russia], ['Москва', 'Санкт-Петербург'])
+        moscow = russia[0]['concerts']
+        self.assertEqual([concert['id'] for concert in moscow], [self.moscow.pk])
+        self.assertEqual((moscow[0]['available_tickets'], moscow[0]['is_sold_out']), (5, False))
+        self.assertTrue(russia[1]['concerts'][0]['is_sold_out'])
+
+    def test_served_from_cache(self):
+        tour_calendar()
+        with self.assertNumQueries(0):
+            tour_calendar()
+
+    def test_ticket_purchase_invalidates(self):
+        """Покупка билетов сбрасывает календарь после коммита"""
+        tour_calendar()
+        version = get_tour_version()
+
+        with self.captureOnCommitCallbacks(execute=True):
+            purchase_tickets(self.moscow, self.user, quantity=2)
+
+        self.assertNotEqual(get_tour_version(), version)
+        moscow = tour_calendar()[1]['cities'][0]['concerts'][0]
+        self.assertEqual(moscow['available_tickets'], 3)
+
+    def test_concert_changes_invalidate(self):
+        tour_calendar()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.minsk.delete()
+        self.assertEqual([group['country'] for group in tour_calendar()], ['Россия'])
+
+
+class TicketPurchaseTest(TestCase):
+    """Тесты покупки билетов"""
+
+    def setUp(self):
+        self.user = User.objects.create_user(email='fan@example.com', password='testpass123')
+        self.concert = Concert.objects.create(
+            venue='ГлавClub',
+            city='Москва',
+            date=timezone.now() + timedelta(days=30),
+            price=2000,
+            total_tickets=5,
+            sold_tickets=2
+        )
+
+    def test_purchase_creates_tickets(self):
+        tickets = purchase_tickets(self.concert, self.user, quantity=2)
+
+        self.assertEqual(len(tickets), 2)
+        self.assertEqual(len({ticket.ticket_number for ticket in tickets}), 2)
+        self.assertTrue(all(t.ticket_number.startswith('WLQ-МОС-') for t in tickets))
+        self.assertEqual(self.concert.sold_tickets, 4)
+        self.assertEqual(self.concert.status, 'upcoming')
+        self.assertEqual(Ticket.objects.filter(concert=self.concert).count(), 2)
+
+    def test_last_seats_flip_status(self):
+        """Покупка последних мест выставляет статус 'soldout' тем же запросом"""
+        with CaptureQueriesContext(connection) as queries:
+            purchase_tickets(self.concert, self.user, quantity=3)
+        updates = [q['sql'] for q in queries if q['sql'].startswith('UPDATE "concerts_concert"')]
+        self.assertEqual(len(updates), 1)
+
+        self.concert.refresh_from_db()
+        self.assertEqual(self.concert.sold_tickets, 5)
+        self.assertEqual(self.concert.status, 'soldout')
+
+    def test_oversell_rejected(self):
+        with self.assertRaises(SoldOutError):
+            purchase_tickets(self.concert, self.user, quantity=4)
+
+        self.concert.refresh_from_db()
+        self.assertEqual(self.concert.sold_tickets, 2)
+        self.assertFalse(Ticket.objects.exists())
+
+    def test_cancelled_concert_rejected(self):
+        self.concert.status = 'cancelled'
+        self.concert.save()
+        with self.assertRaises(SoldOutError):
+            purchase_tickets(self.concert, self.user)
+
+    def test_stale_save_keeps_sales(self):
+        """Сохранение устаревшего экземпляра не возвращает проданные места"""
+        stale = Concert.objects.get(pk=self.concert.pk)
+        purchase_tickets(self.concert, self.user, quantity=3)
+
+        stale.venue = 'Известия Hall'
+        stale.save()
+
+        self.concert.refresh_from_db()
+        self.assertEqual(self.concert.venue, 'Известия Hall')
+        self.assertEqual(self.concert.sold_tickets, 5)
+        self.assertEqual(self.concert.status, 'soldout')
+        with self.assertRaises(SoldOutError):
+            purchase_tickets(self.concert, self.user)
+
+    def test_full_save_writes_changed_status(self):
+        """Статус, измененный вручную или проверками save(), попадает в БД"""
+        self.concert.status = 'cancelled'
+        self.concert.save()
+        self.assertEqual(Concert.objects.get(pk=self.concert.pk).status, 'cancelled')
+
+        concert = Concert.objects.get(pk=self.concert.pk)
+        concert.status = 'upcoming'
+        concert.total_tickets = 2
+        concert.save()
+        self.assertEqual(concert.status, 'soldout')
+        self.assertEqual(Concert.objects.get(pk=self.concert.pk).status, 'soldout')
+
+    def test_correct_sold_tickets(self):
+        """Корректировка от значения в БД пересчитывает статус"""
+        concerts = Concert.objects.filter(pk=self.concert.pk)
+
+        self.assertEqual(concerts.correct_sold_tickets(3), 1)
+        self.concert.refresh_from_db()
+        self.assertEqual((self.concert.sold_tickets, self.concert.status), (5, 'soldout'))
+
+        self.assertEqual(concerts.correct_sold_tickets(-1), 1)
+        self.concert.refresh_from_db()
+        self.assertEqual((self.concert.sold_tickets, self.concert.status), (4, 'upcoming'))
+
+        self.assertEqual(concerts.correct_sold_tickets(-10), 0)
+        self.concert.refresh_from_db()
+        self.assertEqual(self.concert.sold_tickets, 4)
+
+    def test_invalid_quantity(self):
+        with self.assertRaises(TicketPurchaseError):
+            purchase_tickets(self.concert, self.user, quantity=0)
+
+
+class WaitlistTest(TestCase):
+    """Тесты листа ожидания"""
+
+    def setUp(self):
+        self.concert = Concert.objects.create(
+            venue='ГлавClub',
+            city='Москва',
+            date=timezone.now() + timedelta(days=30),
+            price=2000,
+            total_tickets=10,
+            sold_tickets=10
+        )
+        self.users = [User.objects.create_user(email=f'fan{i}@example.com') for i in range(5)]
+        self.entries = [join_waitlist(self.concert, user) for user in self.users]
+
+    def free_seats(self, count):
+        Concert.objects.filter(pk=self.concert.pk).update(sold_tickets=10 - count, status='soldout')
+
+    def test_positions_in_join_order(self):
+        self.assertEqual([entry.position for entry in self.entries], [1, 2, 3, 4, 5])
+        self.assertEqual(join_waitlist(self.concert, self.users[0]), self.entries[0])
+
+    def test_concurrent_duplicate_join_keeps_positions(self):
+        """Повторная запись, прошедшая проверку параллельно, не оставляет пустой позиции"""
+        with mock.patch('concerts.services.get_waitlist_entry', return_value=None):
+            self.assertEqual(join_waitlist(self.concert, self.users[0]), self.entries[0])
+
+        self.concert.refresh_from_db()
+        self.assertEqual(self.concert.waitlist_tail, 5)
+        user = User.objects.create_user(email='late@example.com')
+        self.assertEqual(join_waitlist(self.concert, user).position, 6)
+
+    def test_join_rejected_while_tickets_available(self):
+        concert = Concert.objects.create(
+            venue='Клуб', city='СПб', date=timezone.now() + timedelta(days=5), price=1500
+        )
+        with self.assertRaises(WaitlistError):
+            join_waitlist(concert, self.users[0])
+
+    def test_position_lookup(self):
+        """Позиция считается одним запросом по счетчикам концерта"""
+        with self.assertNumQueries(1):
+            entry = get_waitlist_entry(self.concert, self.users[3])
+            self.assertEqual(entry.people_ahead, 3)
+
+        self.free_seats(2)
+        release_waitlist_offers(self.concert)
+        self.assertEqual(get_waitlist_entry(self.concert, self.users[3]).people_ahead, 1)
+
+    def test_release_offers_next_entries(self):
+        self.free_seats(2)
+        self.assertEqual(release_waitlist_offers(self.concert), 2)
+
+        self.concert.refresh_from_db()
+        self.assertEqual(self.concert.held_tickets, 2)
+        self.assertEqual(self.concert.available_tickets, 0)
+        self.assertEqual(
+            list(WaitlistEntry.objects.filter(status='offered').values_list('position', flat=True)),
+            [1, 2]
+        )
+        # Свободных мест больше нет - новых предложений тоже
+        self.assertEqual(release_waitlist_offers(self.concert), 0)
+
+    def test_held_seats_not_sold_publicly(self):
+        self.free_seats(1)
+        Concert.objects.filter(pk=self.concert.pk).update(status='upcoming')
+        release_waitlist_offers(self.concert)
+        with self.assertRaises(SoldOutError):
+            purchase_tickets(self.concert, self.users[4])
+
+    def test_claim_offer(self):
+        self.free_seats(1)
+        release_waitlist_offers(self.concert)
+
+        ticket = claim_waitlist_offer(self.entries[0])
+
+        self.assertEqual(ticket.user, self.users[0])
+        self.concert.refresh_from_db()
+        self.assertEqual((self.concert.sold_tickets, self.concert.held_tickets), (10, 0))
+        with self.assertRaises(WaitlistError):
+            claim_waitlist_offer(self.entries[0])
+
+    def test_claim_without_held_seat_rejected(self):
+        """Предложение без отложенного места не продает билет сверх лимита"""
+        self.free_seats(1)
+        release_waitlist_offers(self.concert)
+        Concert.objects.filter(pk=self.concert.pk).update(held_tickets=0)
+
+        with self.assertRaises(WaitlistError):
+            claim_waitlist_offer(self.entries[0])
+
+        self.concert.refresh_from_db()
+        self.assertEqual(self.concert.sold_tickets, 9)
+        self.assertFalse(Ticket.objects.filter(concert=self.concert).exists())
+        self.entries[0].refresh_from_db()
+        self.assertEqual(self.entries[0].status, 'offered')
+
+    def test_expired_offer_passes_to_next(self):
+        self.free_seats(1)
+        release_waitlist_offers(self.concert, ttl=timedelta(0))
+
+        self.assertEqual(release_waitlist_offers(self.concert), 1)
+        statuses = dict(WaitlistEntry.objects.values_list('position', 'status'))
+        self.assertEqual((statuses[1], statuses[2]), ('expired', 'offered'))
+        with self.assertRaises(WaitlistError):
+            claim_waitlist_offer(self.entries[0])
+
+    def test_concert_save_keeps_waitlist_counters(self):
+        stale = Concert.objects.get(pk=self.concert.pk)
+        self.free_seats(1)
+        release_waitlist_offers(self.concert)
+
+        stale.price = 2500
+        stale.save()
+        stale.refresh_from_db()
+        self.assertEqual((stale.held_tickets, stale.waitlist_head, stale.waitlist_tail), (1, 1, 5))
+
+    def test_release_command(self):
+        self.free_seats(3)
+        out = StringIO()
+        call_command('release_waitlist', '--batch-size', '2', stdout=out)
+        self.assertIn('Выдано предложений: 2', out.getvalue())
+
+
+class ConcertAdminTest(TestCase):
+    """Изменение продаж концерта через админку"""
+
+    def setUp(self):
+        admin_user = User.objects.create_superuser(email='admin@example.com', password='admin123')
+        self.client.force_login(admin_user)
+        self.concert = Concert.objects.create(
+            venue='ГлавClub',
+            city='Москва',
+            date=timezone.now() + timedelta(days=30),
+            price=2000,
+            total_tickets=5,
+            sold_tickets=2
+        )
+        self.url = reverse('admin:concerts_concert_change', args=[self.concert.pk])
+
+    def form_data(self):
+        date = timezone.localtime(self.concert.date)
+        return {
+            'venue': 'ГлавClub',
+            'city': 'Москва',
+            'country': 'Россия',
+            'date_0': date.strftime('%Y-%m-%d'),
+            'date_1': date.strftime('%H:%M:%S'),
+            'price': '2000',
+            'ticket_url': '',
+            'total_tickets': '5',
+            'status': 'upcoming',
+            'sold_tickets_correction': '',
+            'tickets-TOTAL_FORMS': '0',
+            'tickets-INITIAL_FORMS': '0',
+            'tickets-MIN_NUM_FORMS': '0',
+            'tickets-MAX_NUM_FORMS': '1000',
+        }
+
+    def post(self, **data):
+        response = self.client.post(self.url, {**self.form_data(), **data})
+        self.assertEqual(response.status_code, 302)
+        self.concert.refresh_from_db()
+
+    def test_correction_applied_to_current_value(self):
+        """Корректировка прибавляется к значению в БД, а не к значению формы"""
+        Concert.objects.filter(pk=self.concert.pk).correct_sold_tickets(1)
+
+        self.post(sold_tickets_correction='2')
+
+        self.assertEqual(self.concert.sold_tickets, 5)
+        self.assertEqual(self.concert.status, 'soldout')
+
+    def test_correction_on_create(self):
+        """Корректировка при добавлении концерта применяется к новой строке"""
+        response = self.client.post(reverse('admin:concerts_concert_add'), {
+            **self.form_data(),
+            'venue': 'Известия Hall',
+            'sold_tickets_correction': '3',
+        })
+        self.assertEqual(response.status_code, 302)
+
+        concert = Concert.objects.get(venue='Известия Hall')
+        self.assertEqual(concert.sold_tickets, 3)
+
+    def test_status_change(self):
+        """Явно измененный статус сохраняется"""
+        self.post(status='cancelled')
+
+        self.assertEqual(self.concert.status, 'cancelled')
+        self.assertEqual(self.concert.sold_tickets, 2)
+
+
+class TicketPurchaseConcurrencyTest(TransactionTestCase):
+    """Нагрузочный тест: параллельные покупки последних мест"""
+
+    buyers = 30
+    seats = 10
+
+    def setUp(self):
+        self.concert = Concert.objects.create(
+            venue='ГлавClub',
+            city='Москва',
+            date=timezone.now() + timedelta(days=30),
+            price=2000,
+            total_tickets=self.seats
+        )
+        self.users = [
+            User.objects.create_user(email=f'fan{i}@example.com', password='testpass123')
+            for i in range(self.buyers)
+        ]
+
+    def test_concurrent_purchases_do_not_oversell(self):
+        results = []
+        barrier = threading.Barrier(self.buyers)
+
+        def buy(user):
+            try:
+                barrier.wait()
+                purchase_tickets(Concert.objects.get(pk=self.concert.pk), user)
+                results.append('ok')
+            except SoldOutError:
+                results.append('rejected')
+            finally:
+                connection.close()
+
+        threads = [threading.Thread(target=buy, args=(user,)) for user in self.users]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.concert.refresh_from_db()
+        self.assertEqual(results.count('ok'), self.seats)
+        self.assertEqual(self.concert.sold_tickets, self.seats)
+        self.assertEqual(self.concert.status, 'soldout')
+        self.assertEqual(Ticket.objects.filter(concert=self.concert).count(), self.seats)
@@ -12,6 +12,8 @@ https://docs.djangoproject.com/en/4.2/ref/settings/
 
 from pathlib import Path
 
+from decouple import config
+
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent
 
@@ -80,13 +82,95 @@ WSGI_APPLICATION = 'config.wsgi.application'
 # Database
 # https://docs.djangoproject.com/en/4.2/ref/settings/#databases
 
-DATABASES = {
+# Постоянные соединения: сколько секунд держать соединение между запросами
+DB_CONN_MAX_AGE = config('DB_CONN_MAX_AGE', default=60, cast=int)
+
+if config('DB_HOST', default=''):
+    DATABASES = {
+        'default': {
+            'ENGINE': 'django.db.backends.postgresql',
+            'NAME': config('DB_NAME'),
+            'USER': config('DB_USER'),
+            'PASSWORD': config('DB_PASSWORD'),
+            'HOST': config('DB_HOST'),
+            'PORT': config('DB_PORT', default='5432'),
+            'CONN_MAX_AGE': DB_CONN_MAX_AGE,
+            'CONN_HEALTH_CHECKS': True,
+            'OPTIONS': {
+                'connect_timeout': config('DB_CONNECT_TIMEOUT', default=5, cast=int),
+            },
+        }
+    }
+else:
+    DATABASES = {
+        'default': {
+            'ENGINE': 'django.db.backends.sqlite3',
+            'NAME': BASE_DIR / 'db.sqlite3',
+            'CONN_MAX_AGE': DB_CONN_MAX_AGE,
+            'CONN_HEALTH_CHECKS': True,
+            # Запись в SQLite идет по одной: параллельные транзакции ждут
+            # блокировку файла, а не падают сразу с "database is locked"
+            'OPTIONS': {
+                'timeout': 20,
+            },
+            # Тестовая БД в файле, чтобы нагрузочные тесты из нескольких
+            # потоков работали с одной базой
+            'TEST': {
+                'NAME': BASE_DIR / 'test_db.sqlite3',
+            },
+        }
+    }
+
+# Реплика для чтения каталога (необязательна)
+if config('DB_REPLICA_HOST', default=''):
+    DATABASES['replica'] = {
+        **DATABASES['default'],
+        'HOST': config('DB_REPLICA_HOST'),
+        'PORT': config('DB_REPLICA_PORT', default=DATABASES['default'].get('PORT', '5432')),
+        'TEST': {'MIRROR': 'default'},
+    }
+
+DATABASE_ROUTERS = ['config.db_routers.PrimaryReplicaRouter']
+
+# Модели каталога, которые читаются с реплики вне транзакций
+DATABASE_REPLICA_MODELS = [
+    'music.Release',
+    'music.Track',
+    'merch.Product',
+    'merch.SKU',
+    'merch.ProductImage',
+    'concerts.Concert',
+]
+
+
+# Cache
+# https://docs.djangoproject.com/en/4.2/topics/cache/
+# В разработке locmem, в продакшене общий бэкенд, например
+# CACHE_BACKEND=django.core.cache.backends.redis.RedisCache CACHE_LOCATION=redis://redis:6379/1
+
+CACHES = {
     'default': {
-        'ENGINE': 'django.db.backends.sqlite3',
-        'NAME': BASE_DIR / 'db.sqlite3',
+        'BACKEND': config('CACHE_BACKEND', default='django.core.cache.backends.locmem.LocMemCache'),
+        'LOCATION': config('CACHE_LOCATION', default='musician-website'),
+        'TIMEOUT': config('CACHE_TIMEOUT', default=300, cast=int),
     }
 }
 
+# Время жизни закэшированных списков каталога мерча, секунд
+CATALOG_CACHE_TIMEOUT = config('CATALOG_CACHE_TIMEOUT', default=300, cast=int)
+
+# Время жизни закэшированного календаря тура, секунд
+TOUR_CALENDAR_CACHE_TIMEOUT = config('TOUR_CALENDAR_CACHE_TIMEOUT', default=300, cast=int)
+
+# Кэш промо-кодов: общий (секунд) и в памяти процесса (секунд)
+DISCOUNT_CODE_CACHE_TIMEOUT = config('DISCOUNT_CODE_CACHE_TIMEOUT', default=3600, cast=int)
+DISCOUNT_CODE_LOCAL_TTL = config('DISCOUNT_CODE_LOCAL_TTL', default=5, cast=int)
+
+# Списки админки больших таблиц: с какой оценки планировщика количество строк
+# не пересчитывается точно, и время жизни кэша навигации по датам, секунд
+ADMIN_ESTIMATED_COUNT_THRESHOLD = config('ADMIN_ESTIMATED_COUNT_THRESHOLD', default=100000, cast=int)
+ADMIN_DATE_HIERARCHY_CACHE_TIMEOUT = config('ADMIN_DATE_HIERARCHY_CACHE_TIMEOUT', default=600, cast=int)
+
 
 # Password validation
 # https://docs.djangoproject.com/en/4.2/ref/settings/#auth-password-validators
@@ -131,3 +215,6 @@ AUTH_USER_MODEL = 'core.User'
 
 
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
+
+# Размер блока номеров, резервируемого процессом для генерации кодов (core.codes)
+CODE_SEQUENCE_BLOCK_SIZE = 100
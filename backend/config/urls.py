@@ -6,7 +6,7 @@ from django.urls import path, include
 
 urlpatterns = [
     path('admin/', admin.site.urls),
-    # path('core/', include('core.urls')),
+    path('core/', include('core.urls')),
 
     # path('music/', include('music.urls')),
     # path('merch/', include('merch.urls')),
@@ -8,7 +8,7 @@ from .models import User, Subscriber
 class UserAdmin(BaseUserAdmin):
     list_display = ('email', 'first_name', 'last_name', 'is_staff', 'is_active', 'created_at')
     list_display_links = ('email',)
-    list_filter = ('is_staff', 'is_active', 'created_at')
+    list_filter = ('is_staff', 'is_active', 'newsletter_opt_in', 'created_at')
     search_fields = ('email', 'first_name', 'last_name')
     ordering = ('-created_at',)
     date_hierarchy = 'created_at'
@@ -16,7 +16,7 @@ class UserAdmin(BaseUserAdmin):
 
     fieldsets = (
         (None, {'fields': ('email', 'password')}),
-        (_('Персональная информация'), {'fields': ('first_name', 'last_name')}),
+        (_('Персональная информация'), {'fields': ('first_name', 'last_name', 'newsletter_opt_in')}),
         (_('Права доступа'), {
             'fields': ('is_active', 'is_staff', 'is_superuser', 'groups', 'user_permissions'),
         }),
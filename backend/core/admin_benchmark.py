@@ -0,0 +1,125 @@
+"""
+Замеры страниц админки: количество запросов, время и пиковая память.
+
+Для каждой зарегистрированной модели открывается список объектов при
+нескольких размерах страницы и страница редактирования первого объекта.
+Представления вызываются напрямую с запросом от RequestFactory, ответ
+рендерится полностью, поэтому учитываются и запросы из шаблонов.
+
+Количество запросов списка не должно зависеть от размера страницы: рост
+означает запрос на каждую строку (N+1) в колонке или __str__ связанного объекта.
+Перед каждым замером страница открывается один раз без учета, чтобы все
+размеры страницы мерились с одинаково заполненными кэшами (например,
+навигации по датам): иначе экономия на кэше первого размера может скрыть N+1.
+"""
+import time
+import tracemalloc
+from typing import NamedTuple
+
+from django.contrib import admin
+from django.db import connection
+from django.test import RequestFactory
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+
+class AdminMeasurement(NamedTuple):
+    """Результат замера одной страницы админки"""
+    label: str
+    view: str
+    page_size: object
+    rows: int
+    queries: int
+    seconds: float
+    peak_kb: int
+
+
+def measure(view, request):
+    """
+    Вызов представления с полным рендерингом ответа после прогревочного вызова.
+    Возвращает (ответ, запросов, секунд, пик памяти в КБ).
+    """
+    _render(view(request))
+    with CaptureQueriesContext(connection) as queries:
+        started = time.perf_counter()
+        response = _render(view(request))
+        seconds = time.perf_counter() - started
+
+    # Память замеряется отдельным вызовом: tracemalloc замедляет выполнение
+    tracemalloc.start()
+    try:
+        _render(view(request))
+        peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+    return response, len(queries), seconds, peak // 1024
+
+
+def benchmark_admin(user, page_sizes=(20, 100), site=admin.site, labels=None):
+    """
+    Замеры списков и страниц редактирования всех моделей сайта админки
+    (или только перечисленных в labels, например 'orders.Order').
+    """
+    factory = RequestFactory()
+    results = []
+    for model, model_admin in sorted(site._registry.items(), key=lambda item: item[0]._meta.label):
+        label = model._meta.label
+        if labels and label not in labels:
+            continue
+        info = (model._meta.app_label, model._meta.model_name)
+        request = factory.get(reverse(f'{site.name}:%s_%s_changelist' % info))
+        request.user = user
+
+        default_page_size = model_admin.list_per_page
+        try:
+            for page_size in page_sizes:
+                model_admin.list_per_page = page_size
+                response, queries, seconds, peak = measure(model_admin.changelist_view, request)
+                results.append(AdminMeasurement(
+                    label, 'changelist', page_size, _rows(response), queries, seconds, peak
+                ))
+        finally:
+            model_admin.list_per_page = default_page_size
+
+        obj = model_admin.get_queryset(request).order_by().first()
+        if obj is not None:
+            object_id = str(obj.pk)
+            request = factory.get(reverse(f'{site.name}:%s_%s_change' % info, args=[object_id]))
+            request.user = user
+            response, queries, seconds, peak = measure(
+                lambda request: model_admin.change_view(request, object_id), request
+            )
+            results.append(AdminMeasurement(label, 'change', None, 1, queries, seconds, peak))
+    return results
+
+
+def find_regressions(results):
+    """
+    Списки, у которых число запросов растет с размером страницы:
+    [(label, {размер страницы: запросов}), ...]. Сравниваются только
+    замеры, где на большей странице действительно больше строк.
+    """
+    by_label = {}
+    for result in results:
+        if result.view == 'changelist':
+            by_label.setdefault(result.label, []).append(result)
+
+    regressions = []
+    for label, measurements in by_label.items():
+        measurements.sort(key=lambda result: result.page_size)
+        for smaller, larger in zip(measurements, measurements[1:]):
+            if larger.rows > smaller.rows and larger.queries > smaller.queries:
+                regressions.append((label, {result.page_size: result.queries for result in measurements}))
+                break
+    return regressions
+
+
+def _render(response):
+    if hasattr(response, 'render'):
+        response.render()
+    return response
+
+
+def _rows(response):
+    changelist = getattr(response, 'context_data', {}).get('cl')
+    return len(changelist.result_list) if changelist is not None else 0
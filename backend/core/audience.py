@@ -0,0 +1,80 @@
+"""
+Аудитория рассылки: активные подписчики и пользователи, согласившиеся на рассылку.
+
+Обе выборки читаются курсором (iterator) в порядке нормализованного email и
+сливаются heapq.merge, поэтому дубли идут подряд и отбрасываются без хранения
+всего списка в памяти. Порядок задается в БД побайтовой сортировкой, чтобы он
+совпадал со сравнением строк в Python.
+"""
+import csv
+import heapq
+import json
+from itertools import groupby
+
+from django.db import connections
+from django.db.models import Value
+from django.db.models.functions import Collate, Lower
+
+from .models import Subscriber, User
+
+EXPORT_FORMATS = ('csv', 'ndjson')
+EXPORT_FIELDS = ('email', 'first_name', 'last_name', 'sources')
+
+
+def _ordered(queryset, source, fields, chunk_size):
+    key = Lower('email')
+    if connections[queryset.db].vendor == 'postgresql':
+        # Сортировка по умолчанию зависит от локали БД
+        key = Collate(key, 'C')
+    return (
+        queryset.annotate(email_key=key, source=Value(source))
+        .order_by('email_key')
+        .values('email_key', 'email', 'source', *fields)
+        .iterator(chunk_size=chunk_size)
+    )
+
+
+def iter_audience(chunk_size=2000):
+    """
+    Адресаты рассылки без повторов, по возрастанию email.
+    Каждая запись: {'email', 'first_name', 'last_name', 'sources'}.
+    """
+    subscribers = _ordered(Subscriber.objects.filter(is_active=True), 'subscriber', (), chunk_size)
+    users = _ordered(
+        User.objects.filter(is_active=True, newsletter_opt_in=True),
+        'user',
+        ('first_name', 'last_name'),
+        chunk_size
+    )
+
+    merged = heapq.merge(subscribers, users, key=lambda row: row['email_key'])
+    for email_key, rows in groupby(merged, key=lambda row: row['email_key']):
+        rows = list(rows)
+        user = next((row for row in rows if row['source'] == 'user'), None)
+        yield {
+            'email': email_key,
+            'first_name': user['first_name'] if user else '',
+            'last_name': user['last_name'] if user else '',
+            'sources': ','.join(sorted({row['source'] for row in rows})),
+        }
+
+
+class _Echo:
+    """Псевдофайл для csv.writer: возвращает строку вместо записи"""
+
+    def write(self, value):
+        return value
+
+
+def render_audience(records, export_format='csv'):
+    """Строки выгрузки в формате CSV или NDJSON, по одной на адресата"""
+    if export_format == 'csv':
+        writer = csv.writer(_Echo())
+        yield writer.writerow(EXPORT_FIELDS)
+        for record in records:
+            yield writer.writerow([record[field] for field in EXPORT_FIELDS])
+    elif export_format == 'ndjson':
+        for record in records:
+            yield json.dumps(record, ensure_ascii=False) + '\n'
+    else:
+        raise ValueError(f'Неизвестный формат выгрузки: {export_format}')
@@ -0,0 +1,34 @@
+"""
+Версии ключей общего кэша.
+
+Закэшированные данные хранятся под ключами с номером версии. Изменение
+данных увеличивает версию, и старые записи просто перестают читаться, а
+затем вытесняются по таймауту. Версию увеличивают после коммита, иначе
+кэш может успеть заполниться данными, которые еще не видны другим
+соединениям.
+"""
+import time
+
+from django.core.cache import cache
+
+
+def _initial_version():
+    # Версия из времени не совпадет с версиями, вытесненными из кэша ранее
+    return int(time.time() * 1000)
+
+
+def get_version(key):
+    """Текущая версия, хранящаяся под ключом key"""
+    version = cache.get(key)
+    if version is None:
+        cache.add(key, _initial_version(), timeout=None)
+        version = cache.get(key)
+    return version
+
+
+def bump_version(key):
+    """Увеличение версии под ключом key: все записи старой версии перестают читаться"""
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.set(key, _initial_version(), timeout=None)
@@ -0,0 +1,100 @@
+"""
+Генерация уникальных кодов: номера заказов, номера билетов, артикулы.
+
+Код состоит из префикса и порядкового номера в алфавите 0-9A-Z. Для каждого
+префикса в таблице CodeSequence хранится счетчик, из которого процессы
+резервируют блоки номеров одним UPDATE. Номера внутри префикса не повторяются,
+поэтому повторные попытки при вставке не нужны, а коды одного процесса
+возрастают и вставляются в конец уникального индекса.
+"""
+import os
+import string
+import threading
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.db.models import F
+
+from .models import CodeSequence
+
+# Цифры идут раньше букв, поэтому строковый порядок кодов совпадает с числовым
+ALPHABET = string.digits + string.ascii_uppercase
+
+
+def encode(value, width):
+    """Номер в алфавите 0-9A-Z, дополненный нулями до width символов"""
+    chars = []
+    while value:
+        value, remainder = divmod(value, len(ALPHABET))
+        chars.append(ALPHABET[remainder])
+    return ''.join(reversed(chars)).rjust(width, ALPHABET[0])
+
+
+class CodeAllocator:
+    """Выдача номеров из блоков, заранее зарезервированных в БД"""
+
+    def __init__(self, block_size=None):
+        self.block_size = block_size
+        self._blocks = {}
+        self._lock = threading.Lock()
+
+    def get_block_size(self):
+        return self.block_size or getattr(settings, 'CODE_SEQUENCE_BLOCK_SIZE', 100)
+
+    def reset(self):
+        """Сброс локальных блоков (например, в дочернем процессе после fork)"""
+        self._lock = threading.Lock()
+        self._blocks = {}
+
+    def allocate(self, name, count=1):
+        """Список из count новых номеров для префикса name"""
+        values = []
+        with self._lock:
+            start, end = self._blocks.pop(name, (1, 0))
+            taken = min(count, end - start + 1)
+            values.extend(range(start, start + taken))
+            if start + taken <= end:
+                self._blocks[name] = (start + taken, end)
+
+        if len(values) < count:
+            values.extend(self._reserve(name, count - len(values)))
+        return values
+
+    def _reserve(self, name, count):
+        size = max(count, self.get_block_size())
+        sequence = CodeSequence.objects.filter(name=name)
+        with transaction.atomic():
+            # UPDATE идет первым и сразу берет блокировку на запись
+            if not sequence.update(last_value=F('last_value') + size):
+                try:
+                    with transaction.atomic():
+                        CodeSequence.objects.create(name=name, last_value=size)
+                except IntegrityError:
+                    sequence.update(last_value=F('last_value') + size)
+            end = sequence.values_list('last_value', flat=True).get()
+        start = end - size + 1
+
+        if size > count:
+            spare = (start + count, end)
+            # Внутри внешней транзакции резерв может откатиться вместе с ней,
+            # поэтому остаток блока становится общим только после коммита
+            transaction.on_commit(lambda: self._keep(name, spare))
+        return range(start, start + count)
+
+    def _keep(self, name, block):
+        with self._lock:
+            self._blocks.setdefault(name, block)
+
+
+allocator = CodeAllocator()
+os.register_at_fork(after_in_child=allocator.reset)
+
+
+def next_code(prefix, width=4):
+    """Новый уникальный код вида {prefix}{номер}"""
+    return allocate_codes(prefix, 1, width)[0]
+
+
+def allocate_codes(prefix, count, width=4):
+    """Список из count новых уникальных кодов вида {prefix}{номер}"""
+    return [f"{prefix}{encode(value, width)}" for value in allocator.allocate(prefix, count)]
@@ -0,0 +1,463 @@
+"""
+Генератор синтетических данных в масштабе продакшена.
+
+Строки собираются в памяти сразу со всеми производными полями (номера,
+снэпшоты позиций, суммы заказов, счетчики концертов) и вставляются
+bulk_create пачками в порядке зависимостей, без save() и сигналов.
+
+Результат зависит только от seed и размеров: идентификаторы и коды
+вычисляются из номера строки, а случайные значения берутся из генератора,
+инициализированного seed, сущностью и номером раздела (PARTITION_SIZE строк).
+Поэтому разделы можно строить и вставлять в отдельных процессах, а результат
+не зависит от их числа.
+"""
+import hashlib
+import multiprocessing
+import random
+import uuid
+from contextlib import contextmanager
+from datetime import datetime, timedelta, timezone as dt_timezone
+from decimal import Decimal
+
+from django.apps import apps
+from django.contrib.auth.hashers import make_password
+from django.core.management.color import no_style
+from django.db import connection, connections, transaction
+
+from concerts.models import Concert, Ticket
+from core.codes import encode
+from core.models import CodeSequence, Subscriber, User
+from discounts.models import DiscountCode
+from merch.models import Product, SKU, SKUAttribute
+from orders.models import Order, OrderItem
+
+# Строк в одном разделе: единица генерации и одна транзакция вставки
+PARTITION_SIZE = 10000
+
+# Точка отсчета дат, чтобы данные не зависели от дня запуска
+ANCHOR = datetime(2025, 1, 1, tzinfo=dt_timezone.utc)
+ORDER_DAYS = 365
+MAX_CONCERTS = 365
+MAX_ITEMS_PER_ORDER = 4
+
+# Приложения, таблицы которых очищаются перед генерацией
+DATA_APPS = ('core', 'music', 'merch', 'concerts', 'orders', 'discounts')
+
+CITIES = [
+    ('Россия', 'Москва'), ('Россия', 'Санкт-Петербург'), ('Россия', 'Казань'),
+    ('Россия', 'Екатеринбург'), ('Россия', 'Новосибирск'), ('Россия', 'Нижний Новгород'),
+    ('Беларусь', 'Минск'), ('Казахстан', 'Алматы'), ('Грузия', 'Тбилиси'), ('Сербия', 'Белград'),
+]
+VENUES = ['ГлавClub', 'Adrenaline Stadium', 'Космонавт', 'A2 Green Concert', 'Base', 'Известия Hall']
+FIRST_NAMES = ['Анна', 'Иван', 'Мария', 'Олег', 'Дарья', 'Павел', 'Елена', 'Артем', 'Софья', 'Кирилл']
+LAST_NAMES = ['Иванова', 'Смирнов', 'Кузнецова', 'Попов', 'Соколова', 'Лебедев', 'Новикова', 'Морозов']
+ORDER_STATUSES = ['pending', 'paid', 'paid', 'shipped', 'delivered', 'delivered', 'cancelled']
+
+# (название, категория, цена, список характеристик)
+CATALOG = [
+    ('Футболка с логотипом', 'clothing', 2500, [
+        {'size': size, 'color': color} for color in ('Black', 'White') for size in ('S', 'M', 'L', 'XL')
+    ]),
+    ('Худи оверсайз', 'clothing', 4500, [
+        {'size': size, 'color': color} for color in ('Black', 'Gray') for size in ('S', 'M', 'L')
+    ]),
+    ('Лонгслив тура', 'clothing', 3200, [
+        {'size': size, 'color': 'Black'} for size in ('S', 'M', 'L', 'XL')
+    ]),
+    ('Значок', 'accessories', 300, [{'type': 'metal', 'size': '3cm'}]),
+    ('Шопер', 'accessories', 1200, [{'color': 'Black'}, {'color': 'Natural'}]),
+    ('Винил "Ночной полет"', 'vinyl', 3500, [{'format': '12"', 'weight': '180g'}]),
+    ('CD "Первая любовь"', 'cd', 1500, [{'format': 'CD', 'type': 'digipack'}]),
+]
+
+
+def stable_uuid(seed, entity, index):
+    """
+    UUID в формате версии 7, вычисляемый из (seed, сущность, номер строки).
+    Время и счетчик растут с номером, поэтому вставка идет в конец индекса.
+    """
+    digest = hashlib.blake2b(f'{seed}:{entity}:{index}'.encode(), digest_size=8).digest()
+    ms = int(ANCHOR.timestamp() * 1000) + index // 4096
+    value = (ms & ((1 << 48) - 1)) << 80
+    value |= 0x7 << 76
+    value |= (index % 4096) << 64
+    value |= 0b10 << 62
+    value |= int.from_bytes(digest, 'big') & ((1 << 62) - 1)
+    return uuid.UUID(int=value)
+
+
+def partition_rng(seed, entity, partition):
+    """Генератор случайных чисел раздела, не зависящий от порядка обработки"""
+    return random.Random(f'{seed}:{entity}:{partition}')
+
+
+def partitions(count):
+    """Номера разделов и диапазоны строк: [(partition, start, stop), ...]"""
+    return [
+        (number, start, min(start + PARTITION_SIZE, count))
+        for number, start in enumerate(range(0, count, PARTITION_SIZE))
+    ]
+
+
+@contextmanager
+def preserved_timestamps(*fields):
+    """
+    Временно отключает auto_now и auto_now_add, чтобы bulk_create сохранил
+    заранее посчитанные даты, а не текущее время.
+    """
+    saved = [(field, field.auto_now, field.auto_now_add) for field in fields]
+    for field, _, _ in saved:
+        field.auto_now = field.auto_now_add = False
+    try:
+        yield
+    finally:
+        for field, auto_now, auto_now_add in saved:
+            field.auto_now, field.auto_now_add = auto_now, auto_now_add
+
+
+def auto_timestamps(models):
+    """Поля моделей, которые Django заполняет текущим временем при сохранении"""
+    return [
+        field
+        for model in models
+        for field in model._meta.concrete_fields
+        if getattr(field, 'auto_now', False) or getattr(field, 'auto_now_add', False)
+    ]
+
+
+# Генератор родительского процесса, наследуется дочерними при fork
+_worker_generator = None
+
+
+def _run_worker_task(task):
+    return _worker_generator.run_task(*task)
+
+
+class ScaleDataGenerator:
+    """Заполнение базы синтетическими данными заданного размера"""
+
+    def __init__(self, seed=0, users=100000, orders=1000000, concerts=200, tickets=None,
+                 batch_size=2000, log=None):
+        if not 1 <= concerts <= MAX_CONCERTS:
+            raise ValueError(f'Количество концертов должно быть от 1 до {MAX_CONCERTS}')
+        if users < 1:
+            raise ValueError('Нужен хотя бы один пользователь')
+        self.seed = seed
+        self.users = users
+        self.orders = orders
+        self.concerts = concerts
+        self.tickets = users if tickets is None else tickets
+        self.batch_size = batch_size
+        self.log = log or (lambda message: None)
+        self.password = make_password('user123')
+        self.concert_rows = self.build_concerts()
+        self.products, self.skus = self.build_catalog()
+
+    # Очистка
+
+    def truncate(self):
+        """
+        Очистка таблиц приложений одной командой (TRUNCATE ... CASCADE в
+        PostgreSQL) вместо каскадного удаления через ORM. Суперпользователи
+        сохраняются и вставляются обратно.
+        """
+        superusers = list(User.objects.filter(is_superuser=True))
+        tables = [
+            model._meta.db_table
+            for app_label in DATA_APPS
+            for model in apps.get_app_config(app_label).get_models(include_auto_created=True)
+        ]
+        connection.ops.execute_sql_flush(
+            connection.ops.sql_flush(no_style(), tables, allow_cascade=True)
+        )
+        User.objects.bulk_create(superusers)
+        self.log(f'Таблицы очищены ({len(tables)}), сохранено суперпользователей: {len(superusers)}')
+
+    # Справочные данные: строятся целиком в каждом процессе
+
+    def build_concerts(self):
+        rng = random.Random(f'{self.seed}:concerts')
+        start = ANCHOR - timedelta(days=MAX_CONCERTS // 2)
+        rows = []
+        for index in range(self.concerts):
+            country, city = rng.choice(CITIES)
+            # Разные дни года дают разные префиксы номеров билетов
+            date = start + timedelta(days=index, hours=19)
+            sold = (self.tickets - index + self.concerts - 1) // self.concerts if index < self.tickets else 0
+            total = max(sold, rng.choice([300, 500, 1000, 2000, 5000]))
+            status = 'soldout' if sold >= total else 'upcoming'
+            if date < ANCHOR:
+                status = 'completed'
+            rows.append(Concert(
+                id=stable_uuid(self.seed, 'concert', index),
+                venue=rng.choice(VENUES),
+                city=city,
+                country=country,
+                date=date,
+                price=Decimal(rng.choice([1500, 2000, 2500, 3500])),
+                status=status,
+                total_tickets=total,
+                sold_tickets=sold,
+                created_at=date - timedelta(days=180),
+            ))
+        return rows
+
+    def build_catalog(self):
+        rng = random.Random(f'{self.seed}:catalog')
+        # Каталог заведен до начала периода заказов
+        created_at = ANCHOR - timedelta(days=ORDER_DAYS + 30)
+        products, skus = [], []
+        ordinals = {}
+        for index, (name, category, price, variants) in enumerate(CATALOG):
+            product = Product(
+                id=stable_uuid(self.seed, 'product', index),
+                name=name,
+                category=category,
+                main_image=f'https://example.com/images/product-{index}.jpg',
+                artist='w1lq',
+                created_at=created_at,
+                updated_at=created_at,
+            )
+            products.append(product)
+            for attributes in variants:
+                sku = SKU(
+                    id=stable_uuid(self.seed, 'sku', len(skus)),
+                    product=product,
+                    attributes=attributes,
+                    price=Decimal(price),
+                    stock=rng.randint(0, 500),
+                    created_at=created_at,
+                    updated_at=created_at,
+                )
+                prefix = sku.get_code_prefix()
+                ordinals[prefix] = ordinals.get(prefix, 0) + 1
+                sku.sku_code = f'{prefix}{encode(ordinals[prefix], 4)}'
+                sku.display_name = sku._generate_display_name()
+                skus.append(sku)
+        return products, skus
+
+    # Разделы больших таблиц
+
+    def user_id(self, index):
+        return stable_uuid(self.seed, 'user', index)
+
+    def build_users(self, partition, start, stop):
+        rng = partition_rng(self.seed, 'user', partition)
+        users, subscribers = [], []
+        for index in range(start, stop):
+            email = f'user{index}@example.com'
+            created_at = ANCHOR - timedelta(days=rng.randint(0, 3 * 365), seconds=rng.randint(0, 86399))
+            users.append(User(
+                id=self.user_id(index),
+                email=email,
+                password=self.password,
+                first_name=rng.choice(FIRST_NAMES),
+                last_name=rng.choice(LAST_NAMES),
+                newsletter_opt_in=rng.random() < 0.4,
+                created_at=created_at,
+                updated_at=created_at,
+            ))
+            if index % 3 == 0:
+                subscribers.append(Subscriber(
+                    id=stable_uuid(self.seed, 'subscriber', index),
+                    email=email,
+                    subscribed_at=created_at,
+                    is_active=rng.random() < 0.9,
+                ))
+        return [(User, users), (Subscriber, subscribers)]
+
+    def build_tickets(self, partition, start, stop):
+        rng = partition_rng(self.seed, 'ticket', partition)
+        tickets, codes = [], []
+        for index in range(start, stop):
+            concert = self.concert_rows[index % self.concerts]
+            number = f'{Ticket.get_number_prefix(concert)}{encode(index // self.concerts + 1, 4)}'
+            with_code = index % 5 == 0
+            tickets.append(Ticket(
+                id=stable_uuid(self.seed, 'ticket', index),
+                concert_id=concert.pk,
+                user_id=self.user_id(rng.randrange(self.users)),
+                ticket_number=number,
+                price_paid=concert.price,
+                purchase_date=concert.date - timedelta(days=rng.randint(1, 90)),
+                is_used_for_discount=with_code,
+            ))
+            if with_code:
+                codes.append(DiscountCode(
+                    id=stable_uuid(self.seed, 'discount_code', index),
+                    ticket_id=tickets[-1].pk,
+                    code=number,
+                    discount_percent=15,
+                    valid_until=(concert.date + timedelta(days=365)).date(),
+                    created_at=tickets[-1].purchase_date,
+                ))
+        return [(Ticket, tickets), (DiscountCode, codes)]
+
+    def order_day(self, index):
+        """Номер дня заказа от начала периода (заказы равномерно по ORDER_DAYS дням)"""
+        return index * ORDER_DAYS // self.orders
+
+    def first_order_of_day(self, day):
+        return -(-day * self.orders // ORDER_DAYS)
+
+    def build_orders(self, partition, start, stop):
+        rng = partition_rng(self.seed, 'order', partition)
+        period_start = ANCHOR - timedelta(days=ORDER_DAYS)
+        orders, items = [], []
+        for index in range(start, stop):
+            created_at = period_start + timedelta(
+                seconds=index * ORDER_DAYS * 86400 // self.orders
+            )
+            day = self.order_day(index)
+            number = f"WLQ-{created_at:%Y%m%d}-{encode(index - self.first_order_of_day(day) + 1, 6)}"
+            order = Order(
+                id=stable_uuid(self.seed, 'order', index),
+                user_id=self.user_id(rng.randrange(self.users)),
+                order_number=number,
+                status=rng.choice(ORDER_STATUSES),
+                shipping_cost=Decimal(rng.choice([0, 300, 500])),
+                created_at=created_at,
+            )
+            if order.status == 'delivered':
+                order.completed_at = created_at + timedelta(days=rng.randint(2, 14))
+
+            subtotal = Decimal('0')
+            count = rng.randint(1, MAX_ITEMS_PER_ORDER)
+            for position, sku in enumerate(rng.sample(self.skus, min(count, len(self.skus)))):
+                quantity = rng.randint(1, 3)
+                item = OrderItem(
+                    id=stable_uuid(self.seed, 'order_item', index * MAX_ITEMS_PER_ORDER + position),
+                    order_id=order.pk,
+                    sku_id=sku.pk,
+                    quantity=quantity,
+                    created_at=created_at,
+                )
+                # Снэпшот из SKU в памяти, без обращений к БД
+                item.sku_code = sku.sku_code
+                item.product_name = sku.product.name
+                item.sku_display_name = sku.display_name
+                item.attributes = sku.attributes
+                item.unit_price = sku.price
+                item.image_url = sku.product.main_image
+                items.append(item)
+                subtotal += sku.price * quantity
+
+            order.subtotal = subtotal
+            order.total = subtotal + order.shipping_cost
+            orders.append(order)
+        return [(Order, orders), (OrderItem, items)]
+
+    # Вставка
+
+    def insert(self, groups):
+        """
+        Вставка строк одного раздела в одной транзакции. Все даты строк
+        посчитаны от ANCHOR, поэтому одинаковый seed дает одинаковые строки.
+        """
+        timestamps = auto_timestamps(model for model, _ in groups)
+        with transaction.atomic(), preserved_timestamps(*timestamps):
+            for model, rows in groups:
+                if model is OrderItem:
+                    # Суммы заказов уже посчитаны при генерации
+                    model.objects.bulk_create(rows, batch_size=self.batch_size, refresh_totals=False)
+                else:
+                    model.objects.bulk_create(rows, batch_size=self.batch_size)
+        return sum(len(rows) for _, rows in groups)
+
+    def phases(self):
+        """
+        Разделы по этапам в порядке зависимостей: [[(имя метода, раздел, начало, конец), ...], ...].
+        Этап начинается после вставки всех строк предыдущего.
+        """
+        return [
+            [(builder, *part) for part in partitions(count)]
+            for builder, count in [
+                ('build_users', self.users),
+                ('build_tickets', self.tickets),
+                ('build_orders', self.orders),
+            ]
+        ]
+
+    def build_task(self, builder, partition, start, stop):
+        return getattr(self, builder)(partition, start, stop), (builder, start, stop)
+
+    def run_task(self, builder, partition, start, stop):
+        groups, task = self.build_task(builder, partition, start, stop)
+        return self.insert(groups), task
+
+    def run(self, workers=1):
+        """
+        Генерация всех данных, возвращает количество вставленных строк.
+
+        При workers > 1 разделы этапа вставляются параллельно дочерними
+        процессами, каждый через собственное соединение с БД. SQLite не
+        допускает параллельной записи: процессы ждали бы друг друга дольше,
+        чем идет последовательная вставка, поэтому с ним генерация идет в
+        одном процессе. Строки раздела зависят только от seed и номера
+        раздела, поэтому результат не зависит от числа процессов.
+        """
+        if workers > 1 and connection.vendor == 'sqlite':
+            self.log('SQLite не допускает параллельной записи, генерация идет в одном процессе')
+            workers = 1
+        inserted = self.insert_reference_data()
+        if workers > 1:
+            inserted += self._run_parallel(workers)
+        else:
+            for phase in self.phases():
+                for task in phase:
+                    inserted += self._report(*self.run_task(*task))
+        self.update_code_sequences()
+        return inserted
+
+    def _run_parallel(self, workers):
+        global _worker_generator
+        # Дочерние процессы не должны использовать соединения родителя
+        connections.close_all()
+        _worker_generator = self
+        inserted = 0
+        context = multiprocessing.get_context('fork')
+        try:
+            with context.Pool(workers) as pool:
+                for phase in self.phases():
+                    for result in pool.imap_unordered(_run_worker_task, phase):
+                        inserted += self._report(*result)
+        finally:
+            _worker_generator = None
+        return inserted
+
+    def _report(self, count, task):
+        builder, start, stop = task
+        self.log(f'  {builder}: строки {start}-{stop}')
+        return count
+
+    def insert_reference_data(self):
+        attributes = [row for sku in self.skus for row in sku.build_attribute_rows()]
+        return self.insert([
+            (Concert, self.concert_rows),
+            (Product, self.products),
+            (SKU, self.skus),
+            (SKUAttribute, attributes),
+        ])
+
+    def update_code_sequences(self):
+        """Счетчики кодов продолжают нумерацию после сгенерированных строк"""
+        last_values = {}
+        for sku in self.skus:
+            prefix = sku.get_code_prefix()
+            last_values[prefix] = last_values.get(prefix, 0) + 1
+        for concert in self.concert_rows:
+            if concert.sold_tickets:
+                last_values[Ticket.get_number_prefix(concert)] = concert.sold_tickets
+        period_start = ANCHOR - timedelta(days=ORDER_DAYS)
+        for day in range(ORDER_DAYS):
+            count = self.first_order_of_day(day + 1) - self.first_order_of_day(day)
+            if count:
+                last_values[f"WLQ-{period_start + timedelta(days=day):%Y%m%d}-"] = count
+
+        CodeSequence.objects.bulk_create(
+            [CodeSequence(name=name, last_value=value) for name, value in last_values.items()],
+            update_conflicts=True,
+            unique_fields=['name'],
+            update_fields=['last_value'],
+            batch_size=self.batch_size,
+        )
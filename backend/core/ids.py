@@ -0,0 +1,41 @@
+"""
+Упорядоченные по времени идентификаторы (UUID версии 7).
+
+Старшие 48 бит содержат время в миллисекундах, поэтому новые строки попадают
+в конец B-дерева первичного ключа, а не в случайную страницу, как с uuid4.
+"""
+import os
+import threading
+import time
+import uuid
+
+_lock = threading.Lock()
+_last_ms = 0
+_counter = 0
+
+
+def uuid7():
+    """UUID версии 7, монотонно возрастающий в пределах процесса"""
+    global _last_ms, _counter
+
+    with _lock:
+        ms = time.time_ns() // 1_000_000
+        if ms > _last_ms:
+            _last_ms = ms
+            # 12 бит счетчика начинаются со случайного значения в нижней половине
+            _counter = int.from_bytes(os.urandom(2), 'big') & 0x7FF
+        else:
+            _counter += 1
+            if _counter > 0xFFF:
+                # Счетчик переполнен: занимаем следующую миллисекунду
+                _last_ms += 1
+                _counter = 0
+        ms, counter = _last_ms, _counter
+
+    random_bits = int.from_bytes(os.urandom(8), 'big') & ((1 << 62) - 1)
+    value = (ms & ((1 << 48) - 1)) << 80
+    value |= 0x7 << 76
+    value |= counter << 64
+    value |= 0b10 << 62
+    value |= random_bits
+    return uuid.UUID(int=value)
@@ -0,0 +1,59 @@
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+
+from core.admin_benchmark import benchmark_admin, find_regressions
+
+
+class Command(BaseCommand):
+    help = (
+        'Замеряет запросы, время и память страниц админки. С --users/--orders '
+        'база сначала заполняется данными этого объема (fill_test_data), иначе '
+        'замеряются текущие данные'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--page-sizes', type=int, nargs='+', default=[20, 100],
+                            help='Размеры страницы списка')
+        parser.add_argument('--model', action='append', dest='models',
+                            help='Только указанная модель, например orders.Order (можно несколько)')
+        parser.add_argument('--users', type=int, help='Заполнить базу: количество пользователей')
+        parser.add_argument('--orders', type=int, help='Заполнить базу: количество заказов')
+        parser.add_argument('--seed', type=int, default=0, help='Начальное значение генератора')
+        parser.add_argument('--workers', type=int, default=1, help='Количество процессов генерации')
+
+    def handle(self, *args, **options):
+        if options['users'] is not None or options['orders'] is not None:
+            call_command(
+                'fill_test_data',
+                users=options['users'],
+                orders=options['orders'],
+                seed=options['seed'],
+                workers=options['workers'],
+                stdout=self.stdout,
+            )
+        else:
+            self.stdout.write(self.style.WARNING(
+                'Замер на текущих данных: N+1 заметнее на большом объеме (--users ... --orders ...)'
+            ))
+
+        # Пользователь не сохраняется: суперпользователю доступны все страницы
+        user = get_user_model()(email='benchmark@example.com', is_staff=True, is_superuser=True)
+        results = benchmark_admin(user, page_sizes=sorted(options['page_sizes']), labels=options['models'])
+
+        self.stdout.write(f"{'Модель':<28}{'Страница':<12}{'Строк':>7}{'Запросов':>10}{'Время, мс':>12}{'Память, КБ':>12}")
+        for result in results:
+            page = 'изменение' if result.view == 'change' else f'список/{result.page_size}'
+            self.stdout.write(
+                f'{result.label:<28}{page:<12}{result.rows:>7}{result.queries:>10}'
+                f'{result.seconds * 1000:>12.1f}{result.peak_kb:>12}'
+            )
+
+        regressions = find_regressions(results)
+        if regressions:
+            details = '; '.join(
+                f"{label}: {', '.join(f'{size} -> {count}' for size, count in counts.items())}"
+                for label, counts in regressions
+            )
+            raise CommandError(f'Количество запросов растет с размером страницы: {details}')
+        self.stdout.write(self.style.SUCCESS('✅ Количество запросов списков не зависит от размера страницы'))
@@ -0,0 +1,54 @@
+import multiprocessing
+import time
+import uuid
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+
+from core.codes import allocate_codes
+from core.models import CodeSequence
+
+
+def generate(prefix, count, batch):
+    """Генерация кодов в рабочем процессе"""
+    codes = []
+    while len(codes) < count:
+        codes.extend(allocate_codes(prefix, min(batch, count - len(codes)), width=6))
+    connections.close_all()
+    return codes
+
+
+class Command(BaseCommand):
+    help = 'Генерирует коды в нескольких процессах и проверяет отсутствие коллизий'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--codes', type=int, default=1000000, help='Всего кодов')
+        parser.add_argument('--workers', type=int, default=4, help='Количество процессов')
+        parser.add_argument('--batch', type=int, default=1000, help='Кодов за одно обращение к генератору')
+
+    def handle(self, *args, **options):
+        total, workers, batch = options['codes'], options['workers'], options['batch']
+        prefix = f"BENCH-{uuid.uuid4().hex[:8].upper()}-"
+        per_worker = [total // workers + (1 if i < total % workers else 0) for i in range(workers)]
+
+        self.stdout.write(f'Генерируем {total} кодов в {workers} процессах...')
+        # Соединения не должны наследоваться дочерними процессами
+        connections.close_all()
+        started = time.perf_counter()
+        with multiprocessing.get_context('fork').Pool(workers) as pool:
+            results = pool.starmap(generate, [(prefix, count, batch) for count in per_worker])
+        elapsed = time.perf_counter() - started
+
+        CodeSequence.objects.filter(name=prefix).delete()
+
+        codes = [code for worker_codes in results for code in worker_codes]
+        unique = len(set(codes))
+        unsorted = sum(worker_codes != sorted(worker_codes) for worker_codes in results)
+
+        self.stdout.write(f'Сгенерировано: {len(codes)}, уникальных: {unique}')
+        self.stdout.write(f'Время: {elapsed:.2f} с ({len(codes) / elapsed:,.0f} кодов/с)')
+        self.stdout.write(f'Процессов с невозрастающими кодами: {unsorted}')
+
+        if unique != len(codes) or len(codes) != total:
+            raise CommandError(f'Обнаружено коллизий: {len(codes) - unique}')
+        self.stdout.write(self.style.SUCCESS('✅ Коллизий нет'))
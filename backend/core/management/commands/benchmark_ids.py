@@ -0,0 +1,83 @@
+import time
+import uuid
+
+from django.core.management.base import BaseCommand
+from django.db import connection, models, transaction
+
+from core.ids import uuid7
+
+
+class Command(BaseCommand):
+    help = 'Сравнивает скорость вставки и размер индекса для uuid4 и uuid7'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=200000, help='Строк в каждой таблице')
+        parser.add_argument('--batch', type=int, default=1000, help='Строк в одном INSERT')
+
+    def handle(self, *args, **options):
+        rows, batch = options['rows'], options['batch']
+        self.stdout.write(f'Вставляем {rows} строк пачками по {batch} ({connection.vendor})...')
+
+        for name, generator in [('uuid4', uuid.uuid4), ('uuid7', uuid7)]:
+            table = f'benchmark_ids_{name}'
+            self._create_table(table)
+            try:
+                elapsed = self._insert(table, generator, rows, batch)
+                size = self._index_size(table)
+            finally:
+                self._drop_table(table)
+
+            size_text = f'{size / 1024 / 1024:.1f} МБ' if size is not None else 'н/д'
+            self.stdout.write(
+                f'{name}: {elapsed:.2f} с ({rows / elapsed:,.0f} строк/с), индекс PK: {size_text}'
+            )
+
+        self.stdout.write(self.style.SUCCESS('✅ Готово'))
+
+    def _create_table(self, table):
+        id_type = 'uuid' if connection.vendor == 'postgresql' else 'char(32)'
+        with connection.cursor() as cursor:
+            cursor.execute(f'DROP TABLE IF EXISTS {connection.ops.quote_name(table)}')
+            cursor.execute(
+                f'CREATE TABLE {connection.ops.quote_name(table)} '
+                f'(id {id_type} PRIMARY KEY, payload integer NOT NULL)'
+            )
+
+    def _drop_table(self, table):
+        with connection.cursor() as cursor:
+            cursor.execute(f'DROP TABLE {connection.ops.quote_name(table)}')
+
+    def _insert(self, table, generator, rows, batch):
+        field = models.UUIDField()
+        started = time.perf_counter()
+        with connection.cursor() as cursor:
+            for offset in range(0, rows, batch):
+                values = [
+                    (field.get_db_prep_value(generator(), connection), offset + i)
+                    for i in range(min(batch, rows - offset))
+                ]
+                # Каждая пачка фиксируется отдельной транзакцией, как при bulk_create
+                with transaction.atomic():
+                    cursor.executemany(
+                        f'INSERT INTO {connection.ops.quote_name(table)} (id, payload) VALUES (%s, %s)',
+                        values
+                    )
+        return time.perf_counter() - started
+
+    def _index_size(self, table):
+        with connection.cursor() as cursor:
+            if connection.vendor == 'postgresql':
+                cursor.execute('SELECT pg_relation_size(%s)', [f'{table}_pkey'])
+                return cursor.fetchone()[0]
+            if connection.vendor == 'sqlite':
+                try:
+                    cursor.execute(
+                        "SELECT SUM(pgsize) FROM dbstat WHERE name = "
+                        "(SELECT name FROM sqlite_master WHERE type = 'index' AND tbl_name = %s)",
+                        [table]
+                    )
+                except Exception:
+                    # SQLite собран без виртуальной таблицы dbstat
+                    return None
+                return cursor.fetchone()[0]
+        return None
@@ -0,0 +1,31 @@
+from django.core.management.base import BaseCommand
+
+from core.audience import EXPORT_FORMATS, iter_audience, render_audience
+
+
+class Command(BaseCommand):
+    help = 'Выгружает аудиторию рассылки (подписчики и пользователи) без повторов'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--format', choices=EXPORT_FORMATS, default='csv', help='Формат выгрузки')
+        parser.add_argument('--output', help='Файл для выгрузки (по умолчанию stdout)')
+        parser.add_argument('--chunk-size', type=int, default=2000, help='Строк за одно чтение курсора')
+
+    def handle(self, *args, **options):
+        self.exported = 0
+        records = self._counted(iter_audience(chunk_size=options['chunk_size']))
+        lines = render_audience(records, options['format'])
+
+        if options['output']:
+            with open(options['output'], 'w', encoding='utf-8', newline='') as output:
+                output.writelines(lines)
+        else:
+            for line in lines:
+                self.stdout.write(line, ending='')
+
+        self.stderr.write(f'✅ Выгружено адресатов: {self.exported}', style_func=self.style.SUCCESS)
+
+    def _counted(self, records):
+        for record in records:
+            self.exported += 1
+            yield record
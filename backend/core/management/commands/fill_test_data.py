@@ -10,7 +10,12 @@ from music.models import Release, Track, Favorite
 from concerts.models import Concert, Ticket
 from discounts.models import DiscountCode
 from orders.models import Cart, CartItem, Order, OrderItem, OrderDiscount
+from orders.services import apply_discounts
 from core.models import Subscriber
+from core.datagen import ScaleDataGenerator
+from concerts.cache import bump_tour_version
+from discounts.services import bump_discount_version
+from merch.cache import bump_catalog_version
 
 User = get_user_model()
 
@@ -18,7 +23,19 @@ User = get_user_model()
 class Command(BaseCommand):
     help = 'Заполняет базу тестовыми данными для всех приложений'
 
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, help='Количество пользователей (режим большого объема)')
+        parser.add_argument('--orders', type=int, help='Количество заказов (режим большого объема)')
+        parser.add_argument('--concerts', type=int, default=200, help='Количество концертов (до 365)')
+        parser.add_argument('--tickets', type=int, help='Количество билетов (по умолчанию равно --users)')
+        parser.add_argument('--seed', type=int, default=0, help='Начальное значение генератора')
+        parser.add_argument('--batch-size', type=int, default=2000, help='Строк в одном INSERT')
+        parser.add_argument('--workers', type=int, default=1, help='Количество процессов генерации')
+
     def handle(self, *args, **kwargs):
+        if kwargs.get('users') is not None or kwargs.get('orders') is not None:
+            return self.fill_scale_data(kwargs)
+
         self.stdout.write('Начинаем заполнение тестовыми данными...')
 
         # Очищаем существующие данные
@@ -44,6 +61,33 @@ class Command(BaseCommand):
 
         self.stdout.write(self.style.SUCCESS('✅ Все тестовые данные успешно созданы!'))
 
+    def fill_scale_data(self, options):
+        """Данные в масштабе продакшена: bulk_create в порядке зависимостей"""
+        generator = ScaleDataGenerator(
+            seed=options['seed'],
+            users=options['users'] or 1000,
+            orders=options['orders'] or 0,
+            concerts=options['concerts'],
+            tickets=options['tickets'],
+            batch_size=options['batch_size'],
+            log=self.stdout.write,
+        )
+        self.stdout.write(
+            f'Генерация: пользователей {generator.users}, билетов {generator.tickets}, '
+            f'заказов {generator.orders}, seed {generator.seed}'
+        )
+        generator.truncate()
+        inserted = generator.run(workers=options['workers'])
+
+        random.seed(options['seed'])
+        releases = self.create_releases()
+        self.create_tracks(releases)
+
+        bump_catalog_version()
+        bump_tour_version()
+        bump_discount_version()
+        self.stdout.write(self.style.SUCCESS(f'✅ Создано строк: {inserted}'))
+
     def clean_data(self):
         """Очистка всех данных"""
         self.stdout.write('Очищаем существующие данные...')
@@ -502,13 +546,11 @@ class Command(BaseCommand):
 
         for order in orders:
             # Создаем 1-3 позиции в каждом заказе
-            for sku in random.sample(skus, random.randint(1, 3)):
-                order_item = OrderItem.objects.create(
-                    order=order,
-                    sku=sku,
-                    quantity=random.randint(1, 2)
-                )
-                order_items.append(order_item)
+            lines = [
+                (sku.id, random.randint(1, 2))
+                for sku in random.sample(skus, random.randint(1, 3))
+            ]
+            order_items.extend(OrderItem.objects.bulk_snapshot(order, lines))
 
         self.stdout.write(f'✅ Создано {len(order_items)} позиций в заказах')
         return order_items
@@ -518,20 +560,17 @@ class Command(BaseCommand):
         self.stdout.write('Создаем скидки на заказы...')
         order_discounts = []
 
+        # Каждый код применяется один раз, поэтому раздаем разные коды
+        available = [code for code in discount_codes if code.is_valid]
+        random.shuffle(available)
+
         # Применяем скидки к некоторым заказам
         for order in orders[:5]:  # Первые 5 заказов
-            if discount_codes and random.choice([True, False]):
-                code = random.choice(discount_codes)
-                # Не передаем discount_amount - он рассчитается автоматически
-                discount = OrderDiscount.objects.create(
-                    order=order,
-                    discount_code=code
-                )
-                order_discounts.append(discount)
-
-                # Обновляем discount_total в заказе
-                order.discount_total = discount.discount_amount
-                order.save()
+            if available and random.choice([True, False]):
+                code = available.pop()
+                # Сумма скидки, discount_total и итог заказа считаются движком скидок
+                apply_discounts(order, [code.code])
+                order_discounts.extend(order.applied_discounts.all())
 
         self.stdout.write(f'✅ Создано {len(order_discounts)} скидок на заказы')
-        return order_discounts
\ No newline at end of file
+        return order_discounts
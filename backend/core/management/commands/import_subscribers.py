@@ -0,0 +1,30 @@
+import os
+
+from django.core.management.base import BaseCommand, CommandError
+
+from core.subscribers import IMPORT_FORMATS, import_subscribers, read_emails
+
+
+class Command(BaseCommand):
+    help = 'Импортирует подписчиков из CSV или NDJSON файла'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='Путь к файлу')
+        parser.add_argument('--format', choices=IMPORT_FORMATS, help='Формат (по умолчанию по расширению файла)')
+        parser.add_argument('--chunk-size', type=int, default=5000, help='Адресов в одной пачке')
+
+    def handle(self, *args, **options):
+        import_format = options['format'] or os.path.splitext(options['path'])[1].lstrip('.').lower()
+        if import_format not in IMPORT_FORMATS:
+            raise CommandError(f'Укажите --format: {", ".join(IMPORT_FORMATS)}')
+
+        try:
+            with open(options['path'], encoding='utf-8-sig', newline='') as source:
+                counts = import_subscribers(read_emails(source, import_format), options['chunk_size'])
+        except OSError as error:
+            raise CommandError(f'Не удалось прочитать файл: {error}')
+
+        self.stdout.write(self.style.SUCCESS(
+            f"✅ Добавлено: {counts['inserted']}, подписаны снова: {counts['updated']}, "
+            f"пропущено: {counts['skipped']}"
+        ))
@@ -0,0 +1,24 @@
+# Generated by Django 4.2.7 on 2026-10-17 20:03
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0003_alter_subscriber_email_and_more'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CodeSequence',
+            fields=[
+                ('name', models.CharField(max_length=100, primary_key=True, serialize=False, verbose_name='Префикс')),
+                ('last_value', models.PositiveBigIntegerField(default=0, verbose_name='Последнее значение')),
+            ],
+            options={
+                'verbose_name': 'Счетчик кодов',
+                'verbose_name_plural': 'Счетчики кодов',
+            },
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 4.2.7 on 2026-10-17 20:32
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0004_codesequence'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='user',
+            name='newsletter_opt_in',
+            field=models.BooleanField(default=False, verbose_name='Получать рассылку'),
+        ),
+    ]
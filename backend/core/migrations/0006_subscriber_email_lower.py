@@ -0,0 +1,41 @@
+# Generated by Django 4.2.7 on 2026-10-17 20:34
+
+from django.db import migrations, models
+import django.db.models.functions.text
+
+
+def normalize_subscriber_emails(apps, schema_editor):
+    Subscriber = apps.get_model('core', 'Subscriber')
+    kept = {}
+    duplicates = []
+    # Из повторов оставляем активную и самую раннюю подписку
+    for subscriber in Subscriber.objects.order_by('-is_active', 'subscribed_at').iterator():
+        email = subscriber.email.strip().lower()
+        if email in kept:
+            duplicates.append(subscriber.pk)
+        else:
+            kept[email] = subscriber
+    Subscriber.objects.filter(pk__in=duplicates).delete()
+    for email, subscriber in kept.items():
+        if subscriber.email != email:
+            Subscriber.objects.filter(pk=subscriber.pk).update(email=email)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0005_user_newsletter_opt_in'),
+    ]
+
+    operations = [
+        migrations.RunPython(normalize_subscriber_emails, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name='subscriber',
+            name='email',
+            field=models.EmailField(db_index=True, max_length=254, verbose_name='Email'),
+        ),
+        migrations.AddConstraint(
+            model_name='subscriber',
+            constraint=models.UniqueConstraint(django.db.models.functions.text.Lower('email'), name='subscriber_email_lower_uniq'),
+        ),
+    ]
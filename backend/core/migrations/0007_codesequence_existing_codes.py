@@ -0,0 +1,51 @@
+from django.db import migrations
+
+# (приложение, модель, поле, ширина номера) - как в генераторах кодов моделей
+CODE_FIELDS = [
+    ('concerts', 'Ticket', 'ticket_number', 4),
+    ('orders', 'Order', 'order_number', 6),
+    ('merch', 'SKU', 'sku_code', 4),
+]
+
+
+def advance_code_sequences(apps, schema_editor):
+    """
+    Счетчики кодов ставятся выше номеров, уже занятых в таблицах: старые
+    коды со случайным суффиксом записаны в том же алфавите 0-9A-Z и той же
+    ширины, поэтому могут совпасть с номером из счетчика.
+    """
+    CodeSequence = apps.get_model('core', 'CodeSequence')
+    last_values = {}
+    for app_label, model_name, field, width in CODE_FIELDS:
+        model = apps.get_model(app_label, model_name)
+        for code in model.objects.values_list(field, flat=True).iterator():
+            prefix, suffix = code[:-width], code[-width:]
+            try:
+                value = int(suffix, 36)
+            except ValueError:
+                continue
+            if value > last_values.get(prefix, 0):
+                last_values[prefix] = value
+
+    current = dict(
+        CodeSequence.objects.filter(name__in=list(last_values)).values_list('name', 'last_value')
+    )
+    for name, value in last_values.items():
+        if name not in current:
+            CodeSequence.objects.create(name=name, last_value=value)
+        elif current[name] < value:
+            CodeSequence.objects.filter(name=name).update(last_value=value)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0006_subscriber_email_lower'),
+        ('concerts', '0006_concert_country_city_date_index'),
+        ('orders', '0007_orderdiscount_single_use'),
+        ('merch', '0005_sku_attributes'),
+    ]
+
+    operations = [
+        migrations.RunPython(advance_code_sequences, migrations.RunPython.noop),
+    ]
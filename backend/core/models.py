@@ -1,8 +1,10 @@
 import uuid
 from django.db import models
 from django.contrib.auth.models import AbstractBaseUser, BaseUserManager, PermissionsMixin
+from django.db.models.functions import Lower
 from django.utils import timezone
 
+
 class UserManager(BaseUserManager):
     def create_user(self, email, password=None, **extra_fields):
         if not email:
@@ -49,6 +51,10 @@ class User(AbstractBaseUser, PermissionsMixin):
         default=False,
         verbose_name='Персонал'
     )
+    newsletter_opt_in = models.BooleanField(
+        default=False,
+        verbose_name='Получать рассылку'
+    )
     created_at = models.DateTimeField(
         auto_now_add=True,
         verbose_name='Дата регистрации'
@@ -84,8 +90,8 @@ class Subscriber(models.Model):
         editable=False,
         verbose_name='ID'
     )
+    # Уникальность без учета регистра - ограничение subscriber_email_lower_uniq
     email = models.EmailField(
-        unique=True,
         db_index=True,
         verbose_name='Email'
     )
@@ -107,13 +113,45 @@ class Subscriber(models.Model):
         verbose_name = 'Подписчик'
         verbose_name_plural = 'Подписчики'
         ordering = ['-subscribed_at']
+        constraints = [
+            models.UniqueConstraint(Lower('email'), name='subscriber_email_lower_uniq'),
+        ]
 
     def __str__(self):
         return self.email
 
+    @staticmethod
+    def normalize_email(email):
+        """Email в том виде, в котором он хранится у подписчиков"""
+        return (email or '').strip().lower()
+
+    def save(self, *args, **kwargs):
+        self.email = self.normalize_email(self.email)
+        super().save(*args, **kwargs)
+
     def unsubscribe(self):
         """Отписка подписчика"""
         if self.is_active:
             self.is_active = False
             self.unsubscribed_at = timezone.now()
-            self.save()
\ No newline at end of file
+            self.save()
+
+
+class CodeSequence(models.Model):
+    """Счетчик для генерации кодов (номера заказов, билетов, артикулы)"""
+    name = models.CharField(
+        max_length=100,
+        primary_key=True,
+        verbose_name='Префикс'
+    )
+    last_value = models.PositiveBigIntegerField(
+        default=0,
+        verbose_name='Последнее значение'
+    )
+
+    class Meta:
+        verbose_name = 'Счетчик кодов'
+        verbose_name_plural = 'Счетчики кодов'
+
+    def __str__(self):
+        return f"{self.name}{self.last_value}"
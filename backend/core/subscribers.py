@@ -0,0 +1,98 @@
+"""
+Массовый импорт подписчиков из CSV или NDJSON.
+
+Адреса нормализуются (пробелы по краям, нижний регистр), повторы в файле
+отбрасываются, а каждая пачка обрабатывается фиксированным числом запросов:
+чтение существующих адресов, вставка новых и повторная подписка отписавшихся.
+"""
+import csv
+import json
+from itertools import islice
+
+from django.core.exceptions import ValidationError
+from django.core.validators import validate_email
+from django.db import transaction
+from django.utils import timezone
+
+from .models import Subscriber
+
+IMPORT_FORMATS = ('csv', 'ndjson')
+
+
+def read_emails(lines, import_format='csv'):
+    """
+    Адреса из файла: в CSV - колонка email (или первая колонка, если
+    заголовка нет), в NDJSON - поле email каждой строки.
+    """
+    if import_format == 'csv':
+        reader = csv.reader(lines)
+        header = next(reader, None)
+        if header is None:
+            return
+        columns = [column.strip().lower() for column in header]
+        if 'email' in columns:
+            index = columns.index('email')
+        else:
+            index = 0
+            yield header[0] if header else ''
+        for row in reader:
+            yield row[index] if len(row) > index else ''
+    elif import_format == 'ndjson':
+        for line in lines:
+            if line.strip():
+                yield json.loads(line).get('email', '')
+    else:
+        raise ValueError(f'Неизвестный формат импорта: {import_format}')
+
+
+def import_subscribers(emails, chunk_size=5000):
+    """
+    Импорт адресов: новые добавляются, отписавшиеся подписываются снова.
+    Возвращает {'inserted': ..., 'updated': ..., 'skipped': ...}; пропущенными
+    считаются некорректные адреса, повторы и уже активные подписчики.
+    """
+    counts = {'inserted': 0, 'updated': 0, 'skipped': 0}
+    seen = set()
+    emails = iter(emails)
+
+    while True:
+        chunk = list(islice(emails, chunk_size))
+        if not chunk:
+            break
+
+        batch = []
+        for email in chunk:
+            email = Subscriber.normalize_email(email)
+            if email in seen or not _is_valid(email):
+                counts['skipped'] += 1
+                continue
+            seen.add(email)
+            batch.append(email)
+
+        with transaction.atomic():
+            existing = dict(
+                Subscriber.objects.filter(email__in=batch).order_by().values_list('email', 'is_active')
+            )
+            now = timezone.now()
+            Subscriber.objects.bulk_create(
+                [Subscriber(email=email, subscribed_at=now) for email in batch if email not in existing],
+                ignore_conflicts=True
+            )
+            updated = Subscriber.objects.filter(
+                email__in=[email for email, active in existing.items() if not active],
+                is_active=False
+            ).update(is_active=True, subscribed_at=now, unsubscribed_at=None)
+
+        counts['inserted'] += len(batch) - len(existing)
+        counts['updated'] += updated
+        counts['skipped'] += len(existing) - updated
+
+    return counts
+
+
+def _is_valid(email):
+    try:
+        validate_email(email)
+    except ValidationError:
+        return False
+    return True
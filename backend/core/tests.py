@@ -1,8 +1,37 @@
-from django.test import TestCase
+import json
+import multiprocessing
+import os
+import random
+import tempfile
+from datetime import timedelta
+from importlib import import_module
+from io import StringIO
+from unittest import mock, skipIf
+
+from django.apps import apps as django_apps
+from django.conf import settings
 from django.contrib.auth import get_user_model
-from core.models import Subscriber
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import DEFAULT_DB_ALIAS, connection, connections, transaction
+from django.test import SimpleTestCase, TestCase, TransactionTestCase
+from django.urls import reverse
 from django.utils import timezone
-from datetime import timedelta
+
+from concerts.models import Concert, Ticket
+from config.db_routers import PrimaryReplicaRouter
+from core.admin_benchmark import AdminMeasurement, benchmark_admin, find_regressions
+from core.admin_changelist import EstimatedCountPaginator
+from core.audience import iter_audience, render_audience
+from core.cache import bump_version, get_version
+from core.codes import CodeAllocator, allocate_codes, allocator, encode, next_code
+from core.datagen import ScaleDataGenerator, stable_uuid
+from core.ids import uuid7
+from core.models import CodeSequence, Subscriber
+from core.subscribers import import_subscribers, read_emails
+from discounts.models import DiscountCode
+from merch.models import SKU
+from orders.models import Order, OrderItem
 
 User = get_user_model()
 
@@ -113,4 +142,456 @@ class SubscriberModelTest(TestCase):
         self.assertEqual(
             list(subscribers),
             sorted(subscribers, key=lambda x: x.subscribed_at, reverse=True)
-        )
\ No newline at end of file
+        )
+
+
+class CodeGenerationTest(TestCase):
+    """Тесты генератора уникальных кодов"""
+
+    def test_encode_preserves_order(self):
+        """Строковый порядок кодов совпадает с числовым"""
+        values = [1, 9, 10, 35, 36, 1295, 1296]
+        encoded = [encode(value, 4) for value in values]
+        self.assertEqual(encoded, sorted(encoded))
+        self.assertEqual(encode(35, 4), '000Z')
+
+    def test_codes_are_unique_and_increasing(self):
+        """Коды одного префикса уникальны и возрастают"""
+        codes = [next_code('TST-') for _ in range(5)] + allocate_codes('TST-', 300)
+        self.assertEqual(len(set(codes)), len(codes))
+        self.assertEqual(codes, sorted(codes))
+        self.assertTrue(all(code.startswith('TST-') for code in codes))
+
+    def test_block_is_reserved_once(self):
+        """Остаток блока используется без обращений к БД после коммита"""
+        allocator = CodeAllocator(block_size=10)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.assertEqual(allocator.allocate('BLK-', 2), [1, 2])
+        with self.assertNumQueries(0):
+            self.assertEqual(allocator.allocate('BLK-', 8), list(range(3, 11)))
+        self.assertEqual(allocator.allocate('BLK-'), [11])
+        self.assertEqual(CodeSequence.objects.get(name='BLK-').last_value, 20)
+
+    def test_rolled_back_block_is_not_reused(self):
+        """Блок из откаченной транзакции не остается в кэше процесса"""
+        allocator = CodeAllocator(block_size=10)
+        with self.captureOnCommitCallbacks(execute=True) as callbacks:
+            try:
+                with transaction.atomic():
+                    allocator.allocate('RBK-')
+                    raise ValueError
+            except ValueError:
+                pass
+        self.assertEqual(callbacks, [])
+        self.assertEqual(allocator.allocate('RBK-'), [1])
+
+    def test_sequences_advanced_past_existing_codes(self):
+        """Миграция ставит счетчики выше кодов, созданных со случайным суффиксом"""
+        concert = Concert.objects.create(
+            venue='ГлавClub', city='Москва', date=timezone.now() + timedelta(days=10), price=1500
+        )
+        user = User.objects.create_user(email='fan@example.com')
+        prefix = Ticket.get_number_prefix(concert)
+        Ticket.objects.create(concert=concert, user=user, ticket_number=f'{prefix}0003', price_paid=1500)
+        Ticket.objects.create(concert=concert, user=user, ticket_number=f'{prefix}0001', price_paid=1500)
+
+        migration = import_module('core.migrations.0007_codesequence_existing_codes')
+        migration.advance_code_sequences(django_apps, None)
+        # Миграция выполняется до запуска процессов, у которых еще нет блоков
+        allocator.reset()
+
+        self.assertEqual(CodeSequence.objects.get(name=prefix).last_value, 3)
+        ticket = Ticket.objects.create(concert=concert, user=user, price_paid=1500)
+        self.assertEqual(ticket.ticket_number, f'{prefix}0004')
+
+
+class UUID7Test(TestCase):
+    """Тесты упорядоченных по времени идентификаторов"""
+
+    def test_uuid7_version_and_variant(self):
+        value = uuid7()
+        self.assertEqual(value.version, 7)
+        self.assertEqual(value.variant, 'specified in RFC 4122')
+
+    def test_uuid7_is_monotonic(self):
+        """Идентификаторы возрастают и в бинарном, и в строковом виде"""
+        values = [uuid7() for _ in range(10000)]
+        self.assertEqual(values, sorted(values))
+        self.assertEqual([value.hex for value in values], sorted(value.hex for value in values))
+        self.assertEqual(len(set(values)), len(values))
+
+    def test_uuid7_contains_timestamp(self):
+        """Старшие 48 бит содержат текущее время в миллисекундах"""
+        before = int(timezone.now().timestamp() * 1000)
+        value = uuid7()
+        after = int(timezone.now().timestamp() * 1000)
+        self.assertTrue(before <= value.int >> 80 <= after + 1)
+
+
+class CacheVersionTest(SimpleTestCase):
+    """Тесты версий ключей кэша"""
+
+    def setUp(self):
+        cache.delete('tests:version')
+
+    def test_bump_changes_version(self):
+        version = get_version('tests:version')
+        self.assertEqual(get_version('tests:version'), version)
+        bump_version('tests:version')
+        self.assertNotEqual(get_version('tests:version'), version)
+
+    def test_bump_after_eviction(self):
+        """Вытесненная версия создается заново, а не падает на incr"""
+        bump_version('tests:version')
+        self.assertIsNotNone(cache.get('tests:version'))
+
+
+class PrimaryReplicaRouterTest(SimpleTestCase):
+    """Тесты маршрутизации запросов между основной БД и репликой"""
+
+    def setUp(self):
+        self.router = PrimaryReplicaRouter()
+        patcher = mock.patch.dict(settings.DATABASES, {'replica': settings.DATABASES[DEFAULT_DB_ALIAS]})
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_catalog_reads_go_to_replica(self):
+        self.assertEqual(self.router.db_for_read(SKU), 'replica')
+
+    def test_other_reads_and_writes_go_to_primary(self):
+        self.assertEqual(self.router.db_for_read(Order), DEFAULT_DB_ALIAS)
+        self.assertEqual(self.router.db_for_write(SKU), DEFAULT_DB_ALIAS)
+        self.assertTrue(self.router.allow_migrate(DEFAULT_DB_ALIAS, 'merch'))
+        self.assertFalse(self.router.allow_migrate('replica', 'merch'))
+
+    def test_reads_inside_transaction_go_to_primary(self):
+        with mock.patch.object(connections[DEFAULT_DB_ALIAS], 'in_atomic_block', True):
+            self.assertEqual(self.router.db_for_read(SKU), DEFAULT_DB_ALIAS)
+
+    def test_without_replica_router_is_transparent(self):
+        del settings.DATABASES['replica']
+        self.assertIsNone(self.router.db_for_read(SKU))
+
+
+class AudienceExportTest(TestCase):
+    """Тесты выгрузки аудитории рассылки"""
+
+    def setUp(self):
+        Subscriber.objects.create(email='b.fan@example.com')
+        Subscriber.objects.create(email='Anna@example.com')
+        Subscriber.objects.create(email='gone@example.com', is_active=False)
+        User.objects.create_user(email='anna@example.com', first_name='Анна', newsletter_opt_in=True)
+        User.objects.create_user(email='c.user@example.com', newsletter_opt_in=True)
+        User.objects.create_user(email='silent@example.com')
+
+    def test_merged_without_duplicates(self):
+        records = list(iter_audience(chunk_size=1))
+
+        self.assertEqual(
+            [(r['email'], r['sources']) for r in records],
+            [
+                ('anna@example.com', 'subscriber,user'),
+                ('b.fan@example.com', 'subscriber'),
+                ('c.user@example.com', 'user'),
+            ]
+        )
+        self.assertEqual(records[0]['first_name'], 'Анна')
+
+    def test_render_formats(self):
+        records = list(iter_audience())
+        csv_lines = list(render_audience(records, 'csv'))
+        self.assertEqual(csv_lines[0], 'email,first_name,last_name,sources\r\n')
+        self.assertEqual(len(csv_lines), 4)
+
+        ndjson = [json.loads(line) for line in render_audience(records, 'ndjson')]
+        self.assertEqual(ndjson[2]['email'], 'c.user@example.com')
+
+    def test_command(self):
+        out, err = StringIO(), StringIO()
+        call_command('export_audience', '--format', 'ndjson', stdout=out, stderr=err)
+        self.assertEqual(len(out.getvalue().splitlines()), 3)
+        self.assertIn('Выгружено адресатов: 3', err.getvalue())
+
+    def test_streaming_view_staff_only(self):
+        url = reverse('core:audience_export')
+        self.assertEqual(self.client.get(url).status_code, 302)
+
+        staff = User.objects.create_user(email='staff@example.com', password='testpass123', is_staff=True)
+        self.client.force_login(staff)
+        response = self.client.get(url, {'format': 'csv'})
+
+        self.assertTrue(response.streaming)
+        body = b''.join(response.streaming_content).decode()
+        self.assertIn('anna@example.com,Анна,,subscriber,user', body.replace('"', ''))
+        self.assertEqual(self.client.get(url, {'format': 'xml'}).status_code, 400)
+
+
+class SubscriberImportTest(TestCase):
+    """Тесты массового импорта подписчиков"""
+
+    def setUp(self):
+        Subscriber.objects.create(email='active@example.com')
+        self.gone = Subscriber.objects.create(email='gone@example.com')
+        self.gone.unsubscribe()
+
+    def test_email_normalized_and_unique_ignoring_case(self):
+        subscriber = Subscriber.objects.create(email='  New.Fan@Example.COM ')
+        self.assertEqual(subscriber.email, 'new.fan@example.com')
+        with self.assertRaises(Exception), transaction.atomic():
+            Subscriber.objects.bulk_create([Subscriber(email='NEW.FAN@example.com')])
+
+    def test_import_counts(self):
+        emails = [
+            'Active@Example.com',
+            'gone@example.com',
+            'first@example.com',
+            ' FIRST@example.com',
+            'not-an-email',
+            'second@example.com',
+        ]
+        # Вторая пачка без отписавшихся обходится без UPDATE
+        with self.assertNumQueries(5 + 4):
+            counts = import_subscribers(emails, chunk_size=3)
+
+        self.assertEqual(counts, {'inserted': 2, 'updated': 1, 'skipped': 3})
+        self.gone.refresh_from_db()
+        self.assertTrue(self.gone.is_active)
+        self.assertIsNone(self.gone.unsubscribed_at)
+        self.assertEqual(Subscriber.objects.filter(is_active=True).count(), 4)
+
+    def test_read_formats(self):
+        self.assertEqual(
+            list(read_emails(['name,email\n', 'Анна,anna@example.com\n'], 'csv')),
+            ['anna@example.com']
+        )
+        self.assertEqual(list(read_emails(['a@example.com\n', 'b@example.com\n'], 'csv')),
+                         ['a@example.com', 'b@example.com'])
+        self.assertEqual(list(read_emails(['{"email": "c@example.com"}\n', '\n'], 'ndjson')),
+                         ['c@example.com'])
+
+    def test_command(self):
+        with tempfile.NamedTemporaryFile('w', suffix='.csv', delete=False, encoding='utf-8') as source:
+            source.write('email\nfan@example.com\nactive@example.com\n')
+        self.addCleanup(os.unlink, source.name)
+
+        out = StringIO()
+        call_command('import_subscribers', source.name, stdout=out)
+        self.assertIn('Добавлено: 1, подписаны снова: 0, пропущено: 1', out.getvalue())
+
+
+class ScaleDataGeneratorTest(TestCase):
+    """Тесты генерации данных большого объема"""
+
+    def generate(self, seed=7):
+        generator = ScaleDataGenerator(seed=seed, users=30, orders=50, concerts=4, batch_size=16)
+        generator.truncate()
+        generator.run()
+        return generator
+
+    def test_counts_and_totals(self):
+        """Количество строк, счетчики концертов и суммы заказов согласованы"""
+        User.objects.create_superuser(email='admin@example.com', password='admin123')
+        self.generate()
+
+        self.assertEqual(User.objects.filter(is_superuser=False).count(), 30)
+        self.assertTrue(User.objects.filter(email='admin@example.com').exists())
+        self.assertEqual(Subscriber.objects.count(), 10)
+        self.assertEqual(Order.objects.count(), 50)
+        self.assertEqual(Ticket.objects.count(), 30)
+        self.assertEqual(DiscountCode.objects.count(), 6)
+        self.assertEqual(Ticket.objects.filter(is_used_for_discount=True).count(), 6)
+
+        for concert in Concert.objects.all():
+            self.assertEqual(concert.sold_tickets, concert.tickets.count())
+
+        stored = {order.pk: order.total for order in Order.objects.all()}
+        Order.objects.refresh_totals()
+        for order in Order.objects.all():
+            self.assertEqual(order.total, stored[order.pk])
+
+        item = OrderItem.objects.select_related('sku').first()
+        self.assertEqual(item.sku_code, item.sku.sku_code)
+        self.assertEqual(item.created_at, item.order.created_at)
+
+    def test_deterministic(self):
+        """Одинаковый seed дает одинаковые строки, включая даты создания и изменения"""
+        def snapshot():
+            return {
+                model: list(model.objects.order_by('pk').values_list(*fields))
+                for model, fields in [
+                    (Order, ['pk', 'order_number', 'user_id', 'total', 'created_at']),
+                    (User, ['pk', 'created_at', 'updated_at']),
+                    (Concert, ['pk', 'created_at']),
+                    (DiscountCode, ['pk', 'created_at']),
+                    (SKU, ['pk', 'created_at', 'updated_at']),
+                ]
+            }
+
+        self.generate(seed=3)
+        first = snapshot()
+        self.generate(seed=3)
+
+        self.assertEqual(first, snapshot())
+        self.assertEqual(stable_uuid(3, 'order', 0), first[Order][0][0])
+        self.assertEqual(stable_uuid(3, 'order', 0).version, 7)
+
+    def test_code_sequences_continue(self):
+        """Новые коды продолжают нумерацию после сгенерированных"""
+        generator = self.generate()
+        concert = Concert.objects.get(pk=generator.concert_rows[0].pk)
+        numbers = set(concert.tickets.values_list('ticket_number', flat=True))
+
+        number = next_code(Ticket.get_number_prefix(concert), width=4)
+        self.assertNotIn(number, numbers)
+        self.assertEqual(number, f'{Ticket.get_number_prefix(concert)}{encode(concert.sold_tickets + 1, 4)}')
+
+        order = Order.objects.order_by('created_at').first()
+        prefix = order.order_number[:-6]
+        last = Order.objects.filter(order_number__startswith=prefix).order_by('-order_number').first()
+        self.assertGreater(next_code(prefix, width=6), last.order_number)
+
+    def test_partitions_independent(self):
+        """Строки раздела не зависят от порядка построения разделов"""
+        def rows(generator, order):
+            built = {}
+            for phase in generator.phases():
+                for builder, partition, start, stop in order(phase):
+                    for model, objs in generator.build_task(builder, partition, start, stop)[0]:
+                        built.setdefault(model, []).extend(
+                            (obj.pk, getattr(obj, 'total', None), getattr(obj, 'user_id', None)) for obj in objs
+                        )
+            return {model: sorted(values) for model, values in built.items()}
+
+        options = dict(seed=5, users=25000, orders=21000, concerts=3)
+        self.assertEqual(
+            rows(ScaleDataGenerator(**options), list),
+            rows(ScaleDataGenerator(**options), lambda phase: list(reversed(phase)))
+        )
+
+
+# Генератор для _build_partition, наследуется процессами пула при fork
+_partition_generator = None
+
+
+def _build_partition(task):
+    groups, _ = _partition_generator.build_task(*task)
+    return [
+        (model._meta.label, [(obj.pk, getattr(obj, 'total', None), getattr(obj, 'user_id', None)) for obj in objs])
+        for model, objs in groups
+    ]
+
+
+class PartitionWorkerTest(SimpleTestCase):
+    """Разделы, построенные в дочерних процессах, совпадают с построенными в родительском"""
+
+    def tearDown(self):
+        global _partition_generator
+        _partition_generator = None
+
+    @mock.patch('core.datagen.PARTITION_SIZE', 1000)
+    def test_fork_workers_build_same_rows(self):
+        global _partition_generator
+        _partition_generator = ScaleDataGenerator(seed=13, users=2500, orders=2500, concerts=5)
+        tasks = [task for phase in _partition_generator.phases() for task in phase]
+
+        with multiprocessing.get_context('fork').Pool(3) as pool:
+            parallel = pool.map(_build_partition, tasks)
+
+        self.assertEqual(parallel, [_build_partition(task) for task in tasks])
+
+
+@skipIf(connection.vendor == 'sqlite', 'SQLite генерирует данные в одном процессе')
+class ParallelScaleDataTest(TransactionTestCase):
+    """Параллельная генерация дает те же данные, что и последовательная"""
+
+    def snapshot(self, workers):
+        generator = ScaleDataGenerator(seed=11, users=2500, orders=2500, concerts=10)
+        generator.truncate()
+        generator.run(workers=workers)
+        return (
+            list(Order.objects.order_by('pk').values_list('pk', 'order_number', 'user_id', 'total')),
+            list(Ticket.objects.order_by('pk').values_list('pk', 'ticket_number', 'user_id')),
+        )
+
+    @mock.patch('core.datagen.PARTITION_SIZE', 1000)
+    def test_worker_count_does_not_change_data(self):
+        self.assertEqual(self.snapshot(workers=1), self.snapshot(workers=3))
+
+
+class AdminBenchmarkTest(TestCase):
+    """Количество запросов страниц админки не зависит от числа строк"""
+
+    @classmethod
+    def setUpTestData(cls):
+        random.seed(0)
+        call_command('fill_test_data', stdout=StringIO())
+        cls.admin_user = User.objects.get(email='admin@example.com')
+
+    def test_changelist_queries_do_not_grow_with_page_size(self):
+        """Списки всех моделей без запросов на каждую строку, страницы редактирования открываются"""
+        results = benchmark_admin(self.admin_user, page_sizes=(2, 5))
+
+        self.assertEqual(find_regressions(results), [])
+        measured = {result.label for result in results if result.view == 'change'}
+        self.assertIn('orders.Order', measured)
+        self.assertIn('music.Release', measured)
+        self.assertIn('concerts.Concert', measured)
+
+    def test_cache_warmed_before_each_measurement(self):
+        """Кэш навигации по датам, заполненный первым замером, не занижает следующие"""
+        cache.clear()
+        results = benchmark_admin(self.admin_user, page_sizes=(2, 5), labels=['orders.Order', 'orders.Cart'])
+
+        for label in ('orders.Order', 'orders.Cart'):
+            queries = {result.queries for result in results if result.label == label and result.view == 'changelist'}
+            self.assertEqual(len(queries), 1, label)
+
+    def test_command_seeds_scale_data(self):
+        out = StringIO()
+        call_command('benchmark_admin', '--users', '40', '--orders', '60', '--model', 'orders.Order', stdout=out)
+
+        self.assertEqual(Order.objects.count(), 60)
+        self.assertIn('orders.Order', out.getvalue())
+        self.assertNotIn('Замер на текущих данных', out.getvalue())
+
+    def test_find_regressions(self):
+        """Рост запросов вместе с числом строк считается регрессией"""
+        results = [
+            AdminMeasurement('orders.Cart', 'changelist', 2, 2, 7, 0.01, 100),
+            AdminMeasurement('orders.Cart', 'changelist', 5, 5, 10, 0.01, 100),
+            AdminMeasurement('orders.Order', 'changelist', 2, 2, 5, 0.01, 100),
+            AdminMeasurement('orders.Order', 'changelist', 5, 5, 5, 0.01, 100),
+            AdminMeasurement('merch.Product', 'changelist', 2, 2, 5, 0.01, 100),
+            AdminMeasurement('merch.Product', 'changelist', 5, 2, 6, 0.01, 100),
+        ]
+
+        self.assertEqual(find_regressions(results), [('orders.Cart', {2: 7, 5: 10})])
+
+
+class EstimatedCountPaginatorTest(TestCase):
+    """Приблизительное количество строк для больших выборок"""
+
+    def setUp(self):
+        for index in range(3):
+            Subscriber.objects.create(email=f'reader{index}@example.com')
+        self.queryset = Subscriber.objects.order_by('email')
+
+    def test_exact_count_without_estimate(self):
+        """Без оценки планировщика (например, SQLite) строки считаются точно"""
+        with mock.patch('core.admin_changelist.estimate_count', return_value=None):
+            self.assertEqual(EstimatedCountPaginator(self.queryset, 2).count, 3)
+
+    def test_estimate_above_threshold(self):
+        """Большая оценка используется как есть"""
+        with mock.patch('core.admin_changelist.estimate_count', return_value=5000000), \
+                self.settings(ADMIN_ESTIMATED_COUNT_THRESHOLD=100000):
+            paginator = EstimatedCountPaginator(self.queryset, 100)
+            with self.assertNumQueries(0):
+                self.assertEqual(paginator.count, 5000000)
+            self.assertEqual(paginator.num_pages, 50000)
+
+    def test_small_estimate_counted_exactly(self):
+        """Оценка ниже порога перепроверяется точным COUNT"""
+        with mock.patch('core.admin_changelist.estimate_count', return_value=40), \
+                self.settings(ADMIN_ESTIMATED_COUNT_THRESHOLD=100000):
+            self.assertEqual(EstimatedCountPaginator(self.queryset, 2).count, 3)
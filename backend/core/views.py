@@ -0,0 +1,28 @@
+from django.contrib.admin.views.decorators import staff_member_required
+from django.http import HttpResponseBadRequest, StreamingHttpResponse
+from django.utils import timezone
+from django.views.decorators.http import require_GET
+
+from .audience import EXPORT_FORMATS, iter_audience, render_audience
+
+CONTENT_TYPES = {
+    'csv': 'text/csv; charset=utf-8',
+    'ndjson': 'application/x-ndjson; charset=utf-8',
+}
+
+
+@require_GET
+@staff_member_required
+def audience_export(request):
+    """Потоковая выгрузка аудитории рассылки (только для персонала)"""
+    export_format = request.GET.get('format', 'csv')
+    if export_format not in EXPORT_FORMATS:
+        return HttpResponseBadRequest(f'Формат должен быть одним из: {", ".join(EXPORT_FORMATS)}')
+
+    response = StreamingHttpResponse(
+        render_audience(iter_audience(), export_format),
+        content_type=CONTENT_TYPES[export_format]
+    )
+    filename = f"audience-{timezone.now():%Y%m%d}.{export_format}"
+    response['Content-Disposition'] = f'attachment; filename="{filename}"'
+    return response
@@ -1,6 +1,6 @@
 from django.contrib import admin
-from django.utils import timezone
 from .models import DiscountCode
+from .services import bump_discount_version
 
 
 @admin.register(DiscountCode)
@@ -11,7 +11,7 @@ class DiscountCodeAdmin(admin.ModelAdmin):
     search_fields = ('code', 'ticket__ticket_number', 'ticket__user__email')
     date_hierarchy = 'valid_until'
     raw_id_fields = ('ticket',)
-    actions = ['activate', 'deactivate', 'extend_validity']
+    actions = ['activate', 'deactivate', 'extend_validity', 'deactivate_expired']
     readonly_fields = ('created_at', 'is_valid')
 
     fieldsets = (
@@ -29,17 +29,24 @@ class DiscountCodeAdmin(admin.ModelAdmin):
 
     @admin.action(description='Активировать выбранные коды')
     def activate(self, request, queryset):
-        queryset.update(is_active=True)
-        self.message_user(request, f"{queryset.count()} кодов активировано")
+        updated = queryset.update(is_active=True)
+        bump_discount_version()
+        self.message_user(request, f"{updated} кодов активировано")
 
     @admin.action(description='Деактивировать выбранные коды')
     def deactivate(self, request, queryset):
-        queryset.update(is_active=False)
-        self.message_user(request, f"{queryset.count()} кодов деактивировано")
+        updated = queryset.update(is_active=False)
+        bump_discount_version()
+        self.message_user(request, f"{updated} кодов деактивировано")
 
     @admin.action(description='Продлить срок действия на 30 дней')
     def extend_validity(self, request, queryset):
-        for code in queryset:
-            code.valid_until = code.valid_until + timezone.timedelta(days=30)
-            code.save()
-        self.message_user(request, f"Срок действия {queryset.count()} кодов продлен на 30 дней")
\ No newline at end of file
+        updated = queryset.extend_validity(days=30)
+        bump_discount_version()
+        self.message_user(request, f"Срок действия {updated} кодов продлен на 30 дней")
+
+    @admin.action(description='Деактивировать истекшие коды')
+    def deactivate_expired(self, request, queryset):
+        updated = queryset.deactivate_expired()
+        bump_discount_version()
+        self.message_user(request, f"{updated} истекших кодов деактивировано")
@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from discounts.models import DiscountCode
+from discounts.services import bump_discount_version
+
+
+class Command(BaseCommand):
+    help = 'Деактивирует промо-коды с истекшим сроком действия (ночная задача)'
+
+    def handle(self, *args, **options):
+        updated = DiscountCode.objects.deactivate_expired()
+        if updated:
+            bump_discount_version()
+        self.stdout.write(self.style.SUCCESS(f'✅ Деактивировано промо-кодов: {updated}'))
@@ -0,0 +1,50 @@
+from datetime import datetime, time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from concerts.models import Ticket
+from discounts.services import issue_discount_codes
+
+
+class Command(BaseCommand):
+    help = 'Выпускает промо-коды для билетов концерта или концертов за период'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--concert', help='ID концерта')
+        parser.add_argument('--date-from', help='Концерты с даты (ГГГГ-ММ-ДД)')
+        parser.add_argument('--date-to', help='Концерты по дату включительно (ГГГГ-ММ-ДД)')
+        parser.add_argument('--percent', type=int, default=15, help='Процент скидки')
+        parser.add_argument('--batch-size', type=int, default=1000, help='Кодов в одном INSERT')
+        parser.add_argument('--after', help='ID билета, после которого продолжить выпуск')
+
+    def handle(self, *args, **options):
+        if not (options['concert'] or options['date_from'] or options['date_to']):
+            raise CommandError('Укажите --concert или период --date-from/--date-to')
+
+        tickets = Ticket.objects.all()
+        if options['concert']:
+            tickets = tickets.filter(concert_id=options['concert'])
+        if options['date_from']:
+            tickets = tickets.filter(concert__date__gte=self._parse_date(options['date_from'], time.min))
+        if options['date_to']:
+            tickets = tickets.filter(concert__date__lte=self._parse_date(options['date_to'], time.max))
+
+        issued = issue_discount_codes(
+            tickets,
+            discount_percent=options['percent'],
+            batch_size=options['batch_size'],
+            start_after=options['after'],
+            progress=self._progress,
+        )
+        self.stdout.write(self.style.SUCCESS(f'✅ Выпущено промо-кодов: {issued}'))
+
+    def _progress(self, issued, total, last_pk):
+        self.stdout.write(f'  {issued}/{total}, последний билет {last_pk}')
+
+    def _parse_date(self, value, at):
+        try:
+            day = datetime.strptime(value, '%Y-%m-%d').date()
+        except ValueError:
+            raise CommandError(f'Неверная дата: {value}')
+        return timezone.make_aware(datetime.combine(day, at))
@@ -0,0 +1,17 @@
+# Generated by Django 4.2.7 on 2026-10-17 20:28
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('discounts', '0003_alter_discountcode_discount_percent'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='discountcode',
+            index=models.Index(condition=models.Q(('is_active', True)), fields=['valid_until'], name='discount_active_valid_idx'),
+        ),
+    ]
@@ -1,9 +1,34 @@
 import uuid
 from django.db import models
+from django.db.models import F
+from django.db.models.functions import Cast
 from django.utils import timezone
 from datetime import timedelta
 
 
+class DiscountCodeQuerySet(models.QuerySet):
+    def valid(self, today=None):
+        """Активные коды с неистекшим сроком действия"""
+        return self.filter(is_active=True, valid_until__gte=today or timezone.localdate())
+
+    def unused(self):
+        """Коды, еще не примененные ни к одному заказу"""
+        return self.filter(orderdiscount__isnull=True)
+
+    def extend_validity(self, days):
+        """Продление срока действия на days дней одним UPDATE, возвращает количество кодов"""
+        return self.update(
+            valid_until=Cast(F('valid_until') + timedelta(days=days), output_field=models.DateField())
+        )
+
+    def deactivate_expired(self, today=None):
+        """Деактивация истекших кодов одним UPDATE, возвращает количество кодов"""
+        return self.filter(
+            is_active=True,
+            valid_until__lt=today or timezone.localdate()
+        ).update(is_active=False)
+
+
 class DiscountCode(models.Model):
     """Промо-код (связан с билетом)"""
     id = models.UUIDField(
@@ -39,10 +64,22 @@ class DiscountCode(models.Model):
         verbose_name='Дата создания'
     )
 
+    objects = DiscountCodeQuerySet.as_manager()
+
     class Meta:
         verbose_name = 'Промо-код'
         verbose_name_plural = 'Промо-коды'
         ordering = ['-created_at']
+        indexes = [
+            # Активные коды по сроку действия: valid() и deactivate_expired().
+            # Условие индекса не может зависеть от текущей даты, поэтому
+            # срок действия хранится в ключе, а в индекс попадают только активные коды
+            models.Index(
+                fields=['valid_until'],
+                condition=models.Q(is_active=True),
+                name='discount_active_valid_idx'
+            ),
+        ]
 
     def __str__(self):
         return f"{self.code} ({self.discount_percent}%)"
@@ -53,10 +90,10 @@ class DiscountCode(models.Model):
             self.code = self.ticket.ticket_number
         if not self.valid_until:
             # По умолчанию +365 дней
-            self.valid_until = timezone.now().date() + timedelta(days=365)
+            self.valid_until = timezone.localdate() + timedelta(days=365)
         super().save(*args, **kwargs)
 
     @property
     def is_valid(self):
         """Проверка, действителен ли код сейчас"""
-        return self.is_active and self.valid_until >= timezone.now().date()
\ No newline at end of file
+        return self.is_active and self.valid_until >= timezone.localdate()
\ No newline at end of file
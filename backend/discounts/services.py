@@ -0,0 +1,216 @@
+"""
+Проверка и выпуск промо-кодов.
+
+Сведения о коде (процент, срок действия, активность, использование) кэшируются
+в два уровня: в памяти процесса на несколько секунд и в общем кэше до
+изменения кода. Сохранение или удаление кода и его применение к заказу
+удаляют запись из общего кэша; массовые изменения увеличивают версию ключей
+(core.cache).
+Локальный кэш других процессов устаревает не дольше чем на
+DISCOUNT_CODE_LOCAL_TTL, поэтому при оформлении заказа выбранные коды
+дополнительно подтверждаются в БД.
+"""
+import threading
+import time
+from datetime import timedelta
+from typing import NamedTuple
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Exists, OuterRef
+from django.utils import timezone
+
+from core.cache import bump_version, get_version
+from orders.models import OrderDiscount
+from .models import DiscountCode
+
+DISCOUNT_VERSION_KEY = 'discounts:codes:version'
+
+# Отметка «кода нет» в общем кэше (None означает промах)
+_MISSING = 0
+
+
+class CodeInfo(NamedTuple):
+    """Сведения о промо-коде, достаточные для проверки"""
+    id: object
+    code: str
+    percent: int
+    valid_until: object
+    is_active: bool
+    is_used: bool
+
+    def is_valid(self, today=None):
+        """Код можно применить: активен, не истек и еще не использован"""
+        today = today or timezone.localdate()
+        return self.is_active and not self.is_used and self.valid_until >= today
+
+
+class InvalidDiscountCodes(Exception):
+    """Промо-коды не найдены или недействительны"""
+
+    def __init__(self, codes):
+        self.codes = codes
+        super().__init__(f"Недействительные промо-коды: {', '.join(codes)}")
+
+
+class _LocalCache:
+    """Кэш в памяти процесса с коротким временем жизни записей"""
+
+    def __init__(self):
+        self._data = {}
+        self._lock = threading.Lock()
+
+    def get(self, code):
+        with self._lock:
+            entry = self._data.get(code)
+        if entry is None or entry[0] < time.monotonic():
+            return None
+        return entry[1]
+
+    def set(self, code, value):
+        ttl = getattr(settings, 'DISCOUNT_CODE_LOCAL_TTL', 5)
+        with self._lock:
+            self._data[code] = (time.monotonic() + ttl, value)
+
+    def pop(self, code):
+        with self._lock:
+            self._data.pop(code, None)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+
+_local = _LocalCache()
+
+
+def get_discount_version():
+    """Текущая версия ключей кэша промо-кодов"""
+    return get_version(DISCOUNT_VERSION_KEY)
+
+
+def bump_discount_version():
+    """Инвалидация всех закэшированных промо-кодов (после массовых изменений)"""
+    _local.clear()
+    bump_version(DISCOUNT_VERSION_KEY)
+
+
+def invalidate_codes(codes):
+    """Сброс кэша для перечисленных кодов"""
+    version = get_discount_version()
+    for code in codes:
+        _local.pop(code)
+    cache.delete_many([_key(version, code) for code in codes])
+
+
+def get_code_infos(codes):
+    """
+    Сведения о кодах: {code: CodeInfo или None}.
+    Промахи обоих кэшей дочитываются одним запросом.
+    """
+    codes = list(dict.fromkeys(codes))
+    found = {}
+    for code in codes:
+        info = _local.get(code)
+        if info is not None:
+            found[code] = info
+
+    local_misses = [code for code in codes if code not in found]
+    if local_misses:
+        version = get_discount_version()
+        shared = cache.get_many([_key(version, code) for code in local_misses])
+        for code in local_misses:
+            if _key(version, code) in shared:
+                found[code] = shared[_key(version, code)]
+
+        missing = [code for code in local_misses if code not in found]
+        if missing:
+            loaded = _load(missing)
+            found.update(loaded)
+            cache.set_many(
+                {_key(version, code): info for code, info in loaded.items()},
+                settings.DISCOUNT_CODE_CACHE_TIMEOUT
+            )
+
+        # Локальные попадания не продлеваются, иначе запись живет дольше TTL
+        for code in local_misses:
+            _local.set(code, found[code])
+
+    return {code: found[code] or None for code in codes}
+
+
+def validate_codes(codes, today=None):
+    """Сведения о действующих кодах в порядке перечисления или InvalidDiscountCodes"""
+    infos = get_code_infos(codes)
+    invalid = [code for code, info in infos.items() if info is None or not info.is_valid(today)]
+    if invalid:
+        raise InvalidDiscountCodes(invalid)
+    return list(infos.values())
+
+
+def issue_discount_codes(tickets, discount_percent=15, valid_until=None, batch_size=1000,
+                         start_after=None, progress=None):
+    """
+    Выпуск промо-кодов для билетов без кода.
+
+    Билеты читаются пачками по первичному ключу (keyset), коды каждой пачки
+    создаются одним bulk_create в отдельной транзакции, поэтому прерванный
+    выпуск можно продолжить: повторный запуск пропустит билеты с кодами,
+    а start_after позволяет не просматривать уже обработанный диапазон.
+    В конце билеты с кодами отмечаются одним UPDATE.
+
+    progress(issued, total, last_pk) вызывается после каждой пачки.
+    Возвращает количество выпущенных кодов.
+    """
+    valid_until = valid_until or timezone.localdate() + timedelta(days=365)
+    pending = tickets.filter(discount_code__isnull=True)
+    if start_after is not None:
+        pending = pending.filter(pk__gt=start_after)
+    total = pending.count()
+
+    issued = 0
+    last_pk = start_after
+    while True:
+        batch = pending if last_pk is None else pending.filter(pk__gt=last_pk)
+        rows = list(batch.order_by('pk').values_list('pk', 'ticket_number')[:batch_size])
+        if not rows:
+            break
+
+        with transaction.atomic():
+            DiscountCode.objects.bulk_create([
+                DiscountCode(
+                    ticket_id=ticket_id,
+                    code=ticket_number,
+                    discount_percent=discount_percent,
+                    valid_until=valid_until
+                )
+                for ticket_id, ticket_number in rows
+            ])
+            codes = [ticket_number for _, ticket_number in rows]
+            # Неизвестные ранее коды могли попасть в кэш как отсутствующие
+            transaction.on_commit(lambda codes=codes: invalidate_codes(codes))
+
+        issued += len(rows)
+        last_pk = rows[-1][0]
+        if progress:
+            progress(issued, total, last_pk)
+
+    tickets.filter(discount_code__isnull=False, is_used_for_discount=False).update(is_used_for_discount=True)
+    return issued
+
+
+def _key(version, code):
+    return f'discounts:code:{version}:{code}'
+
+
+def _load(codes):
+    rows = (
+        DiscountCode.objects.filter(code__in=codes)
+        .annotate(is_used=Exists(OrderDiscount.objects.filter(discount_code=OuterRef('pk'))))
+        .values_list('id', 'code', 'discount_percent', 'valid_until', 'is_active', 'is_used')
+    )
+    loaded = dict.fromkeys(codes, _MISSING)
+    for row in rows:
+        loaded[row[1]] = CodeInfo(*row)
+    return loaded
@@ -0,0 +1,23 @@
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from orders.models import OrderDiscount
+from .models import DiscountCode
+from .services import invalidate_codes
+
+
+@receiver(post_save, sender=DiscountCode)
+@receiver(post_delete, sender=DiscountCode)
+def invalidate_discount_code(sender, instance, **kwargs):
+    transaction.on_commit(lambda: invalidate_codes([instance.code]))
+
+
+@receiver(post_save, sender=OrderDiscount)
+@receiver(post_delete, sender=OrderDiscount)
+def invalidate_applied_code(sender, instance, **kwargs):
+    # Применение кода (или его отмена) меняет признак использования
+    if instance.discount_code_id:
+        code = DiscountCode.objects.filter(pk=instance.discount_code_id).values_list('code', flat=True).first()
+        if code:
+            transaction.on_commit(lambda: invalidate_codes([code]))
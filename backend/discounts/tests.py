@@ -1,9 +1,19 @@
 # discounts/tests/tests.py
 from datetime import date, timedelta
-from django.test import TestCase
+from io import StringIO
+from unittest import mock
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import TestCase, override_settings
 from django.utils import timezone
 from concerts.models import Concert, Ticket
+from concerts.services import purchase_tickets
+from discounts import services
 from discounts.models import DiscountCode
+from discounts.services import InvalidDiscountCodes, get_code_infos, issue_discount_codes, validate_codes
+from merch.models import Product, SKU
+from orders.models import Cart, CartItem
+from orders.services import CheckoutError, checkout
 from django.contrib.auth import get_user_model
 
 User = get_user_model()
@@ -64,4 +74,195 @@ class DiscountCodeAutoGenerationTest(TestCase):
         discount.valid_until = date.today() + timedelta(days=30)
         discount.is_active = False
         discount.save()
-        self.assertFalse(discount.is_valid)
\ No newline at end of file
+        self.assertFalse(discount.is_valid)
+
+
+class DiscountValidationTest(TestCase):
+    """Тесты проверки промо-кодов через кэш"""
+
+    def setUp(self):
+        cache.clear()
+        services._local.clear()
+        self.user = User.objects.create_user(email='test@example.com')
+        self.concert = Concert.objects.create(
+            venue='Test Venue',
+            city='Moscow',
+            date=timezone.now() + timedelta(days=30),
+            price=2000
+        )
+        self.ticket = Ticket.objects.create(concert=self.concert, user=self.user, price_paid=2000)
+        self.discount = DiscountCode.objects.create(ticket=self.ticket, discount_percent=10)
+
+    def test_lookup_is_cached(self):
+        """Повторная проверка не обращается к БД, в том числе для неизвестных кодов"""
+        validate_codes([self.discount.code])
+        with self.assertRaises(InvalidDiscountCodes):
+            validate_codes(['NO-SUCH-CODE'])
+
+        with self.assertNumQueries(0):
+            info = validate_codes([self.discount.code])[0]
+            self.assertEqual(get_code_infos(['NO-SUCH-CODE']), {'NO-SUCH-CODE': None})
+        self.assertEqual((info.percent, info.is_used), (10, False))
+
+    def test_shared_cache_used_after_local_expiry(self):
+        validate_codes([self.discount.code])
+        services._local.clear()
+        with self.assertNumQueries(0):
+            validate_codes([self.discount.code])
+
+    @override_settings(DISCOUNT_CODE_LOCAL_TTL=5)
+    def test_local_hit_not_extended(self):
+        """Промах по другому коду не продлевает локальную запись"""
+        with mock.patch('discounts.services.time') as clock:
+            clock.monotonic.return_value = 100
+            get_code_infos([self.discount.code])
+            clock.monotonic.return_value = 103
+            get_code_infos([self.discount.code, 'NO-SUCH-CODE'])
+            clock.monotonic.return_value = 106
+            self.assertIsNone(services._local.get(self.discount.code))
+            self.assertIsNotNone(services._local.get('NO-SUCH-CODE'))
+
+    def test_save_invalidates(self):
+        validate_codes([self.discount.code])
+        with self.captureOnCommitCallbacks(execute=True):
+            self.discount.is_active = False
+            self.discount.save()
+
+        with self.assertRaises(InvalidDiscountCodes) as error:
+            validate_codes([self.discount.code])
+        self.assertEqual(error.exception.codes, [self.discount.code])
+
+    def test_code_used_once(self):
+        """Примененный к заказу код становится недействительным"""
+        product = Product.objects.create(name='Футболка', category='clothing')
+        sku = SKU.objects.create(product=product, attributes={'size': 'M'}, price=2500, stock=10)
+        carts = [Cart.objects.create(session_id=f'cart_{i}') for i in range(2)]
+        for cart in carts:
+            CartItem.objects.create(cart=cart, sku=sku, quantity=1)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            checkout(carts[0], discount_codes=[self.discount.code])
+
+        self.assertTrue(get_code_infos([self.discount.code])[self.discount.code].is_used)
+        with self.assertRaises(CheckoutError):
+            checkout(carts[1], discount_codes=[self.discount.code])
+
+    def test_checkout_rechecks_stale_cache(self):
+        """Устаревшая запись кэша не пропускает деактивированный код"""
+        validate_codes([self.discount.code])
+        DiscountCode.objects.filter(pk=self.discount.pk).update(is_active=False)
+        product = Product.objects.create(name='Футболка', category='clothing')
+        sku = SKU.objects.create(product=product, attributes={'size': 'M'}, price=2500, stock=10)
+        cart = Cart.objects.create(session_id='cart')
+        CartItem.objects.create(cart=cart, sku=sku, quantity=1)
+
+        with self.assertRaises(CheckoutError):
+            checkout(cart, discount_codes=[self.discount.code])
+        with self.assertRaises(InvalidDiscountCodes):
+            validate_codes([self.discount.code])
+
+
+class DiscountMaintenanceTest(TestCase):
+    """Тесты массового обслуживания промо-кодов"""
+
+    def setUp(self):
+        user = User.objects.create_user(email='test@example.com')
+        concert = Concert.objects.create(
+            venue='Test Venue',
+            city='Moscow',
+            date=timezone.now() + timedelta(days=30),
+            price=2000
+        )
+        self.codes = [
+            DiscountCode.objects.create(
+                ticket=Ticket.objects.create(concert=concert, user=user, price_paid=2000),
+                valid_until=date.today() + timedelta(days=days)
+            )
+            for days in [-10, -1, 0, 30]
+        ]
+
+    def test_extend_validity_single_update(self):
+        with self.assertNumQueries(1):
+            updated = DiscountCode.objects.filter(pk__in=[c.pk for c in self.codes[:2]]).extend_validity(30)
+
+        self.assertEqual(updated, 2)
+        self.codes[0].refresh_from_db()
+        self.assertEqual(self.codes[0].valid_until, date.today() + timedelta(days=20))
+        self.assertTrue(self.codes[0].is_valid)
+
+    def test_deactivate_expired(self):
+        with self.assertNumQueries(1):
+            updated = DiscountCode.objects.deactivate_expired()
+
+        self.assertEqual(updated, 2)
+        self.assertEqual(
+            list(DiscountCode.objects.filter(is_active=True).order_by('valid_until')
+                 .values_list('pk', flat=True)),
+            [self.codes[2].pk, self.codes[3].pk]
+        )
+
+    def test_expire_command(self):
+        out = StringIO()
+        call_command('expire_discount_codes', stdout=out)
+        self.assertIn('Деактивировано промо-кодов: 2', out.getvalue())
+
+
+class IssueDiscountCodesTest(TestCase):
+    """Тесты пакетного выпуска промо-кодов"""
+
+    def setUp(self):
+        cache.clear()
+        services._local.clear()
+        user = User.objects.create_user(email='test@example.com')
+        self.concert = Concert.objects.create(
+            venue='Test Venue',
+            city='Moscow',
+            date=timezone.now() + timedelta(days=30),
+            price=2000,
+            total_tickets=20
+        )
+        self.tickets = sorted(purchase_tickets(self.concert, user, quantity=7), key=lambda t: t.pk)
+        DiscountCode.objects.create(ticket=self.tickets[0], discount_percent=10)
+        other = Concert.objects.create(
+            venue='Other', city='Kazan', date=timezone.now() + timedelta(days=40), price=1500
+        )
+        purchase_tickets(other, user)
+
+    def test_issue_in_batches(self):
+        progress = []
+        with self.assertNumQueries(1 + 4 * 3 + 1 + 1):
+            issued = issue_discount_codes(
+                self.concert.tickets.all(),
+                batch_size=2,
+                progress=lambda *args: progress.append(args)
+            )
+
+        self.assertEqual(issued, 6)
+        self.assertEqual([p[:2] for p in progress], [(2, 6), (4, 6), (6, 6)])
+        self.assertEqual(DiscountCode.objects.filter(ticket__concert=self.concert).count(), 7)
+        self.assertFalse(self.concert.tickets.filter(is_used_for_discount=False).exists())
+        self.assertFalse(DiscountCode.objects.filter(ticket__concert__city='Kazan').exists())
+        code = DiscountCode.objects.get(ticket=self.tickets[3])
+        self.assertEqual((code.code, code.discount_percent), (self.tickets[3].ticket_number, 15))
+
+    def test_resume(self):
+        """Повторный запуск выпускает коды только для оставшихся билетов"""
+        issue_discount_codes(self.concert.tickets.all(), start_after=self.tickets[4].pk)
+        self.assertEqual(DiscountCode.objects.count(), 3)
+
+        self.assertEqual(issue_discount_codes(self.concert.tickets.all()), 4)
+        self.assertEqual(issue_discount_codes(self.concert.tickets.all()), 0)
+
+    def test_issued_codes_pass_validation(self):
+        with self.assertRaises(InvalidDiscountCodes):
+            validate_codes([self.tickets[1].ticket_number])
+        with self.captureOnCommitCallbacks(execute=True):
+            issue_discount_codes(self.concert.tickets.all())
+        self.assertEqual(validate_codes([self.tickets[1].ticket_number])[0].percent, 15)
+
+    def test_command(self):
+        out = StringIO()
+        call_command(
+            'issue_discount_codes', '--concert', str(self.concert.pk), '--batch-size', '5', stdout=out
+        )
+        self.assertIn('Выпущено промо-кодов: 6', out.getvalue())
@@ -1,5 +1,7 @@
 from django.contrib import admin
 from django import forms
+from core.admin_changelist import related_count
+from .cache import bump_catalog_version
 from .models import Product, SKU, ProductImage
 
 
@@ -49,22 +51,25 @@ class ProductAdmin(admin.ModelAdmin):
         }),
     )
 
-    @admin.display(description='Количество SKU')
+    @admin.display(description='Количество SKU', ordering='sku_count')
     def sku_count(self, obj):
-        return obj.skus.count()
+        # У нового товара в форме добавления аннотации нет
+        return getattr(obj, 'sku_count', 0)
 
     @admin.action(description='Активировать выбранные товары')
     def activate(self, request, queryset):
         queryset.update(is_active=True)
+        bump_catalog_version()
         self.message_user(request, f"{queryset.count()} товаров активировано")
 
     @admin.action(description='Деактивировать выбранные товары')
     def deactivate(self, request, queryset):
         queryset.update(is_active=False)
+        bump_catalog_version()
         self.message_user(request, f"{queryset.count()} товаров деактивировано")
 
     def get_queryset(self, request):
-        return super().get_queryset(request).prefetch_related('skus')
+        return super().get_queryset(request).annotate(sku_count=related_count(SKU, 'product'))
 
 
 class SKUForm(forms.ModelForm):
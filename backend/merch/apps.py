@@ -4,3 +4,6 @@ from django.apps import AppConfig
 class MerchConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'merch'
+
+    def ready(self):
+        from . import signals  # noqa: F401
@@ -0,0 +1,60 @@
+"""
+Кэш каталога мерча.
+
+Все ключи содержат номер версии каталога (core.cache). Любое изменение
+товаров, SKU или изображений увеличивает версию.
+"""
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Prefetch
+
+from core.cache import bump_version, get_version
+from .models import Product, SKU
+
+CATALOG_VERSION_KEY = 'merch:catalog:version'
+
+
+def get_catalog_version():
+    """Текущая версия каталога"""
+    return get_version(CATALOG_VERSION_KEY)
+
+
+def bump_catalog_version():
+    """Инвалидация всех закэшированных списков каталога"""
+    bump_version(CATALOG_VERSION_KEY)
+
+
+def _cached(name, build):
+    key = f'merch:catalog:{get_catalog_version()}:{name}'
+    value = cache.get(key)
+    if value is None:
+        # Пересборка идет сразу после увеличения версии, и отстающая реплика
+        # попала бы в кэш под новой версией. Внутри транзакции роутер читает
+        # каталог с основной БД
+        with transaction.atomic():
+            value = build()
+        cache.set(key, value, settings.CATALOG_CACHE_TIMEOUT)
+    return value
+
+
+def product_listing(category=None, in_stock=False):
+    """Активные товары витрины с активными SKU и изображениями"""
+    def build():
+        products = Product.active.in_stock() if in_stock else Product.active.all()
+        if category:
+            products = products.filter(category=category)
+        return list(products.prefetch_related(
+            Prefetch('skus', queryset=SKU.objects.filter(is_active=True)),
+            'images',
+        ))
+
+    return _cached(f'products:{category or "all"}:{int(in_stock)}', build)
+
+
+def product_skus(product_id):
+    """Активные SKU товара"""
+    return _cached(
+        f'skus:{product_id}',
+        lambda: list(SKU.objects.filter(product_id=product_id, is_active=True).select_related('product'))
+    )
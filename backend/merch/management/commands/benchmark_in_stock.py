@@ -0,0 +1,71 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+
+from merch.models import Product, SKU
+
+
+class Rollback(Exception):
+    """Откат тестовых данных после замеров"""
+
+
+class Command(BaseCommand):
+    help = 'Сравнивает планы и время запроса товаров в наличии: JOIN + DISTINCT против EXISTS'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--products', type=int, default=10000, help='Количество товаров')
+        parser.add_argument('--skus', type=int, default=20, help='SKU на товар')
+        parser.add_argument('--repeat', type=int, default=5, help='Повторов каждого запроса')
+
+    def handle(self, *args, **options):
+        try:
+            with transaction.atomic():
+                self.fill(options['products'], options['skus'])
+                self.compare(options['repeat'])
+                raise Rollback
+        except Rollback:
+            self.stdout.write('Тестовые данные удалены')
+
+    def fill(self, product_count, sku_count):
+        self.stdout.write(f'Создаем {product_count} товаров по {sku_count} SKU...')
+        products = Product.objects.bulk_create(
+            [Product(name=f'Benchmark {i}', category='clothing') for i in range(product_count)],
+            batch_size=1000
+        )
+        # У каждого третьего товара нет остатков, у остальных в наличии только последний SKU
+        SKU.objects.bulk_create(
+            [
+                SKU(
+                    product=product,
+                    sku_code=f'BENCH-{i}-{j}',
+                    display_name=f'{product.name} {j}',
+                    attributes={'variant': j},
+                    price=1000,
+                    stock=5 if i % 3 and j == sku_count - 1 else 0,
+                )
+                for i, product in enumerate(products)
+                for j in range(sku_count)
+            ],
+            batch_size=2000
+        )
+        if connection.vendor == 'postgresql':
+            with connection.cursor() as cursor:
+                cursor.execute(f'ANALYZE {Product._meta.db_table}, {SKU._meta.db_table}')
+
+    def compare(self, repeat):
+        querysets = {
+            'JOIN + DISTINCT': Product.active.filter(skus__stock__gt=0).distinct(),
+            'EXISTS': Product.active.in_stock(),
+        }
+        for name, queryset in querysets.items():
+            queryset = queryset.order_by().values_list('pk', flat=True)
+            timings = []
+            for _ in range(repeat):
+                started = time.perf_counter()
+                count = len(list(queryset.all()))
+                timings.append(time.perf_counter() - started)
+
+            self.stdout.write(self.style.MIGRATE_HEADING(f'\n{name}'))
+            self.stdout.write(queryset.explain())
+            self.stdout.write(f'Товаров: {count}, лучшее время: {min(timings) * 1000:.1f} мс')
@@ -0,0 +1,17 @@
+# Generated by Django 4.2.7 on 2026-10-17 20:20
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('merch', '0003_remove_productimage_is_primary_remove_sku_image'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='sku',
+            index=models.Index(fields=['product', 'stock'], name='merch_sku_product_413f03_idx'),
+        ),
+    ]
@@ -0,0 +1,43 @@
+# Generated by Django 4.2.7 on 2026-10-17 20:22
+
+import core.ids
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+def fill_sku_attributes(apps, schema_editor):
+    SKU = apps.get_model('merch', 'SKU')
+    SKUAttribute = apps.get_model('merch', 'SKUAttribute')
+    rows = [
+        SKUAttribute(id=core.ids.uuid7(), sku_id=sku.pk, product_id=sku.product_id, name=name, value=str(value))
+        for sku in SKU.objects.only('pk', 'product_id', 'attributes').iterator()
+        for name, value in (sku.attributes or {}).items()
+    ]
+    SKUAttribute.objects.bulk_create(rows, batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('merch', '0004_sku_product_stock_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SKUAttribute',
+            fields=[
+                ('id', models.UUIDField(default=core.ids.uuid7, editable=False, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=50, verbose_name='Характеристика')),
+                ('value', models.CharField(max_length=100, verbose_name='Значение')),
+                ('product', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='merch.product', verbose_name='Товар')),
+                ('sku', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='attribute_values', to='merch.sku', verbose_name='SKU')),
+            ],
+            options={
+                'verbose_name': 'Характеристика SKU',
+                'verbose_name_plural': 'Характеристики SKU',
+                'indexes': [models.Index(fields=['name', 'value'], name='merch_skuat_name_472a22_idx'), models.Index(fields=['product', 'name', 'value'], name='merch_skuat_product_8aa66e_idx')],
+                'unique_together': {('sku', 'name')},
+            },
+        ),
+        migrations.RunPython(fill_sku_attributes, migrations.RunPython.noop),
+    ]
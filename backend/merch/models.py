@@ -1,15 +1,63 @@
 import uuid
-import random
-import string
 from django.db import models
+from django.db.models import Count, Exists, OuterRef
 from django.core.validators import MinValueValidator
 
+from core.codes import next_code
+from core.ids import uuid7
+
+
 class ActiveProductManager(models.Manager):
     def get_queryset(self):
         return super().get_queryset().filter(is_active=True)
 
     def in_stock(self):
-        return self.get_queryset().filter(skus__stock__gt=0).distinct()
+        # EXISTS вместо JOIN + DISTINCT: товар не дублируется по числу SKU
+        return self.get_queryset().filter(
+            Exists(SKU.objects.filter(product=OuterRef('pk'), stock__gt=0))
+        )
+
+
+class SKUQuerySet(models.QuerySet):
+    def with_attributes(self, **attributes):
+        """SKU с заданными характеристиками: with_attributes(color='Black', size='M')"""
+        queryset = self
+        for name, value in attributes.items():
+            queryset = queryset.filter(Exists(
+                SKUAttribute.objects.filter(sku=OuterRef('pk'), name=name, value=str(value))
+            ))
+        return queryset
+
+    def facets(self, product_qs=None):
+        """
+        Количество товаров по каждому значению характеристик одним запросом:
+        {'color': {'Black': 12, 'White': 3}, 'size': {...}}
+        """
+        attributes = SKUAttribute.objects.all()
+        if product_qs is not None:
+            attributes = attributes.filter(product__in=product_qs.values('pk'))
+        if self.query.has_filters():
+            attributes = attributes.filter(sku__in=self.values('pk'))
+
+        facets = {}
+        rows = (
+            attributes.order_by('name', 'value')
+            .values_list('name', 'value')
+            .annotate(count=Count('product', distinct=True))
+        )
+        for name, value, count in rows:
+            facets.setdefault(name, {})[value] = count
+        return facets
+
+    def sync_attributes(self):
+        """Пересоздание строк характеристик для SKU из выборки (после bulk_create)"""
+        skus = list(self.only('pk', 'product_id', 'attributes'))
+        SKUAttribute.objects.filter(sku__in=[sku.pk for sku in skus]).delete()
+        return SKUAttribute.objects.bulk_create(
+            [row for sku in skus for row in sku.build_attribute_rows()],
+            batch_size=1000
+        )
+
 
 class Product(models.Model):
     """Товар (абстрактный)"""
@@ -143,11 +191,16 @@ class SKU(models.Model):
         verbose_name='Дата обновления'
     )
 
+    objects = SKUQuerySet.as_manager()
+
     class Meta:
         verbose_name = 'Товарная позиция (SKU)'
         verbose_name_plural = 'Товарные позиции (SKU)'
         unique_together = [['product', 'attributes']]
         ordering = ['product__name', 'price']
+        indexes = [
+            models.Index(fields=['product', 'stock']),
+        ]
 
     def __str__(self):
         return self.display_name or self.sku_code
@@ -158,9 +211,31 @@ class SKU(models.Model):
         if not self.display_name:
             self.display_name = self._generate_display_name()
         super().save(*args, **kwargs)
+        self._sync_attributes()
+
+    def build_attribute_rows(self):
+        """Строки SKUAttribute для текущих характеристик"""
+        return [
+            SKUAttribute(sku=self, product_id=self.product_id, name=name, value=str(value))
+            for name, value in (self.attributes or {}).items()
+        ]
+
+    def _sync_attributes(self):
+        """Синхронизация нормализованных характеристик с JSON-полем"""
+        rows = self.build_attribute_rows()
+        current = set(SKUAttribute.objects.filter(sku=self).values_list('product_id', 'name', 'value'))
+        if current == {(row.product_id, row.name, row.value) for row in rows}:
+            return
+        SKUAttribute.objects.filter(sku=self).delete()
+        SKUAttribute.objects.bulk_create(rows)
 
     def _generate_sku_code(self):
         """Генерация артикула на основе категории и характеристик"""
+        # Уникальный порядковый суффикс
+        return next_code(self.get_code_prefix(), width=4)
+
+    def get_code_prefix(self):
+        """Префикс артикула: {категория}-{цвет}-{размер}-"""
         prefix = {
             'clothing': 'CLTH',
             'accessories': 'ACCS',
@@ -173,11 +248,7 @@ class SKU(models.Model):
         attrs = self.attributes
         color_code = attrs.get('color', '')[:3].upper() if attrs.get('color') else 'STD'
         size_code = attrs.get('size', '').upper() if attrs.get('size') else 'NOS'
-
-        # Уникальный суффикс
-        suffix = ''.join(random.choices(string.ascii_uppercase + string.digits, k=4))
-
-        return f"{prefix}-{color_code}-{size_code}-{suffix}"
+        return f"{prefix}-{color_code}-{size_code}-"
 
     def _generate_display_name(self):
         """Генерация отображаемого названия из товара и характеристик"""
@@ -198,6 +269,49 @@ class SKU(models.Model):
         return " - ".join(parts)
 
 
+class SKUAttribute(models.Model):
+    """Характеристика SKU (нормализованная копия SKU.attributes для фильтров)"""
+    id = models.UUIDField(
+        primary_key=True,
+        default=uuid7,
+        editable=False,
+        verbose_name='ID'
+    )
+    sku = models.ForeignKey(
+        SKU,
+        on_delete=models.CASCADE,
+        related_name='attribute_values',
+        verbose_name='SKU'
+    )
+    # Копия SKU.product, чтобы фасеты по товарам считались без JOIN
+    product = models.ForeignKey(
+        Product,
+        on_delete=models.CASCADE,
+        related_name='+',
+        verbose_name='Товар'
+    )
+    name = models.CharField(
+        max_length=50,
+        verbose_name='Характеристика'
+    )
+    value = models.CharField(
+        max_length=100,
+        verbose_name='Значение'
+    )
+
+    class Meta:
+        verbose_name = 'Характеристика SKU'
+        verbose_name_plural = 'Характеристики SKU'
+        unique_together = [['sku', 'name']]
+        indexes = [
+            models.Index(fields=['name', 'value']),
+            models.Index(fields=['product', 'name', 'value']),
+        ]
+
+    def __str__(self):
+        return f"{self.name}: {self.value}"
+
+
 class ProductImage(models.Model):
     """Дополнительные изображения товара"""
     id = models.UUIDField(
@@ -0,0 +1,16 @@
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .cache import bump_catalog_version
+from .models import Product, ProductImage, SKU
+
+
+@receiver(post_save, sender=Product)
+@receiver(post_save, sender=SKU)
+@receiver(post_save, sender=ProductImage)
+@receiver(post_delete, sender=Product)
+@receiver(post_delete, sender=SKU)
+@receiver(post_delete, sender=ProductImage)
+def invalidate_catalog_cache(sender, **kwargs):
+    transaction.on_commit(bump_catalog_version)
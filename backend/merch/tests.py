@@ -1,7 +1,12 @@
 # merch/tests/tests.py
 
+from django.core.cache import cache
+from django.contrib.auth import get_user_model
 from django.test import TestCase
-from merch.models import Product, SKU
+from django.urls import reverse
+from merch.cache import get_catalog_version, product_listing, product_skus
+from merch.models import Product, SKU, SKUAttribute
+
 
 class SKUAutoGenerationTest(TestCase):
     def setUp(self):
@@ -52,4 +57,149 @@ class SKUAutoGenerationTest(TestCase):
                 attributes={'size': 'M', 'color': 'Black'},
                 price=2500,
                 stock=5
-            )
\ No newline at end of file
+            )
+
+
+class CatalogCacheTest(TestCase):
+    """Тесты кэша каталога"""
+
+    def setUp(self):
+        cache.clear()
+        self.product = Product.objects.create(
+            name='Тестовая футболка',
+            category='clothing'
+        )
+        self.sku = SKU.objects.create(
+            product=self.product,
+            attributes={'size': 'M'},
+            price=2500,
+            stock=10
+        )
+
+    def test_listing_is_served_from_cache(self):
+        """Повторное чтение витрины не обращается к БД"""
+        products = product_listing()
+        self.assertEqual(products, [self.product])
+
+        with self.assertNumQueries(0):
+            products = product_listing()
+            self.assertEqual([sku.pk for sku in products[0].skus.all()], [self.sku.pk])
+
+    def test_listing_filters(self):
+        """Фильтры по категории и наличию"""
+        Product.objects.create(name='Значок', category='accessories')
+        self.assertEqual(product_listing(category='clothing'), [self.product])
+        self.assertEqual(product_listing(in_stock=True), [self.product])
+
+    def test_changes_invalidate_cache(self):
+        """Изменения товара и SKU сбрасывают кэш после коммита"""
+        self.assertEqual(product_skus(self.product.pk), [self.sku])
+        version = get_catalog_version()
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.sku.is_active = False
+            self.sku.save()
+
+        self.assertNotEqual(get_catalog_version(), version)
+        self.assertEqual(product_skus(self.product.pk), [])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.product.delete()
+        self.assertEqual(product_listing(), [])
+
+
+class ProductInStockTest(TestCase):
+    """Тесты выборки товаров в наличии"""
+
+    def setUp(self):
+        self.available = Product.objects.create(name='Футболка', category='clothing')
+        self.sold_out = Product.objects.create(name='Худи', category='clothing')
+        for size in ['S', 'M', 'L']:
+            SKU.objects.create(product=self.available, attributes={'size': size}, price=2500, stock=3)
+            SKU.objects.create(product=self.sold_out, attributes={'size': size}, price=4500, stock=0)
+
+    def test_in_stock_without_duplicates(self):
+        """Товар с несколькими SKU в наличии возвращается один раз"""
+        self.assertEqual(list(Product.active.in_stock()), [self.available])
+
+    def test_in_stock_uses_exists(self):
+        """Запрос строится через EXISTS, без DISTINCT"""
+        sql = str(Product.active.in_stock().query).upper()
+        self.assertIn('EXISTS', sql)
+        self.assertNotIn('DISTINCT', sql)
+
+    def test_inactive_products_excluded(self):
+        self.available.is_active = False
+        self.available.save()
+        self.assertFalse(Product.active.in_stock().exists())
+
+
+class SKUAttributeFacetTest(TestCase):
+    """Тесты нормализованных характеристик и фасетов"""
+
+    def setUp(self):
+        self.shirt = Product.objects.create(name='Футболка', category='clothing')
+        self.hoodie = Product.objects.create(name='Худи', category='clothing')
+        for color in ['Black', 'White']:
+            for size in ['S', 'M']:
+                SKU.objects.create(product=self.shirt, attributes={'color': color, 'size': size}, price=2500)
+        SKU.objects.create(product=self.hoodie, attributes={'color': 'Black', 'size': 'L'}, price=4500)
+
+    def test_attributes_synced_on_save(self):
+        sku = SKU.objects.create(product=self.hoodie, attributes={'color': 'Red', 'size': 'M'}, price=4500)
+        sku.attributes = {'color': 'Green', 'size': 'M'}
+        sku.save()
+        self.assertEqual(
+            set(sku.attribute_values.values_list('name', 'value')),
+            {('color', 'Green'), ('size', 'M')}
+        )
+
+    def test_with_attributes(self):
+        skus = SKU.objects.with_attributes(color='Black', size='M')
+        self.assertEqual([sku.product for sku in skus], [self.shirt])
+
+    def test_facets_single_query(self):
+        """Фасеты считаются одним запросом, товар учитывается один раз"""
+        with self.assertNumQueries(1):
+            facets = SKU.objects.facets(Product.active.all())
+        self.assertEqual(facets['color'], {'Black': 2, 'White': 1})
+        self.assertEqual(facets['size'], {'L': 1, 'M': 1, 'S': 1})
+
+    def test_facets_for_filtered_skus(self):
+        facets = SKU.objects.with_attributes(color='White').facets()
+        self.assertEqual(facets, {'color': {'White': 1}, 'size': {'M': 1, 'S': 1}})
+
+    def test_sync_after_bulk_create(self):
+        skus = SKU.objects.bulk_create([
+            SKU(product=self.hoodie, sku_code='HOOD-TEST-1', attributes={'color': 'Grey'}, price=4500)
+        ])
+        self.assertFalse(SKUAttribute.objects.filter(sku=skus[0]).exists())
+        SKU.objects.filter(pk=skus[0].pk).sync_attributes()
+        self.assertTrue(SKUAttribute.objects.filter(sku=skus[0], name='color', value='Grey').exists())
+
+
+class ProductAdminTest(TestCase):
+    """Колонка количества SKU в админке считается в запросе списка"""
+
+    def setUp(self):
+        admin_user = get_user_model().objects.create_superuser(email='admin@example.com', password='admin123')
+        self.client.force_login(admin_user)
+        for index, sizes in enumerate([['S', 'M', 'L'], [], ['M']]):
+            product = Product.objects.create(name=f'Товар {index}', category='clothing')
+            for size in sizes:
+                SKU.objects.create(product=product, attributes={'size': size}, price=1000, stock=1)
+
+    def test_sku_count_sortable(self):
+        """Сортировка по количеству SKU без запроса на каждую строку"""
+        url = reverse('admin:merch_product_changelist')
+        with self.assertNumQueries(7):
+            response = self.client.get(url, {'o': '3'})
+
+        products = response.context['cl'].result_list
+        self.assertEqual([product.name for product in products], ['Товар 1', 'Товар 2', 'Товар 0'])
+        self.assertEqual([product.sku_count for product in products], [0, 1, 3])
+
+    def test_add_form(self):
+        """Форма добавления открывается без аннотации"""
+        response = self.client.get(reverse('admin:merch_product_add'))
+        self.assertEqual(response.status_code, 200)
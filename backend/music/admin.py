@@ -1,4 +1,5 @@
 from django.contrib import admin
+from core.admin_changelist import related_count
 from .models import Release, Track, Favorite
 
 
@@ -13,6 +14,9 @@ class TrackInline(admin.TabularInline):
 
     @admin.display(description='Длительность')
     def duration_formatted(self, obj):
+        # Пустая форма нового трека еще без длительности
+        if obj.duration_seconds is None:
+            return '-'
         return obj.duration_formatted
 
 
@@ -39,9 +43,10 @@ class ReleaseAdmin(admin.ModelAdmin):
         }),
     )
 
-    @admin.display(description='Треков')
+    @admin.display(description='Треков', ordering='track_count')
     def track_count(self, obj):
-        return obj.tracks.count()
+        # У нового релиза в форме добавления аннотации нет
+        return getattr(obj, 'track_count', 0)
 
     @admin.action(description='Добавить в рекомендации')
     def make_featured(self, request, queryset):
@@ -54,10 +59,8 @@ class ReleaseAdmin(admin.ModelAdmin):
         self.message_user(request, f"{queryset.count()} релизов убрано из рекомендаций")
 
     def get_queryset(self, request):
-        return super().get_queryset(request).prefetch_related(
-            'tracks',
-            'favorited_by'
-        )
+        return super().get_queryset(request).annotate(track_count=related_count(Track, 'release'))
+
 
 @admin.register(Track)
 class TrackAdmin(admin.ModelAdmin):
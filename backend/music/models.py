@@ -3,6 +3,8 @@ from django.db import models
 from django.conf import settings
 from django.urls import reverse
 
+from core.ids import uuid7
+
 
 class Release(models.Model):
     """Музыкальный релиз"""
@@ -130,7 +132,7 @@ class Favorite(models.Model):
     """Избранные релизы пользователя (связь многие-ко-многим)"""
     id = models.UUIDField(
         primary_key=True,
-        default=uuid.uuid4,
+        default=uuid7,
         editable=False,
         verbose_name='ID'
     )
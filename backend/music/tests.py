@@ -1,4 +1,5 @@
 from django.test import TestCase
+from django.urls import reverse
 from django.contrib.auth import get_user_model
 from music.models import Release, Track, Favorite
 from datetime import date, timedelta
@@ -210,4 +211,35 @@ class FavoriteModelTest(TestCase):
 
     def test_release_favorited_by_relation(self):
         """Тест связи релиза с избранным"""
-        self.assertIn(self.favorite, self.release.favorited_by.all())
\ No newline at end of file
+        self.assertIn(self.favorite, self.release.favorited_by.all())
+
+
+class ReleaseAdminTest(TestCase):
+    """Колонка количества треков в админке считается в запросе списка"""
+
+    def setUp(self):
+        admin_user = User.objects.create_superuser(email='admin@example.com', password='admin123')
+        self.client.force_login(admin_user)
+        for index, tracks in enumerate([2, 0, 5]):
+            release = Release.objects.create(
+                title=f'Релиз {index}',
+                artist='Электрофорез',
+                release_date=date.today(),
+                type='album'
+            )
+            for number in range(1, tracks + 1):
+                Track.objects.create(release=release, title=f'Трек {number}', duration_seconds=180,
+                                     track_number=number)
+
+    def test_track_count_sortable(self):
+        """Сортировка по количеству треков без запроса на каждую строку"""
+        response = self.client.get(reverse('admin:music_release_changelist'), {'o': '-6'})
+
+        releases = response.context['cl'].result_list
+        self.assertEqual([release.title for release in releases], ['Релиз 2', 'Релиз 0', 'Релиз 1'])
+        self.assertEqual([release.track_count for release in releases], [5, 2, 0])
+
+    def test_add_form(self):
+        """Форма добавления открывается без аннотации"""
+        response = self.client.get(reverse('admin:music_release_add'))
+        self.assertEqual(response.status_code, 200)
@@ -1,5 +1,6 @@
 from django.contrib import admin
 from django.utils import timezone
+from core.admin_changelist import LargeTableAdminMixin
 from .models import Cart, CartItem, Order, OrderItem, OrderDiscount
 
 
@@ -14,26 +15,35 @@ class CartItemInline(admin.TabularInline):
 
     @admin.display(description='Сумма')
     def total_price(self, obj):
+        # Пустая форма для добавления строки еще без товара
+        if obj.sku_id is None:
+            return '-'
         return obj.total_price
 
+    def get_queryset(self, request):
+        # total_price читает цену из SKU
+        return super().get_queryset(request).select_related('sku')
+
 
 @admin.register(Cart)
-class CartAdmin(admin.ModelAdmin):
-    list_display = ('id_short', 'user', 'session_id', 'items_count', 'total', 'updated_at')
+class CartAdmin(LargeTableAdminMixin, admin.ModelAdmin):
+    list_display = ('id_short', 'user', 'session_id', 'items_count', 'subtotal', 'updated_at')
     list_display_links = ('id_short',)
     list_filter = ('created_at', 'updated_at')
     search_fields = ('user__email', 'session_id')
     date_hierarchy = 'created_at'
     raw_id_fields = ('user',)
+    # user может быть пустым, поэтому автоматически не присоединяется
+    list_select_related = ('user',)
     inlines = [CartItemInline]
-    readonly_fields = ('created_at', 'updated_at', 'items_count', 'total')
+    readonly_fields = ('created_at', 'updated_at', 'items_count', 'subtotal')
 
     fieldsets = (
         (None, {
             'fields': ('user', 'session_id')
         }),
         ('Статистика', {
-            'fields': ('items_count', 'total', 'created_at', 'updated_at')
+            'fields': ('items_count', 'subtotal', 'created_at', 'updated_at')
         }),
     )
 
@@ -41,14 +51,6 @@ class CartAdmin(admin.ModelAdmin):
     def id_short(self, obj):
         return str(obj.id)[:8]
 
-    @admin.display(description='Товаров')
-    def items_count(self, obj):
-        return obj.items.count()
-
-    @admin.display(description='Сумма')
-    def total(self, obj):
-        return obj.total
-
 
 class OrderItemInline(admin.TabularInline):
     model = OrderItem
@@ -62,6 +64,9 @@ class OrderItemInline(admin.TabularInline):
 
     @admin.display(description='Сумма')
     def total(self, obj):
+        # Пустая форма для добавления строки еще без цены
+        if obj.unit_price is None:
+            return '-'
         return obj.total
 
 
@@ -77,7 +82,7 @@ class OrderDiscountInline(admin.TabularInline):
 
 
 @admin.register(Order)
-class OrderAdmin(admin.ModelAdmin):
+class OrderAdmin(LargeTableAdminMixin, admin.ModelAdmin):
     list_display = ('order_number', 'user', 'total', 'status', 'created_at')
     list_display_links = ('order_number',)
     list_filter = ('status', 'created_at')
@@ -108,14 +113,6 @@ class OrderAdmin(admin.ModelAdmin):
     def get_queryset(self, request):
         return super().get_queryset(request).select_related('user')
 
-    @admin.display(description='Сумма товаров')
-    def subtotal(self, obj):
-        return obj.subtotal
-
-    @admin.display(description='Итого')
-    def total(self, obj):
-        return obj.total
-
     @admin.action(description='Отметить как оплаченные')
     def mark_as_paid(self, request, queryset):
         queryset.update(status='paid')
@@ -139,7 +136,7 @@ class OrderAdmin(admin.ModelAdmin):
 
 
 @admin.register(OrderItem)
-class OrderItemAdmin(admin.ModelAdmin):
+class OrderItemAdmin(LargeTableAdminMixin, admin.ModelAdmin):
     list_display = ('order', 'sku_display_name', 'unit_price', 'quantity', 'total', 'created_at')
     list_display_links = ('order',)
     list_filter = ('created_at',)
@@ -180,6 +177,8 @@ class OrderDiscountAdmin(admin.ModelAdmin):
     search_fields = ('order__order_number', 'discount_code__code')
     date_hierarchy = 'applied_at'
     raw_id_fields = ('order', 'discount_code')
+    # discount_code может быть пустым, поэтому автоматически не присоединяется
+    list_select_related = ('order', 'discount_code')
     readonly_fields = ('discount_amount', 'applied_at')
 
     fieldsets = (
@@ -0,0 +1,31 @@
+from django.core.management.base import BaseCommand
+
+from orders.models import Cart
+
+
+class Command(BaseCommand):
+    help = 'Пересчитывает сохраненные итоги корзин (количество позиций и сумму)'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=1000,
+            help='Количество корзин, пересчитываемых одним UPDATE'
+        )
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        self.stdout.write('Пересчитываем итоги корзин...')
+
+        updated = 0
+        batch = []
+        for cart_id in Cart.objects.order_by('pk').values_list('pk', flat=True).iterator(chunk_size=batch_size):
+            batch.append(cart_id)
+            if len(batch) >= batch_size:
+                updated += Cart.objects.filter(pk__in=batch).refresh_totals()
+                batch = []
+        if batch:
+            updated += Cart.objects.filter(pk__in=batch).refresh_totals()
+
+        self.stdout.write(self.style.SUCCESS(f'✅ Пересчитано {updated} корзин'))
@@ -0,0 +1,45 @@
+# Generated by Django 4.2.7 on 2026-10-17 20:00
+
+from decimal import Decimal
+
+from django.db import migrations, models
+from django.db.models import Count, DecimalField, ExpressionWrapper, F, OuterRef, Subquery, Sum, Value
+from django.db.models.functions import Coalesce
+
+
+def fill_cart_totals(apps, schema_editor):
+    Cart = apps.get_model('orders', 'Cart')
+    CartItem = apps.get_model('orders', 'CartItem')
+    items = CartItem.objects.filter(cart=OuterRef('pk')).order_by().values('cart')
+    Cart.objects.update(
+        items_count=Coalesce(Subquery(items.annotate(value=Count('pk')).values('value')), 0),
+        subtotal=Coalesce(
+            Subquery(items.annotate(
+                value=Sum(ExpressionWrapper(F('quantity') * F('sku__price'), output_field=DecimalField()))
+            ).values('value')),
+            Value(Decimal('0')),
+            output_field=DecimalField(),
+        ),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('merch', '0003_remove_productimage_is_primary_remove_sku_image'),
+        ('orders', '0003_alter_cart_session_id_alter_cartitem_quantity_and_more'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='cart',
+            name='items_count',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='Товаров'),
+        ),
+        migrations.AddField(
+            model_name='cart',
+            name='subtotal',
+            field=models.DecimalField(decimal_places=2, default=0, editable=False, max_digits=10, verbose_name='Сумма'),
+        ),
+        migrations.RunPython(fill_cart_totals, migrations.RunPython.noop),
+    ]
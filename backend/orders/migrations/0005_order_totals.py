@@ -0,0 +1,43 @@
+# Generated by Django 4.2.7 on 2026-10-17 20:01
+
+from decimal import Decimal
+
+from django.db import migrations, models
+from django.db.models import DecimalField, ExpressionWrapper, F, OuterRef, Subquery, Sum, Value
+from django.db.models.functions import Coalesce
+
+
+def fill_order_totals(apps, schema_editor):
+    Order = apps.get_model('orders', 'Order')
+    OrderItem = apps.get_model('orders', 'OrderItem')
+    items = OrderItem.objects.filter(order=OuterRef('pk')).order_by().values('order')
+    subtotal = Coalesce(
+        Subquery(items.annotate(
+            value=Sum(ExpressionWrapper(F('unit_price') * F('quantity'), output_field=DecimalField()))
+        ).values('value')),
+        Value(Decimal('0')),
+        output_field=DecimalField(),
+    )
+    Order.objects.update(subtotal=subtotal)
+    Order.objects.update(total=F('subtotal') + F('shipping_cost') - F('discount_total'))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('orders', '0004_cart_totals'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='order',
+            name='subtotal',
+            field=models.DecimalField(decimal_places=2, default=0, editable=False, max_digits=10, verbose_name='Сумма товаров'),
+        ),
+        migrations.AddField(
+            model_name='order',
+            name='total',
+            field=models.DecimalField(decimal_places=2, default=0, editable=False, max_digits=10, verbose_name='Итого'),
+        ),
+        migrations.RunPython(fill_order_totals, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,40 @@
+# Generated by Django 4.2.7 on 2026-10-17 21:04
+
+from django.db import migrations, models
+from django.db.models import Count
+
+
+def check_single_use(apps, schema_editor):
+    OrderDiscount = apps.get_model('orders', 'OrderDiscount')
+    reused = list(
+        OrderDiscount.objects.filter(discount_code__isnull=False)
+        .values('discount_code__code')
+        .annotate(uses=Count('pk'))
+        .filter(uses__gt=1)
+        .values_list('discount_code__code', flat=True)[:20]
+    )
+    if reused:
+        # Исторические скидки заказов не переписываются автоматически
+        raise RuntimeError(
+            'Промо-коды применены к нескольким заказам, уникальный индекс не создать: '
+            f"{', '.join(reused)}. Разберите повторные применения вручную и повторите миграцию."
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('orders', '0006_time_ordered_ids'),
+    ]
+
+    operations = [
+        migrations.RunPython(check_single_use, migrations.RunPython.noop),
+        migrations.AlterUniqueTogether(
+            name='orderdiscount',
+            unique_together=set(),
+        ),
+        migrations.AddConstraint(
+            model_name='orderdiscount',
+            constraint=models.UniqueConstraint(fields=('discount_code',), name='orderdiscount_code_single_use'),
+        ),
+    ]
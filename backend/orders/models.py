@@ -1,11 +1,53 @@
 import uuid
-import random
-import string
+from decimal import Decimal
 from django.db import models
+from django.db.models import Count, DecimalField, ExpressionWrapper, F, OuterRef, Subquery, Sum, Value
+from django.db.models.functions import Coalesce
 from django.conf import settings
 from django.core.validators import MinValueValidator
 from django.utils import timezone
 
+from core.codes import next_code
+from core.ids import uuid7
+
+
+class CartQuerySet(models.QuerySet):
+    def refresh_totals(self):
+        """Пересчет сохраненных итогов корзин одним UPDATE"""
+        items = CartItem.objects.filter(cart=OuterRef('pk')).order_by().values('cart')
+        items_count = items.annotate(value=Count('pk')).values('value')
+        subtotal = items.annotate(
+            value=Sum(ExpressionWrapper(F('quantity') * F('sku__price'), output_field=DecimalField()))
+        ).values('value')
+        return self.update(
+            items_count=Coalesce(Subquery(items_count), 0),
+            subtotal=Coalesce(Subquery(subtotal), Value(Decimal('0')), output_field=DecimalField()),
+        )
+
+
+class CartItemQuerySet(models.QuerySet):
+    """Массовые операции с позициями сразу обновляют итоги затронутых корзин"""
+
+    def _cart_ids(self):
+        return set(self.values_list('cart_id', flat=True))
+
+    def bulk_create(self, objs, *args, **kwargs):
+        objs = super().bulk_create(objs, *args, **kwargs)
+        Cart.objects.filter(pk__in={obj.cart_id for obj in objs}).refresh_totals()
+        return objs
+
+    def update(self, **kwargs):
+        cart_ids = self._cart_ids()
+        rows = super().update(**kwargs)
+        Cart.objects.filter(pk__in=cart_ids).refresh_totals()
+        return rows
+
+    def delete(self):
+        cart_ids = self._cart_ids()
+        result = super().delete()
+        Cart.objects.filter(pk__in=cart_ids).refresh_totals()
+        return result
+
 
 class Cart(models.Model):
     """Корзина пользователя"""
@@ -30,6 +72,19 @@ class Cart(models.Model):
         db_index=True,
         verbose_name='ID сессии'
     )
+    # Денормализованные итоги, поддерживаются позициями корзины и ценами SKU
+    items_count = models.PositiveIntegerField(
+        default=0,
+        editable=False,
+        verbose_name='Товаров'
+    )
+    subtotal = models.DecimalField(
+        max_digits=10,
+        decimal_places=2,
+        default=0,
+        editable=False,
+        verbose_name='Сумма'
+    )
     created_at = models.DateTimeField(
         auto_now_add=True,
         verbose_name='Дата создания'
@@ -39,6 +94,8 @@ class Cart(models.Model):
         verbose_name='Дата обновления'
     )
 
+    objects = CartQuerySet.as_manager()
+
     class Meta:
         verbose_name = 'Корзина'
         verbose_name_plural = 'Корзины'
@@ -48,22 +105,33 @@ class Cart(models.Model):
             return f"Корзина {self.user.email}"
         return f"Корзина {self.session_id}"
 
+    TOTALS_FIELDS = ('items_count', 'subtotal')
+
+    def save(self, *args, **kwargs):
+        # Итоги пишутся только через refresh_totals(), чтобы не затереть их устаревшими значениями
+        if not self._state.adding and kwargs.get('update_fields') is None:
+            kwargs['update_fields'] = [
+                field.name for field in self._meta.concrete_fields
+                if not field.primary_key and field.name not in self.TOTALS_FIELDS
+            ]
+        super().save(*args, **kwargs)
+
     @property
     def total(self):
         """Общая сумма корзины"""
-        return sum(item.total_price for item in self.items.all())
+        return self.subtotal
 
-    @property
-    def items_count(self):
-        """Количество товаров"""
-        return self.items.count()
+    def refresh_totals(self):
+        """Пересчет итогов корзины и обновление экземпляра"""
+        Cart.objects.filter(pk=self.pk).refresh_totals()
+        self.refresh_from_db(fields=list(self.TOTALS_FIELDS))
 
 
 class CartItem(models.Model):
     """Позиция в корзине"""
     id = models.UUIDField(
         primary_key=True,
-        default=uuid.uuid4,
+        default=uuid7,
         editable=False,
         verbose_name='ID'
     )
@@ -88,6 +156,8 @@ class CartItem(models.Model):
         verbose_name='Дата добавления'
     )
 
+    objects = CartItemQuerySet.as_manager()
+
     class Meta:
         verbose_name = 'Позиция корзины'
         verbose_name_plural = 'Позиции корзины'
@@ -101,6 +171,95 @@ class CartItem(models.Model):
         """Общая стоимость позиции"""
         return self.sku.price * self.quantity
 
+    def save(self, *args, **kwargs):
+        super().save(*args, **kwargs)
+        Cart.objects.filter(pk=self.cart_id).refresh_totals()
+
+    def delete(self, *args, **kwargs):
+        cart_id = self.cart_id
+        result = super().delete(*args, **kwargs)
+        Cart.objects.filter(pk=cart_id).refresh_totals()
+        return result
+
+
+class OrderQuerySet(models.QuerySet):
+    @staticmethod
+    def _items_subtotal():
+        items = OrderItem.objects.filter(order=OuterRef('pk')).order_by().values('order')
+        subtotal = items.annotate(
+            value=Sum(ExpressionWrapper(F('unit_price') * F('quantity'), output_field=DecimalField()))
+        ).values('value')
+        return Coalesce(Subquery(subtotal), Value(Decimal('0')), output_field=DecimalField())
+
+    def with_totals(self):
+        """Суммы заказов, посчитанные в БД по позициям (для отчетов)"""
+        return self.annotate(items_subtotal=self._items_subtotal()).annotate(
+            items_total=ExpressionWrapper(
+                F('items_subtotal') + F('shipping_cost') - F('discount_total'),
+                output_field=DecimalField()
+            )
+        )
+
+    def refresh_totals(self):
+        """Пересчет сохраненных сумм заказов одним UPDATE"""
+        return self.update(
+            subtotal=self._items_subtotal(),
+            total=ExpressionWrapper(
+                self._items_subtotal() + F('shipping_cost') - F('discount_total'),
+                output_field=DecimalField()
+            ),
+        )
+
+
+class OrderItemQuerySet(models.QuerySet):
+    """Массовые операции с позициями сразу обновляют суммы затронутых заказов"""
+
+    def _order_ids(self):
+        return set(self.values_list('order_id', flat=True))
+
+    def bulk_snapshot(self, order, lines, batch_size=None):
+        """
+        Создание позиций заказа со снэпшотом по списку (sku_id, quantity).
+
+        Все SKU загружаются одним запросом вместе с товарами, снэпшоты
+        собираются в памяти и вставляются одним bulk_create.
+        """
+        sku_model = self.model._meta.get_field('sku').related_model
+        quantities = {}
+        for sku_id, quantity in lines:
+            sku_id = sku_model._meta.pk.to_python(sku_id)
+            quantities[sku_id] = quantities.get(sku_id, 0) + quantity
+
+        # SKU читаются из той же БД, куда пишутся позиции, а не с реплики
+        skus = sku_model.objects.using(self.db).select_related('product').in_bulk(list(quantities))
+        missing = [str(sku_id) for sku_id in quantities if sku_id not in skus]
+        if missing:
+            raise sku_model.DoesNotExist(f"SKU не найдены: {', '.join(missing)}")
+
+        return self.bulk_create(
+            [self.model.from_sku(order, skus[sku_id], quantity) for sku_id, quantity in quantities.items()],
+            batch_size=batch_size,
+        )
+
+    def bulk_create(self, objs, *args, refresh_totals=True, **kwargs):
+        # refresh_totals=False - суммы заказов уже посчитаны вызывающим кодом
+        objs = super().bulk_create(objs, *args, **kwargs)
+        if refresh_totals:
+            Order.objects.filter(pk__in={obj.order_id for obj in objs}).refresh_totals()
+        return objs
+
+    def update(self, **kwargs):
+        order_ids = self._order_ids()
+        rows = super().update(**kwargs)
+        Order.objects.filter(pk__in=order_ids).refresh_totals()
+        return rows
+
+    def delete(self):
+        order_ids = self._order_ids()
+        result = super().delete()
+        Order.objects.filter(pk__in=order_ids).refresh_totals()
+        return result
+
 
 class Order(models.Model):
     """Заказ"""
@@ -131,6 +290,21 @@ class Order(models.Model):
         editable=False,
         verbose_name='Номер заказа'
     )
+    # Сохраненные суммы, поддерживаются позициями заказа
+    subtotal = models.DecimalField(
+        max_digits=10,
+        decimal_places=2,
+        default=0,
+        editable=False,
+        verbose_name='Сумма товаров'
+    )
+    total = models.DecimalField(
+        max_digits=10,
+        decimal_places=2,
+        default=0,
+        editable=False,
+        verbose_name='Итого'
+    )
     shipping_cost = models.DecimalField(
         max_digits=10,
         decimal_places=2,
@@ -166,6 +340,8 @@ class Order(models.Model):
         verbose_name='Дата завершения'
     )
 
+    objects = OrderQuerySet.as_manager()
+
     class Meta:
         verbose_name = 'Заказ'
         verbose_name_plural = 'Заказы'
@@ -174,33 +350,43 @@ class Order(models.Model):
     def __str__(self):
         return f"Заказ {self.order_number}"
 
+    TOTALS_FIELDS = ('subtotal', 'total')
+
     def save(self, *args, **kwargs):
         if not self.order_number:
             self.order_number = self._generate_order_number()
+        if self._state.adding:
+            self.total = self.subtotal + self.shipping_cost - self.discount_total
+            super().save(*args, **kwargs)
+            return
+
+        # Суммы пишутся только через refresh_totals(), чтобы не затереть их устаревшими значениями
+        update_fields = kwargs.get('update_fields')
+        if update_fields is None:
+            kwargs['update_fields'] = [
+                field.name for field in self._meta.concrete_fields
+                if not field.primary_key and field.name not in self.TOTALS_FIELDS
+            ]
         super().save(*args, **kwargs)
+        if update_fields is None or {'shipping_cost', 'discount_total'} & set(update_fields):
+            self.refresh_totals()
 
     def _generate_order_number(self):
-        """Генерация номера заказа"""
+        """Генерация номера заказа (порядковый номер в пределах дня)"""
         date_prefix = timezone.now().strftime('%Y%m%d')
-        random_suffix = ''.join(random.choices(string.ascii_uppercase + string.digits, k=6))
-        return f"WLQ-{date_prefix}-{random_suffix}"
-
-    @property
-    def subtotal(self):
-        """Сумма товаров без скидки"""
-        return sum(item.total for item in self.items.all())
+        return next_code(f"WLQ-{date_prefix}-", width=6)
 
-    @property
-    def total(self):
-        """Итоговая сумма"""
-        return self.subtotal + self.shipping_cost - self.discount_total
+    def refresh_totals(self):
+        """Пересчет сумм заказа и обновление экземпляра"""
+        Order.objects.filter(pk=self.pk).refresh_totals()
+        self.refresh_from_db(fields=list(self.TOTALS_FIELDS))
 
 
 class OrderItem(models.Model):
     """Позиция в заказе (со снэпшотом)"""
     id = models.UUIDField(
         primary_key=True,
-        default=uuid.uuid4,
+        default=uuid7,
         editable=False,
         verbose_name='ID'
     )
@@ -252,6 +438,8 @@ class OrderItem(models.Model):
         verbose_name='Дата добавления'
     )
 
+    objects = OrderItemQuerySet.as_manager()
+
     class Meta:
         verbose_name = 'Позиция заказа'
         verbose_name_plural = 'Позиции заказа'
@@ -264,16 +452,34 @@ class OrderItem(models.Model):
         """Общая стоимость позиции"""
         return self.unit_price * self.quantity
 
+    @classmethod
+    def from_sku(cls, order, sku, quantity):
+        """Позиция со снэпшотом из SKU (товар SKU должен быть загружен заранее)"""
+        item = cls(order=order, sku=sku, quantity=quantity)
+        item.fill_snapshot()
+        return item
+
+    def fill_snapshot(self):
+        """Заполнение снэпшота данными SKU"""
+        self.sku_code = self.sku.sku_code
+        self.product_name = self.sku.product.name
+        self.sku_display_name = self.sku.display_name
+        self.attributes = self.sku.attributes
+        self.unit_price = self.sku.price
+        self.image_url = self.sku.product.main_image
+
     def save(self, *args, **kwargs):
         # Заполняем снэпшот из SKU при создании
         if self.sku and not self.sku_code:
-            self.sku_code = self.sku.sku_code
-            self.product_name = self.sku.product.name
-            self.sku_display_name = self.sku.display_name
-            self.attributes = self.sku.attributes
-            self.unit_price = self.sku.price
-            self.image_url = self.sku.image or self.sku.product.main_image
+            self.fill_snapshot()
         super().save(*args, **kwargs)
+        Order.objects.filter(pk=self.order_id).refresh_totals()
+
+    def delete(self, *args, **kwargs):
+        order_id = self.order_id
+        result = super().delete(*args, **kwargs)
+        Order.objects.filter(pk=order_id).refresh_totals()
+        return result
 
 
 class OrderDiscount(models.Model):
@@ -310,7 +516,12 @@ class OrderDiscount(models.Model):
     class Meta:
         verbose_name = 'Скидка на заказ'
         verbose_name_plural = 'Скидки на заказы'
-        unique_together = [['order', 'discount_code']]
+        constraints = [
+            # Промо-код одноразовый (как и в DiscountCode.objects.unused()):
+            # параллельные заказы не применят его дважды. Заменяет
+            # уникальность пары (заказ, код)
+            models.UniqueConstraint(fields=['discount_code'], name='orderdiscount_code_single_use'),
+        ]
 
     def __str__(self):
         return f"Скидка {self.discount_amount} для заказа {self.order.order_number}"
@@ -0,0 +1,234 @@
+from decimal import ROUND_HALF_UP, Decimal
+from typing import NamedTuple
+
+from django.db import IntegrityError, connection, transaction
+from django.db.models import Case, F, When
+from django.utils import timezone
+
+from discounts.models import DiscountCode
+from discounts.services import InvalidDiscountCodes, invalidate_codes, validate_codes
+from merch.cache import bump_catalog_version
+from merch.models import SKU
+from .models import Cart, CartItem, Order, OrderDiscount, OrderItem
+
+# Суммарная скидка по всем кодам заказа не больше этого процента от суммы товаров
+MAX_DISCOUNT_PERCENT = 50
+
+
+class DiscountLine(NamedTuple):
+    """Скидка по одному промо-коду"""
+    code: str
+    code_id: object
+    percent: int
+    amount: Decimal
+
+
+class DiscountBreakdown(NamedTuple):
+    """Расчет скидок заказа"""
+    subtotal: Decimal
+    lines: list
+    discount_total: Decimal
+
+    def as_data(self):
+        """Представление для Order.discount_data"""
+        return {
+            'codes': [
+                {'code': line.code, 'percent': line.percent, 'amount': str(line.amount)}
+                for line in self.lines
+            ]
+        }
+
+
+class CheckoutError(Exception):
+    """Заказ не может быть оформлен"""
+
+
+class OutOfStockError(CheckoutError):
+    """Недостаточно товара на складе"""
+
+    def __init__(self, sku_codes):
+        self.sku_codes = sku_codes
+        super().__init__(f"Недостаточно товара: {', '.join(sku_codes)}")
+
+
+def checkout(cart, shipping_cost=0, discount_codes=()):
+    """
+    Оформление заказа из корзины в одной транзакции.
+
+    SKU блокируются select_for_update в порядке первичного ключа, чтобы
+    параллельные оформления на одни и те же товары не попадали в дедлок.
+    Количество запросов не зависит от числа позиций в корзине.
+    """
+    try:
+        # Быстрая проверка по кэшу, до блокировок
+        codes = validate_codes(discount_codes)
+    except InvalidDiscountCodes as error:
+        raise CheckoutError(str(error))
+
+    with transaction.atomic():
+        if not connection.features.has_select_for_update:
+            # SQLite блокирует всю базу при первой записи. Если транзакция
+            # сначала читает, то при переходе к записи параллельное оформление
+            # получает "database is locked" без ожидания, поэтому запись - первой
+            Cart.objects.filter(pk=cart.pk).update(updated_at=timezone.now())
+        lines = dict(
+            CartItem.objects.filter(cart=cart).order_by('sku_id').values_list('sku_id', 'quantity')
+        )
+        if not lines:
+            raise CheckoutError('Корзина пуста')
+
+        skus = list(
+            SKU.objects.select_for_update(of=('self',))
+            .select_related('product')
+            .filter(pk__in=lines)
+            .order_by('pk')
+        )
+        unavailable = [
+            sku.sku_code for sku in skus
+            if not (sku.is_active and sku.product.is_active) or sku.stock < lines[sku.pk]
+        ]
+        if unavailable:
+            raise OutOfStockError(unavailable)
+
+        _confirm_discount_codes(codes)
+
+        SKU.objects.filter(pk__in=lines).update(
+            stock=Case(
+                *[When(pk=sku_id, then=F('stock') - quantity) for sku_id, quantity in lines.items()],
+                default=F('stock'),
+            ),
+            updated_at=timezone.now(),
+        )
+        if any(sku.stock == lines[sku.pk] for sku in skus):
+            # Товар закончился, витрина должна это увидеть
+            transaction.on_commit(bump_catalog_version)
+        if not connection.features.has_select_for_update:
+            # Без блокировок строк (SQLite) проверяем остатки после списания
+            oversold = SKU.objects.filter(pk__in=lines, stock__lt=0).values_list('sku_code', flat=True)
+            if oversold:
+                raise OutOfStockError(list(oversold))
+
+        subtotal = sum((sku.price * lines[sku.pk] for sku in skus), Decimal('0'))
+        breakdown = compute_discounts(subtotal, codes)
+
+        order = Order.objects.create(
+            user=cart.user,
+            subtotal=subtotal,
+            shipping_cost=shipping_cost,
+            discount_total=breakdown.discount_total,
+            discount_data=breakdown.as_data(),
+        )
+        OrderItem.objects.bulk_create([
+            OrderItem.from_sku(order, sku, lines[sku.pk]) for sku in skus
+        ])
+        _write_discounts(order, breakdown)
+
+        cart.items.all().delete()
+        cart.items_count, cart.subtotal = 0, Decimal('0')
+
+    return order
+
+
+def compute_discounts(subtotal, codes):
+    """
+    Расчет скидок по промо-кодам за один проход.
+
+    Правила суммирования: повторяющиеся коды учитываются один раз, коды
+    применяются по убыванию процента, каждый следующий - к сумме после
+    предыдущих скидок, а общая скидка не превышает MAX_DISCOUNT_PERCENT
+    от суммы товаров.
+    """
+    subtotal = Decimal(subtotal)
+    limit = _money(subtotal * MAX_DISCOUNT_PERCENT / 100)
+    unique = {code.code: code for code in codes}.values()
+
+    lines = []
+    remaining, discount_total = subtotal, Decimal('0')
+    for code in sorted(unique, key=lambda code: -code.percent):
+        amount = min(_money(remaining * code.percent / 100), limit - discount_total)
+        if amount <= 0:
+            break
+        lines.append(DiscountLine(code.code, code.id, code.percent, amount))
+        remaining -= amount
+        discount_total += amount
+
+    return DiscountBreakdown(subtotal, lines, discount_total)
+
+
+def apply_discounts(order, discount_codes):
+    """
+    Применение промо-кодов к существующему заказу в одной транзакции.
+
+    Ранее примененные скидки заказа заменяются. Сумма товаров считается
+    один раз в БД под блокировкой заказа, скидки, discount_total,
+    discount_data и итог заказа записываются вместе. Возвращает DiscountBreakdown.
+    """
+    with transaction.atomic():
+        locked = Order.objects.select_for_update().with_totals().get(pk=order.pk)
+        previous = list(
+            OrderDiscount.objects.filter(order=locked, discount_code__isnull=False)
+            .values_list('discount_code__code', flat=True)
+        )
+        OrderDiscount.objects.filter(order=locked).delete()
+        if previous:
+            # Снятые с заказа коды снова можно применить, в том числе к нему же
+            invalidate_codes(previous)
+
+        try:
+            codes = validate_codes(discount_codes)
+        except InvalidDiscountCodes as error:
+            raise CheckoutError(str(error))
+        _confirm_discount_codes(codes)
+
+        breakdown = compute_discounts(locked.items_subtotal, codes)
+        _write_discounts(locked, breakdown)
+        locked.discount_total = breakdown.discount_total
+        locked.discount_data = breakdown.as_data()
+        locked.save(update_fields=['discount_total', 'discount_data'])
+
+    order.subtotal, order.total = locked.subtotal, locked.total
+    order.discount_total, order.discount_data = locked.discount_total, locked.discount_data
+    return breakdown
+
+
+def _write_discounts(order, breakdown):
+    codes = [line.code for line in breakdown.lines]
+    try:
+        with transaction.atomic():
+            OrderDiscount.objects.bulk_create([
+                OrderDiscount(order=order, discount_code_id=line.code_id, discount_amount=line.amount)
+                for line in breakdown.lines
+            ])
+    except IntegrityError:
+        # Без блокировок строк (SQLite) повторное применение ловит уникальный индекс
+        invalidate_codes(codes)
+        raise CheckoutError(str(InvalidDiscountCodes(codes)))
+    if codes:
+        # Примененные коды становятся использованными
+        transaction.on_commit(lambda: invalidate_codes(codes))
+
+
+def _money(value):
+    return value.quantize(Decimal('0.01'), rounding=ROUND_HALF_UP)
+
+
+def _confirm_discount_codes(codes):
+    """
+    Проверка кодов по БД: локальный кэш других процессов может отставать.
+    Строки кодов блокируются до конца транзакции (в порядке pk, чтобы заказы
+    с общими кодами не взаимоблокировались), поэтому параллельный заказ
+    с тем же кодом дождется коммита и увидит код использованным.
+    """
+    if not codes:
+        return
+    ids = [code.id for code in codes]
+    list(DiscountCode.objects.select_for_update().filter(pk__in=ids).order_by('pk').values_list('pk'))
+    confirmed = set(
+        DiscountCode.objects.valid().unused()
+        .filter(pk__in=ids)
+        .values_list('pk', flat=True)
+    )
+    stale = [code.code for code in codes if code.id not in confirmed]
+    if stale:
+        invalidate_codes(stale)
+        raise CheckoutError(str(InvalidDiscountCodes(stale)))
@@ -0,0 +1,27 @@
+from django.db.models.signals import post_delete, post_save, pre_delete
+from django.dispatch import receiver
+
+from .models import Cart
+
+
+@receiver(post_save, sender='merch.SKU')
+def refresh_carts_on_sku_price_change(sender, instance, created, update_fields=None, **kwargs):
+    """Пересчет корзин, в которых лежит SKU, после изменения цены"""
+    if created or (update_fields is not None and 'price' not in update_fields):
+        return
+    Cart.objects.filter(items__sku=instance).refresh_totals()
+
+
+@receiver(pre_delete, sender='merch.SKU')
+def remember_carts_on_sku_delete(sender, instance, **kwargs):
+    # Позиции удаляются каскадом без вызова CartItem.delete(), запоминаем корзины заранее
+    instance._affected_cart_ids = list(
+        Cart.objects.filter(items__sku=instance).values_list('pk', flat=True)
+    )
+
+
+@receiver(post_delete, sender='merch.SKU')
+def refresh_carts_on_sku_delete(sender, instance, **kwargs):
+    cart_ids = getattr(instance, '_affected_cart_ids', None)
+    if cart_ids:
+        Cart.objects.filter(pk__in=cart_ids).refresh_totals()
@@ -1,6 +1,22 @@
 # orders/tests/tests.py
-from django.test import TestCase
-from orders.models import Order, OrderItem
+import threading
+from datetime import timedelta
+from decimal import Decimal
+from io import StringIO
+from unittest import mock
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase, TransactionTestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from orders.models import Cart, CartItem, Order, OrderItem
+from orders.services import CheckoutError, OutOfStockError, apply_discounts, checkout, compute_discounts
+from concerts.models import Concert, Ticket
+from discounts import services as discount_services
+from discounts.models import DiscountCode
+from discounts.services import CodeInfo
 from merch.models import Product, SKU
 from django.contrib.auth import get_user_model
 
@@ -58,4 +74,527 @@ class OrderItemSnapshotTest(TestCase):
         order_item.refresh_from_db()
         self.assertIsNone(order_item.sku)
         # Но данные снэпшота сохранились
-        self.assertEqual(order_item.product_name, 'Тестовая футболка')
\ No newline at end of file
+        self.assertEqual(order_item.product_name, 'Тестовая футболка')
+
+
+class CartTotalsTest(TestCase):
+    """Тесты денормализованных итогов корзины"""
+
+    def setUp(self):
+        self.product = Product.objects.create(
+            name='Тестовая футболка',
+            category='clothing'
+        )
+        self.sku_m = SKU.objects.create(
+            product=self.product,
+            attributes={'size': 'M', 'color': 'Black'},
+            price=2500,
+            stock=10
+        )
+        self.sku_l = SKU.objects.create(
+            product=self.product,
+            attributes={'size': 'L', 'color': 'Black'},
+            price=3000,
+            stock=10
+        )
+        self.cart = Cart.objects.create(session_id='session_test')
+
+    def test_totals_follow_cart_items(self):
+        """Итоги обновляются при добавлении, изменении и удалении позиций"""
+        item = CartItem.objects.create(cart=self.cart, sku=self.sku_m, quantity=2)
+        CartItem.objects.create(cart=self.cart, sku=self.sku_l, quantity=1)
+        self.cart.refresh_from_db()
+        self.assertEqual(self.cart.items_count, 2)
+        self.assertEqual(self.cart.subtotal, 8000)
+
+        item.quantity = 3
+        item.save()
+        self.cart.refresh_from_db()
+        self.assertEqual(self.cart.subtotal, 10500)
+
+        item.delete()
+        self.cart.refresh_from_db()
+        self.assertEqual(self.cart.items_count, 1)
+        self.assertEqual(self.cart.total, 3000)
+
+    def test_queryset_operations_refresh_totals(self):
+        """Массовые операции с позициями тоже пересчитывают итоги"""
+        CartItem.objects.bulk_create([
+            CartItem(cart=self.cart, sku=self.sku_m, quantity=1),
+            CartItem(cart=self.cart, sku=self.sku_l, quantity=1),
+        ])
+        self.cart.refresh_from_db()
+        self.assertEqual(self.cart.subtotal, 5500)
+
+        self.cart.items.update(quantity=2)
+        self.cart.refresh_from_db()
+        self.assertEqual(self.cart.subtotal, 11000)
+
+        self.cart.items.all().delete()
+        self.cart.refresh_from_db()
+        self.assertEqual(self.cart.items_count, 0)
+        self.assertEqual(self.cart.subtotal, 0)
+
+    def test_sku_price_change_and_delete(self):
+        """Изменение цены и удаление SKU отражаются в корзине"""
+        CartItem.objects.create(cart=self.cart, sku=self.sku_m, quantity=2)
+        CartItem.objects.create(cart=self.cart, sku=self.sku_l, quantity=1)
+
+        self.sku_m.price = 2000
+        self.sku_m.save()
+        self.cart.refresh_from_db()
+        self.assertEqual(self.cart.subtotal, 7000)
+
+        self.sku_l.delete()
+        self.cart.refresh_from_db()
+        self.assertEqual(self.cart.items_count, 1)
+        self.assertEqual(self.cart.subtotal, 4000)
+
+    def test_cart_save_keeps_totals(self):
+        """Сохранение устаревшего экземпляра корзины не затирает итоги"""
+        stale_cart = Cart.objects.get(pk=self.cart.pk)
+        CartItem.objects.create(cart=self.cart, sku=self.sku_m, quantity=1)
+
+        stale_cart.session_id = 'session_changed'
+        stale_cart.save()
+        self.cart.refresh_from_db()
+        self.assertEqual(self.cart.items_count, 1)
+        self.assertEqual(self.cart.session_id, 'session_changed')
+
+    def test_cart_badge_is_single_query(self):
+        """Бейдж корзины читается одним запросом"""
+        CartItem.objects.create(cart=self.cart, sku=self.sku_m, quantity=2)
+        with self.assertNumQueries(1):
+            cart = Cart.objects.get(pk=self.cart.pk)
+            self.assertEqual((cart.items_count, cart.total), (1, 5000))
+
+    def test_rebuild_cart_totals_command(self):
+        """Команда сверки восстанавливает разошедшиеся итоги"""
+        CartItem.objects.create(cart=self.cart, sku=self.sku_m, quantity=2)
+        Cart.objects.filter(pk=self.cart.pk).update(items_count=0, subtotal=0)
+
+        call_command('rebuild_cart_totals', batch_size=1, stdout=StringIO())
+        self.cart.refresh_from_db()
+        self.assertEqual(self.cart.items_count, 1)
+        self.assertEqual(self.cart.subtotal, 5000)
+
+
+class OrderTotalsTest(TestCase):
+    """Тесты сохраненных сумм заказа"""
+
+    def setUp(self):
+        self.user = User.objects.create_user(
+            email='buyer@example.com',
+            password='testpass123'
+        )
+        self.product = Product.objects.create(
+            name='Тестовая футболка',
+            category='clothing'
+        )
+        self.sku = SKU.objects.create(
+            product=self.product,
+            attributes={'size': 'M', 'color': 'Black'},
+            price=2500,
+            stock=10
+        )
+        self.order = Order.objects.create(
+            user=self.user,
+            shipping_cost=300
+        )
+
+    def test_totals_follow_order_items(self):
+        """Суммы пересчитываются при добавлении и удалении позиций"""
+        self.assertEqual(self.order.total, 300)
+
+        item = OrderItem.objects.create(order=self.order, sku=self.sku, quantity=2)
+        self.order.refresh_from_db()
+        self.assertEqual(self.order.subtotal, 5000)
+        self.assertEqual(self.order.total, 5300)
+
+        item.delete()
+        self.order.refresh_from_db()
+        self.assertEqual(self.order.subtotal, 0)
+
+    def test_order_save_updates_total(self):
+        """Изменение скидки пересчитывает итог и не затирает сумму товаров"""
+        stale_order = Order.objects.get(pk=self.order.pk)
+        OrderItem.objects.create(order=self.order, sku=self.sku, quantity=2)
+
+        stale_order.discount_total = 500
+        stale_order.save()
+        self.assertEqual(stale_order.subtotal, 5000)
+        self.assertEqual(stale_order.total, 4800)
+
+    def test_with_totals_annotation(self):
+        """Аннотация считает суммы в БД"""
+        OrderItem.objects.create(order=self.order, sku=self.sku, quantity=3)
+        Order.objects.create(user=self.user)
+
+        orders = Order.objects.with_totals().order_by('items_total')
+        self.assertEqual(
+            [(order.items_subtotal, order.items_total) for order in orders],
+            [(0, 0), (7500, 7800)]
+        )
+
+    def test_order_listing_constant_queries(self):
+        """Список заказов с суммами читается одним запросом"""
+        for _ in range(5):
+            order = Order.objects.create(user=self.user)
+            OrderItem.objects.create(order=order, sku=self.sku, quantity=1)
+
+        with self.assertNumQueries(1):
+            totals = [order.total for order in Order.objects.select_related('user')]
+        self.assertEqual(len(totals), 6)
+
+
+class CheckoutTest(TestCase):
+    """Тесты оформления заказа из корзины"""
+
+    def setUp(self):
+        cache.clear()
+        discount_services._local.clear()
+        self.user = User.objects.create_user(
+            email='buyer@example.com',
+            password='testpass123'
+        )
+        self.product = Product.objects.create(
+            name='Тестовая футболка',
+            category='clothing',
+            main_image='https://example.com/tshirt.jpg'
+        )
+        self.skus = [
+            SKU.objects.create(
+                product=self.product,
+                attributes={'size': size, 'color': 'Black'},
+                price=2500,
+                stock=10
+            )
+            for size in ['XS', 'S', 'M', 'L', 'XL']
+        ]
+        self.cart = Cart.objects.create(user=self.user)
+
+    def test_checkout_creates_order(self):
+        """Корзина превращается в заказ, остатки списываются, корзина очищается"""
+        CartItem.objects.create(cart=self.cart, sku=self.skus[0], quantity=2)
+        CartItem.objects.create(cart=self.cart, sku=self.skus[1], quantity=1)
+
+        order = checkout(self.cart, shipping_cost=300)
+
+        order.refresh_from_db()
+        self.assertEqual(order.user, self.user)
+        self.assertEqual(order.subtotal, 7500)
+        self.assertEqual(order.total, 7800)
+        self.assertEqual(order.items.count(), 2)
+        item = order.items.get(sku=self.skus[0])
+        self.assertEqual(item.sku_code, self.skus[0].sku_code)
+        self.assertEqual(item.image_url, 'https://example.com/tshirt.jpg')
+
+        self.skus[0].refresh_from_db()
+        self.assertEqual(self.skus[0].stock, 8)
+        self.cart.refresh_from_db()
+        self.assertEqual(self.cart.items_count, 0)
+        self.assertFalse(self.cart.items.exists())
+
+    def test_checkout_applies_discount(self):
+        """Промо-код создает OrderDiscount и уменьшает итог"""
+        concert = Concert.objects.create(
+            venue='ГлавClub',
+            city='Москва',
+            date=timezone.now() + timedelta(days=30),
+            price=2000
+        )
+        ticket = Ticket.objects.create(concert=concert, user=self.user, price_paid=2000)
+        code = DiscountCode.objects.create(ticket=ticket, discount_percent=10)
+        CartItem.objects.create(cart=self.cart, sku=self.skus[0], quantity=2)
+
+        order = checkout(self.cart, discount_codes=[code.code])
+
+        order.refresh_from_db()
+        self.assertEqual(order.discount_total, 500)
+        self.assertEqual(order.total, 4500)
+        self.assertEqual(order.applied_discounts.get().discount_amount, 500)
+
+    def test_code_redeemed_once(self):
+        """Код, прошедший проверку в двух заказах одновременно, применяется один раз"""
+        concert = Concert.objects.create(
+            venue='ГлавClub',
+            city='Москва',
+            date=timezone.now() + timedelta(days=30),
+            price=2000
+        )
+        ticket = Ticket.objects.create(concert=concert, user=self.user, price_paid=2000)
+        code = DiscountCode.objects.create(ticket=ticket, discount_percent=10)
+        CartItem.objects.create(cart=self.cart, sku=self.skus[0], quantity=1)
+        checkout(self.cart, discount_codes=[code.code])
+
+        CartItem.objects.create(cart=self.cart, sku=self.skus[1], quantity=1)
+        # Второй заказ не видит первый при проверке, как при параллельном оформлении
+        with mock.patch('orders.services._confirm_discount_codes'), self.assertRaises(CheckoutError):
+            checkout(self.cart, discount_codes=[code.code])
+
+        self.assertEqual(Order.objects.count(), 1)
+        self.assertEqual(code.orderdiscount_set.count(), 1)
+
+    def test_checkout_out_of_stock(self):
+        """При нехватке товара заказ не создается и ничего не списывается"""
+        CartItem.objects.create(cart=self.cart, sku=self.skus[0], quantity=1)
+        CartItem.objects.create(cart=self.cart, sku=self.skus[1], quantity=11)
+
+        with self.assertRaises(OutOfStockError) as error:
+            checkout(self.cart)
+
+        self.assertEqual(error.exception.sku_codes, [self.skus[1].sku_code])
+        self.assertFalse(Order.objects.exists())
+        self.skus[0].refresh_from_db()
+        self.assertEqual(self.skus[0].stock, 10)
+        self.assertEqual(self.cart.items.count(), 2)
+
+    def test_checkout_empty_cart(self):
+        """Пустую корзину оформить нельзя"""
+        with self.assertRaises(CheckoutError):
+            checkout(self.cart)
+
+    def test_checkout_query_count_is_bounded(self):
+        """Количество запросов не зависит от числа позиций"""
+        CartItem.objects.create(cart=self.cart, sku=self.skus[0], quantity=1)
+        checkout(self.cart)
+
+        CartItem.objects.create(cart=self.cart, sku=self.skus[0], quantity=1)
+        with CaptureQueriesContext(connection) as single:
+            checkout(self.cart)
+
+        for sku in self.skus:
+            CartItem.objects.create(cart=self.cart, sku=sku, quantity=1)
+        with CaptureQueriesContext(connection) as multiple:
+            checkout(self.cart)
+
+        self.assertEqual(len(single), len(multiple))
+
+
+class CheckoutConcurrencyTest(TransactionTestCase):
+    """Нагрузочный тест: параллельные оформления не продают больше остатка"""
+
+    buyers = 20
+    stock = 7
+
+    def setUp(self):
+        product = Product.objects.create(name='Лимитированное худи', category='clothing')
+        self.sku = SKU.objects.create(
+            product=product,
+            attributes={'size': 'M'},
+            price=4500,
+            stock=self.stock
+        )
+        self.carts = []
+        for i in range(self.buyers):
+            cart = Cart.objects.create(session_id=f'drop_{i}')
+            CartItem.objects.create(cart=cart, sku=self.sku, quantity=1)
+            self.carts.append(cart)
+
+    def test_concurrent_checkouts_do_not_oversell(self):
+        results = []
+        barrier = threading.Barrier(self.buyers)
+
+        def buy(cart):
+            try:
+                barrier.wait()
+                checkout(cart)
+                results.append('ok')
+            except CheckoutError:
+                results.append('rejected')
+            finally:
+                connection.close()
+
+        threads = [threading.Thread(target=buy, args=(cart,)) for cart in self.carts]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.sku.refresh_from_db()
+        sold = results.count('ok')
+        self.assertEqual(sold, self.stock)
+        self.assertEqual(self.sku.stock, self.stock - sold)
+        self.assertEqual(OrderItem.objects.count(), sold)
+
+
+class OrderItemBulkSnapshotTest(TestCase):
+    """Тесты массового создания позиций заказа"""
+
+    def setUp(self):
+        self.product = Product.objects.create(
+            name='Винил',
+            category='vinyl',
+            main_image='https://example.com/vinyl.jpg'
+        )
+        self.skus = [
+            SKU.objects.create(
+                product=self.product,
+                attributes={'edition': str(i)},
+                price=1000 + i,
+                stock=10
+            )
+            for i in range(50)
+        ]
+        self.order = Order.objects.create()
+
+    def test_bulk_snapshot_fills_snapshot(self):
+        """Снэпшот заполняется так же, как при save()"""
+        sku = self.skus[0]
+        items = OrderItem.objects.bulk_snapshot(self.order, [(sku.id, 2), (str(sku.id), 1)])
+
+        self.assertEqual(len(items), 1)
+        item = OrderItem.objects.get(order=self.order)
+        self.assertEqual(item.quantity, 3)
+        self.assertEqual(item.sku_code, sku.sku_code)
+        self.assertEqual(item.product_name, 'Винил')
+        self.assertEqual(item.sku_display_name, sku.display_name)
+        self.assertEqual(item.attributes, {'edition': '0'})
+        self.assertEqual(item.image_url, 'https://example.com/vinyl.jpg')
+        self.order.refresh_from_db()
+        self.assertEqual(self.order.subtotal, 3000)
+
+    def test_bulk_snapshot_query_count(self):
+        """Количество запросов не зависит от числа позиций"""
+        with CaptureQueriesContext(connection) as single:
+            OrderItem.objects.bulk_snapshot(self.order, [(self.skus[0].id, 1)])
+
+        order = Order.objects.create()
+        with CaptureQueriesContext(connection) as large:
+            OrderItem.objects.bulk_snapshot(order, [(sku.id, 1) for sku in self.skus])
+
+        self.assertEqual(len(single), len(large))
+        self.assertEqual(order.items.count(), 50)
+
+    def test_bulk_snapshot_missing_sku(self):
+        """Несуществующий SKU вызывает ошибку"""
+        sku_id = self.skus[0].id
+        self.skus[0].delete()
+        with self.assertRaises(SKU.DoesNotExist):
+            OrderItem.objects.bulk_snapshot(self.order, [(sku_id, 1)])
+
+
+class DiscountEngineTest(TestCase):
+    """Тесты движка скидок"""
+
+    def setUp(self):
+        cache.clear()
+        discount_services._local.clear()
+        self.user = User.objects.create_user(email='buyer@example.com')
+        product = Product.objects.create(name='Футболка', category='clothing')
+        self.sku = SKU.objects.create(product=product, attributes={'size': 'M'}, price=2500, stock=10)
+        self.order = Order.objects.create(user=self.user, shipping_cost=300)
+        OrderItem.objects.create(order=self.order, sku=self.sku, quantity=4)
+        concert = Concert.objects.create(
+            venue='ГлавClub',
+            city='Москва',
+            date=timezone.now() + timedelta(days=30),
+            price=2000
+        )
+        self.codes = [
+            DiscountCode.objects.create(
+                ticket=Ticket.objects.create(concert=concert, user=self.user, price_paid=2000),
+                discount_percent=percent
+            )
+            for percent in [10, 20, 30]
+        ]
+
+    def info(self, code):
+        return CodeInfo(code.pk, code.code, code.discount_percent, code.valid_until, True, False)
+
+    def test_stacking_rules(self):
+        """Коды применяются по убыванию процента к остатку суммы"""
+        breakdown = compute_discounts(Decimal('10000'), [self.info(self.codes[0]), self.info(self.codes[1])])
+
+        self.assertEqual([line.percent for line in breakdown.lines], [20, 10])
+        self.assertEqual([line.amount for line in breakdown.lines], [Decimal('2000.00'), Decimal('800.00')])
+        self.assertEqual(breakdown.discount_total, Decimal('2800.00'))
+
+    def test_total_discount_capped(self):
+        breakdown = compute_discounts(Decimal('10000'), [self.info(code) for code in self.codes] * 2)
+
+        self.assertEqual(len(breakdown.lines), 3)
+        self.assertEqual(breakdown.discount_total, Decimal('4960.00'))
+
+        cap = compute_discounts(Decimal('10000'), [self.info(self.codes[2])] + [
+            CodeInfo(i, f'BIG-{i}', 40, self.codes[0].valid_until, True, False) for i in range(2)
+        ])
+        self.assertEqual(cap.discount_total, Decimal('5000.00'))
+
+    def test_apply_discounts(self):
+        breakdown = apply_discounts(self.order, [self.codes[0].code])
+
+        self.assertEqual(breakdown.discount_total, Decimal('1000.00'))
+        self.order.refresh_from_db()
+        self.assertEqual(self.order.discount_total, Decimal('1000.00'))
+        self.assertEqual(self.order.total, Decimal('9300.00'))
+        self.assertEqual(self.order.discount_data['codes'][0]['code'], self.codes[0].code)
+        self.assertEqual(self.order.applied_discounts.get().discount_amount, Decimal('1000.00'))
+
+    def test_reapply_replaces_discounts(self):
+        apply_discounts(self.order, [self.codes[0].code])
+        apply_discounts(self.order, [self.codes[0].code, self.codes[1].code])
+
+        self.order.refresh_from_db()
+        self.assertEqual(self.order.applied_discounts.count(), 2)
+        self.assertEqual(self.order.discount_total, Decimal('2800.00'))
+
+        apply_discounts(self.order, [])
+        self.order.refresh_from_db()
+        self.assertEqual((self.order.discount_total, self.order.total), (0, Decimal('10300.00')))
+
+    def test_invalid_code_keeps_order(self):
+        apply_discounts(self.order, [self.codes[0].code])
+        with self.assertRaises(CheckoutError):
+            apply_discounts(self.order, ['NO-SUCH-CODE'])
+
+        self.order.refresh_from_db()
+        self.assertEqual(self.order.discount_total, Decimal('1000.00'))
+        self.assertEqual(self.order.applied_discounts.count(), 1)
+
+
+class OrderAdminChangelistTest(TestCase):
+    """Список заказов в админке без повторных запросов навигации по датам"""
+
+    def setUp(self):
+        cache.clear()
+        admin_user = User.objects.create_superuser(email='admin@example.com', password='admin123')
+        self.client.force_login(admin_user)
+        user = User.objects.create_user(email='buyer@example.com')
+        for _ in range(3):
+            Order.objects.create(user=user)
+        self.url = reverse('admin:orders_order_changelist')
+
+    def get(self, params=None):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(self.url, params or {})
+        self.assertEqual(response.status_code, 200)
+        return response, [query['sql'] for query in queries]
+
+    def test_date_hierarchy_cached(self):
+        """Навигация по датам читается из кэша при повторном открытии"""
+        first, first_queries = self.get()
+        second, second_queries = self.get()
+
+        self.assertTrue(any('MIN(' in sql for sql in first_queries))
+        self.assertFalse(any('MIN(' in sql or 'DISTINCT' in sql for sql in second_queries))
+        self.assertEqual(len(first_queries) - 2, len(second_queries))
+        self.assertEqual(len(second.context['cl'].result_list), 3)
+
+        today = timezone.localtime()
+        self.assertContains(second, f'created_at__day={today.day}')
+
+    def test_filters_cached_separately(self):
+        """Выборка с фильтром кэшируется под своим ключом"""
+        self.get()
+        response, queries = self.get({'status': 'paid'})
+
+        self.assertTrue(any('MIN(' in sql for sql in queries))
+        self.assertEqual(len(response.context['cl'].result_list), 0)
+
+    def test_no_full_result_count(self):
+        """Общее количество без фильтров не считается отдельным запросом"""
+        response, queries = self.get({'status': 'pending'})
+
+        self.assertEqual(sum('COUNT(' in sql for sql in queries), 1)
+        self.assertEqual(response.context['cl'].result_count, 3)